@@ -0,0 +1,94 @@
+"""
+日志格式化微基准
+
+对比旧版 JsonFormatter（列表字面量 + json.dumps）与当前 orjson 实现的吞吐（records/sec）。
+用法（在项目根目录下）：
+    python scripts/bench_formatter.py [--records 200000]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from utils.log.write_log import JsonFormatter
+
+
+class LegacyJsonFormatter(logging.Formatter):
+    """改造前的实现，仅用于基准对比"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        log_data = {
+            'message': record.getMessage(),
+            'timestamp': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+            'log_id': getattr(record, 'log_id', ''),
+            'run_id': getattr(record, 'run_id', ''),
+            'space_id': getattr(record, 'space_id', ''),
+            'project_id': getattr(record, 'project_id', ''),
+            'method': getattr(record, 'method', ''),
+            'x_tt_env': getattr(record, 'x_tt_env', ''),
+            'lineno': record.lineno,
+            'funcName': record.funcName,
+        }
+
+        if record.exc_info:
+            log_data['exc_info'] = self.formatException(record.exc_info)
+
+        for key, value in record.__dict__.items():
+            if key not in ['name', 'msg', 'args', 'created', 'filename', 'funcName',
+                           'levelname', 'levelno', 'lineno', 'module', 'msecs',
+                           'message', 'pathname', 'process', 'processName', 'relativeCreated',
+                           'thread', 'threadName', 'exc_info', 'exc_text', 'stack_info',
+                           'log_id', 'run_id', 'space_id', 'project_id', 'method',
+                           'x_tt_env', 'rpc_persist_rec_rec_biz_scene',
+                           'rpc_persist_coze_record_root_id', 'rpc_persist_rec_root_entity_type',
+                           'rpc_persist_rec_root_entity_id']:
+                log_data[key] = value
+
+        return json.dumps(log_data, ensure_ascii=False)
+
+
+def _make_record() -> logging.LogRecord:
+    record = logging.LogRecord(
+        name="bench", level=logging.INFO, pathname=__file__, lineno=1,
+        msg="Received request for /run: run_id=%s, 输入长度=%d", args=("4f1c2a", 1024), exc_info=None,
+    )
+    record.log_id = "20261018000000000000"
+    record.run_id = "4f1c2a"
+    record.space_id = "space"
+    record.project_id = "project"
+    record.method = "run"
+    record.x_tt_env = ""
+    record.node_name = "llm_node"
+    record.latency_ms = 12.5
+    return record
+
+
+def bench(formatter: logging.Formatter, records: int) -> float:
+    record = _make_record()
+    formatter.format(record)
+    start = time.perf_counter()
+    for _ in range(records):
+        formatter.format(record)
+    return records / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志格式化微基准")
+    parser.add_argument("--records", type=int, default=200000)
+    args = parser.parse_args()
+
+    legacy = bench(LegacyJsonFormatter(), args.records)
+    current = bench(JsonFormatter(), args.records)
+    print(f"legacy json.dumps : {legacy:,.0f} records/sec")
+    print(f"orjson + frozenset: {current:,.0f} records/sec")
+    print(f"speedup           : {current / legacy:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+错误模式匹配微基准
+
+对比逐条线性匹配（每次调用都对关键词做 lower）与编译后的 PatternMatcher 的吞吐（次/秒），
+并校验两者结果一致。
+用法（在项目根目录下）：
+    python scripts/bench_patterns.py [--iterations 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from utils.error.patterns import (
+    ERROR_PATTERNS,
+    TRACEBACK_EXCEPTION_PATTERNS,
+    CUSTOM_EXCEPTION_PATTERNS,
+    match_error_pattern,
+)
+
+
+def legacy_match_error_pattern(error_str, patterns=None, require_all=False):
+    """改造前的实现，仅用于基准对比"""
+    if patterns is None:
+        patterns = ERROR_PATTERNS
+
+    error_lower = error_str.lower()
+
+    for keywords, code, msg_template in patterns:
+        if require_all:
+            if all(kw.lower() in error_lower for kw in keywords):
+                return code, f"{msg_template}: {error_str[:200]}"
+        else:
+            if any(kw.lower() in error_lower for kw in keywords):
+                return code, f"{msg_template}: {error_str[:200]}"
+
+    return None, None
+
+
+SAMPLES = [
+    # 故障期间最常见的连接池超时
+    ("pool", "QueuePool limit of size 100 overflow 100 reached, connection timed out, timeout 30.00 "
+             "(Background on this error at: https://sqlalche.me/e/20/3o7r) PoolTimeout: couldn't get a connection",
+     ERROR_PATTERNS),
+    # 未命中任何模式，需要走完整张表
+    ("miss", "Something unexpected happened while rendering the template for node summary_node",
+     ERROR_PATTERNS),
+    # 较长的 traceback
+    ("traceback", "Traceback (most recent call last):\n" + "".join(
+        f'  File "/app/src/graphs/nodes/node_{i}.py", line {i * 7}, in run_step\n    result = handler(state, config)\n'
+        for i in range(12)
+    ) + "KeyError: 'missing_field'", TRACEBACK_EXCEPTION_PATTERNS),
+    ("custom", "上传文件到对象存储失败: upstream returned 502", CUSTOM_EXCEPTION_PATTERNS),
+]
+
+
+def bench(func, error_str, patterns, iterations: int) -> float:
+    func(error_str, patterns)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(error_str, patterns)
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="错误模式匹配微基准")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    for name, error_str, patterns in SAMPLES:
+        for require_all in (False, True):
+            assert match_error_pattern(error_str, patterns, require_all) == \
+                legacy_match_error_pattern(error_str, patterns, require_all), name
+        legacy = bench(legacy_match_error_pattern, error_str, patterns, args.iterations)
+        current = bench(match_error_pattern, error_str, patterns, args.iterations)
+        print(f"{name:10s} len={len(error_str):5d}  linear {legacy:>10,.0f}/s  "
+              f"compiled {current:>10,.0f}/s  speedup {current / legacy:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ from langgraph.graph.message import add_messages
 from langchain_core.messages import AnyMessage
 from coze_coding_utils.runtime_ctx.context import default_headers
 from storage.memory.memory_saver import get_memory_saver
+from agents.tool_execution import bind_db_executor, ToolConcurrencyMiddleware
 
 # 导入工具
 from tools.medical_query_tool import (
@@ -224,10 +225,14 @@ def build_agent(ctx=None):
         get_expense_records,
     ]
     
+    # 同步工具在异步执行时走数据库专用线程池；同一轮的多个工具调用并发执行（有上限）
+    bind_db_executor(tools)
+
     return create_agent(
         model=llm,
         system_prompt=cfg.get("sp"),
         tools=tools,
         checkpointer=get_memory_saver(),
         state_schema=AgentState,
+        middleware=[ToolConcurrencyMiddleware()],
     )
@@ -0,0 +1,110 @@
+"""
+工具执行控制
+
+- bind_db_executor: 为同步工具挂上异步实现，图以异步方式运行时在数据库专用线程池中执行，
+  不再占用事件循环默认线程池。目前只有 /run（GraphService.run 的 ainvoke）走异步路径；
+  /stream_run 和 /v1/chat/completions 在生产者线程中调用同步的 graph.stream，工具仍按同步方式执行
+- ToolConcurrencyMiddleware: 同一轮模型输出的多个工具调用由 ToolNode 并发执行，这里限制并发上限
+
+并发上限 TOOL_MAX_CONCURRENCY 的作用范围是单次运行：build_agent 每个请求创建一个中间件实例，
+不同请求之间互不限制，进程内同时执行的工具数最多为 并发请求数 × TOOL_MAX_CONCURRENCY。
+同步路径（graph.stream）中 ToolNode 仍会为每个工具调用占用一个线程，超出上限的调用在信号量上排队；
+上限与排队次数见 /metrics 的 tool_concurrency。
+"""
+import asyncio
+import logging
+import os
+import threading
+import typing
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, StructuredTool
+from langgraph.prebuilt.tool_node import ToolCallRequest
+from langgraph.types import Command
+
+from storage.database.db import run_in_db_executor
+
+logger = logging.getLogger(__name__)
+
+# 单次运行内并发执行的工具调用上限
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "queued": 0}
+
+
+def _record_call(queued: bool):
+    with _stats_lock:
+        _stats["calls"] += 1
+        if queued:
+            _stats["queued"] += 1
+
+
+def get_tool_concurrency_stats() -> Dict[str, Any]:
+    """工具并发上限及其作用范围，queued 为因达到上限而排队的调用数"""
+    with _stats_lock:
+        return {**_stats, "max_concurrency": max(1, TOOL_MAX_CONCURRENCY), "scope": "per_run"}
+
+
+def bind_db_executor(tools: List[BaseTool]) -> List[BaseTool]:
+    """为没有异步实现的同步工具补充 coroutine（幂等），返回原列表"""
+    for t in tools:
+        if not isinstance(t, StructuredTool) or t.func is None or t.coroutine is not None:
+            continue
+        # 需要注入 RunnableConfig 的函数保持默认执行方式
+        if _runnable_config_param(t.func):
+            continue
+        t.coroutine = _make_db_coroutine(t.func)
+    return tools
+
+
+def _runnable_config_param(func: Callable) -> Optional[str]:
+    """返回类型注解为 RunnableConfig 的参数名（StructuredTool 会向该参数注入 config）"""
+    try:
+        hints = typing.get_type_hints(func)
+    except Exception:
+        return None
+    for name, hint in hints.items():
+        if hint is RunnableConfig:
+            return name
+    return None
+
+
+def _make_db_coroutine(func: Callable):
+    async def _run(*args, **kwargs):
+        return await run_in_db_executor(func, *args, **kwargs)
+
+    _run.__name__ = getattr(func, "__name__", "tool")
+    return _run
+
+
+class ToolConcurrencyMiddleware(AgentMiddleware):
+    """限制单次运行中并发执行的工具调用数（同步和异步执行路径都生效）"""
+
+    def __init__(self, max_concurrency: int = TOOL_MAX_CONCURRENCY):
+        super().__init__()
+        self.max_concurrency = max(1, max_concurrency)
+        self._sync_semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._async_semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def wrap_tool_call(
+            self,
+            request: ToolCallRequest,
+            handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        queued = not self._sync_semaphore.acquire(blocking=False)
+        _record_call(queued)
+        if queued:
+            self._sync_semaphore.acquire()
+        try:
+            return handler(request)
+        finally:
+            self._sync_semaphore.release()
+
+    async def awrap_tool_call(self, request: ToolCallRequest, handler) -> ToolMessage | Command:
+        _record_call(self._async_semaphore.locked())
+        async with self._async_semaphore:
+            return await handler(request)
@@ -1,6 +1,10 @@
 """添加路由调试端点"""
+import logging
+
 from fastapi import APIRouter
 
+logger = logging.getLogger(__name__)
+
 def register_debug_routes(app):
     """注册调试路由到应用"""
     debug_router = APIRouter(prefix="/debug", tags=["Debug"])
@@ -57,4 +61,4 @@ def register_debug_routes(app):
 
     # 注册调试路由
     app.include_router(debug_router)
-    print("✓ Debug routes registered: /debug/routes, /debug/health-detailed")
+    logger.info("✓ Debug routes registered: /debug/routes, /debug/health-detailed")
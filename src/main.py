@@ -3,10 +3,10 @@ import asyncio
 import json
 import traceback
 import logging
-from typing import Any, Dict, Iterable, AsyncIterable, AsyncGenerator, Optional
+from typing import Any, Dict, Iterable, AsyncIterable, AsyncGenerator, Optional, Tuple
 import threading
 import contextvars
-import cozeloop
+
 import uvicorn
 import time
 from fastapi import FastAPI, HTTPException, Request
@@ -14,13 +14,14 @@ from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from langchain_core.runnables import RunnableConfig
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 from langgraph.graph.state import CompiledStateGraph
 
 from coze_coding_utils.runtime_ctx.context import new_context, Context
 from utils.helper import graph_helper
 from utils.log.node_log import LOG_FILE
 from utils.log.write_log import setup_logging, request_context
+from utils.log.request_log import log_request, parse_request_body
 from utils.log.config import LOG_LEVEL
 from utils.messages.server import (
     create_message_end_dict,
@@ -29,9 +30,6 @@ from utils.messages.server import (
 )
 from utils.error import ErrorClassifier, classify_error
 
-# 应用启动检查
-import startup_check
-
 setup_logging(
     log_file=LOG_FILE,
     max_bytes=100 * 1024 * 1024, # 100MB
@@ -42,13 +40,17 @@ setup_logging(
 )
 
 logger = logging.getLogger(__name__)
+
+# 应用启动检查（诊断信息走 logging，必须在 setup_logging 之后导入，否则 INFO 记录会被丢弃）
+import startup_check
+
 from utils.helper.agent_helper import (
     to_stream_input,
+    ato_stream_input,
     to_client_message,
     agent_iter_server_messages,
 )
 from utils.openai.handler import OpenAIChatHandler
-from utils.log.parser import LangGraphParser
 from utils.log.err_trace import extract_core_stack
 from utils.log.loop_trace import init_run_config, init_agent_config
 
@@ -65,6 +67,9 @@ class GraphService:
         self.running_tasks: Dict[str, asyncio.Task] = {}
         # 错误分类器
         self.error_classifier = ErrorClassifier()
+        # /node_run 复用的单节点编译图
+        self._node_graphs: Optional[graph_helper.NodeGraphCache] = None
+        self._graph_inout_schema: Optional[Dict[str, Any]] = None
 
     
     def _get_graph(self, ctx=Context):
@@ -181,7 +186,6 @@ class GraphService:
         finally:
             # 清理任务记录
             self.running_tasks.pop(run_id, None)
-            cozeloop.flush()
 
     # 取消执行 - 使用asyncio的标准方式
     def cancel_run(self, run_id: str, ctx: Optional[Context] = None) -> Dict[str, Any]:
@@ -226,36 +230,49 @@ class GraphService:
         if ctx is None or Context.run_id == "":
             ctx = new_context(method="node_run")
 
-        node_func, input_cls, output_cls = graph_helper.get_graph_node_func_with_inout(self.graph.get_graph(), node_id)
-        if node_func is None or input_cls is None:
-            raise KeyError(f"node_id '{node_id}' not found")
-        assert self.graph is not None, "Graph is not initialized"
-        parser = LangGraphParser(self.graph)
-        metadata = parser.get_node_metadata(node_id) or {}
-
-        _g = StateGraph(input_cls, input_schema=input_cls, output_schema=output_cls)
-        _g.add_node("sn", node_func, metadata=metadata)
-        _g.set_entry_point("sn")
-        _g.add_edge("sn", END)
-        _graph = _g.compile()
+        _graph, _, _ = self.get_node_graph(node_id)
 
         run_config = init_run_config(_graph, ctx)
         return await _graph.ainvoke(payload, config=run_config)
 
-    # 获取工作流的出入参Schema
+    def get_node_graph(self, node_id: str) -> Tuple[CompiledStateGraph, Any, Any]:
+        """获取只包含指定节点的编译图及其出入参类，按 node_id 缓存"""
+        assert self.graph is not None, "Graph is not initialized"
+        if self._node_graphs is None:
+            self._node_graphs = graph_helper.NodeGraphCache(self.graph)
+        return self._node_graphs.get(node_id)
+
+    def warmup_node_graphs(self):
+        """启动时预先构建所有节点的单节点图，并解析各节点和整图的出入参"""
+        if graph_helper.is_agent_proj() or self.graph is None:
+            return
+        try:
+            self.graph_inout_schema()
+        except Exception as e:
+            logger.warning(f"Failed to precompute graph parameter schema: {e}")
+        if self._node_graphs is None:
+            self._node_graphs = graph_helper.NodeGraphCache(self.graph)
+        logger.info(f"Prebuilt {self._node_graphs.warmup()} node graphs")
+
+    # 获取工作流的出入参Schema（图在进程内不变，首次计算后缓存）
     def graph_inout_schema(self) -> Any:
         if graph_helper.is_agent_proj():
             return {"input_schema": {}, "output_schema": {}}
-        _graph_input = self.graph.get_input_schema()
-        _graph_output = self.graph.get_output_schema()
-
-        return {"input_schema": _graph_input.model_json_schema(), "output_schema": _graph_output.model_json_schema()}
+        if self._graph_inout_schema is None:
+            _graph_input = self.graph.get_input_schema()
+            _graph_output = self.graph.get_output_schema()
+            self._graph_inout_schema = {
+                "input_schema": _graph_input.model_json_schema(),
+                "output_schema": _graph_output.model_json_schema(),
+            }
+        return self._graph_inout_schema
 
     async def astream(self, payload: Dict[str, Any], graph: CompiledStateGraph, run_config: RunnableConfig, ctx=Context) -> AsyncIterable[Any]:
         client_msg, session_id = to_client_message(payload)
         run_config["recursion_limit"] = 100
         run_config["configurable"] = {"thread_id": session_id}
-        stream_input = to_stream_input(client_msg)
+        # 文档附件在事件循环外并发下载、解析
+        stream_input = await ato_stream_input(client_msg)
 
         # 使用后台线程拉取同步流，并通过事件循环安全地推送到异步队列
         loop = asyncio.get_running_loop()
@@ -412,26 +429,15 @@ openai_handler = OpenAIChatHandler(service)
 async def http_run(request: Request) -> Dict[str, Any]:
     global result
     raw_body = await request.body()
-    try:
-        body_text = raw_body.decode("utf-8")
-    except Exception as e:
-        body_text = str(raw_body)
-        raise HTTPException(status_code=400,
-                            detail=f"Invalid JSON format: {body_text}, traceback: {traceback.format_exc()}, error: {e}")
 
     ctx = new_context(method="run", headers=request.headers)
     run_id = ctx.run_id
     request_context.set(ctx)
 
-    logger.info(
-        f"Received request for /run: "
-        f"run_id={run_id}, "
-        f"query={dict(request.query_params)}, "
-        f"body={body_text}"
-    )
+    log_request(logger, "run", raw_body, run_id=run_id, query=dict(request.query_params))
 
     try:
-        payload = await request.json()
+        payload = parse_request_body(raw_body)
 
         # 创建任务并记录 - 这是关键，让我们可以通过run_id取消任务
         task = asyncio.create_task(service.run(payload, ctx))
@@ -481,8 +487,6 @@ async def http_run(request: Request) -> Dict[str, Any]:
                 "stack_trace": extract_core_stack(),
             }
         )
-    finally:
-        cozeloop.flush()
 
 
 @app.post("/stream_run")
@@ -490,23 +494,12 @@ async def http_stream_run(request: Request):
     ctx = new_context(method="stream_run", headers=request.headers)
     request_context.set(ctx)
     raw_body = await request.body()
-    try:
-        body_text = raw_body.decode("utf-8")
-    except Exception as e:
-        body_text = str(raw_body)
-        raise HTTPException(status_code=400,
-                            detail=f"Invalid JSON format: {body_text}, traceback: {extract_core_stack()}, error: {e}")
 
     run_id = ctx.run_id
-    logger.info(
-        f"Received request for /stream_run: "
-        f"run_id={run_id}, "
-        f"query={dict(request.query_params)}, "
-        f"body={body_text}"
-    )
+    log_request(logger, "stream_run", raw_body, run_id=run_id, query=dict(request.query_params))
 
     try:
-        payload = await request.json()
+        payload = parse_request_body(raw_body)
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error in http_stream_run: {e}, traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=400, detail=f"Invalid JSON format:{extract_core_stack()}")
@@ -580,21 +573,12 @@ async def http_cancel(run_id: str, request: Request):
 @app.post(path="/node_run/{node_id}")
 async def http_node_run(node_id: str, request: Request):
     raw_body = await request.body()
-    try:
-        body_text = raw_body.decode("utf-8")
-    except UnicodeDecodeError:
-        body_text = str(raw_body)
-        raise HTTPException(status_code=400, detail=f"Invalid JSON format: {body_text}")
     ctx = new_context(method="node_run", headers=request.headers)
     request_context.set(ctx)
-    logger.info(
-        f"Received request for /node_run/{node_id}: "
-        f"query={dict(request.query_params)}, "
-        f"body={body_text}",
-    )
+    log_request(logger, "node_run", raw_body, node_id=node_id, query=dict(request.query_params))
 
     try:
-        payload = await request.json()
+        payload = parse_request_body(raw_body)
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error in http_node_run: {e}, traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=400, detail=f"Invalid JSON format:{extract_core_stack()}")
@@ -618,8 +602,6 @@ async def http_node_run(node_id: str, request: Request):
                 "stack_trace": extract_core_stack(),
             }
         )
-    finally:
-        cozeloop.flush()
 
 
 @app.post("/v1/chat/completions")
@@ -636,8 +618,81 @@ async def openai_chat_completions(request: Request):
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error in openai_chat_completions: {e}")
         raise HTTPException(status_code=400, detail="Invalid JSON format")
-    finally:
-        cozeloop.flush()
+
+
+@app.on_event("startup")
+async def on_startup():
+    from storage.database.db import get_pool_budget
+    # 连接预算需要同步查询 max_connections，启动时在线程中算好，之后事件循环上只读缓存结果
+    try:
+        await asyncio.to_thread(get_pool_budget)
+    except Exception as e:
+        logger.error(f"Database connection budget calculation failed: {e}", exc_info=True)
+    # workflow 项目预先构建 /node_run 使用的单节点图
+    if not graph_helper.is_agent_proj():
+        try:
+            await asyncio.to_thread(service.warmup_node_graphs)
+        except Exception as e:
+            logger.error(f"Node graph warmup failed: {e}", exc_info=True)
+    # 文档解析进程池（spawn 方式）在启动时拉起全部 worker，请求路径不再承担进程启动开销
+    from utils.file.ingest import file_ingestor
+    await asyncio.to_thread(file_ingestor.start)
+    # agent 项目在启动时异步初始化 checkpointer（建表 + 预热连接池），请求路径不再承担建连开销
+    if graph_helper.is_agent_proj():
+        from storage.memory.memory_saver import get_memory_manager
+        try:
+            await get_memory_manager().ainit()
+        except Exception as e:
+            logger.error(f"Checkpointer initialization failed at startup: {e}", exc_info=True)
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    from utils.log.node_log import node_log_writer
+    from utils.log.loop_trace import trace_flusher
+    from utils.file.ingest import file_ingestor
+    await asyncio.to_thread(node_log_writer.close)
+    await asyncio.to_thread(trace_flusher.stop)
+    await asyncio.to_thread(file_ingestor.close)
+    if graph_helper.is_agent_proj():
+        from storage.memory.memory_saver import get_memory_manager
+        await get_memory_manager().close_pool()
+
+
+@app.get("/metrics")
+async def http_metrics():
+    from storage.database.db import get_engine_pool_stats, get_pool_budget
+    from storage.memory.memory_saver import get_memory_manager
+    from utils.log.tool_metrics import tool_metrics
+    from agents.tool_execution import get_tool_concurrency_stats
+    from utils.log.node_log import node_log_writer
+    from utils.log.write_log import get_logging_stats
+    from utils.log.loop_trace import get_trace_stats
+    from utils.file.ingest import file_ingestor
+    from utils.file.text_cache import get_text_cache
+    from storage.s3.token_cache import get_storage_token_cache
+    from storage.s3.presign_cache import get_presign_cache
+    try:
+        budget = (await asyncio.to_thread(get_pool_budget)).to_dict()
+    except Exception as e:
+        budget = {"error": str(e)}
+    return {
+        "db_pool": {
+            "budget": budget,
+            "sqlalchemy": get_engine_pool_stats(),
+            "checkpointer": get_memory_manager().get_stats(),
+        },
+        "tools": tool_metrics.snapshot(),
+        "tool_concurrency": get_tool_concurrency_stats(),
+        "node_log": node_log_writer.get_stats(),
+        "logging": get_logging_stats(),
+        "traces": get_trace_stats(),
+        "errors": service.error_classifier.get_stats_snapshot(),
+        "file_ingest": file_ingestor.get_stats(),
+        "file_text_cache": get_text_cache().get_stats(),
+        "s3_token": get_storage_token_cache().get_stats(),
+        "s3_presign": get_presign_cache().get_stats(),
+    }
 
 
 @app.get("/health")
@@ -1,5 +1,12 @@
 import os
 import time
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import OperationalError
@@ -7,6 +14,19 @@ import logging
 logger = logging.getLogger(__name__)
 
 MAX_RETRY_TIME = 20  # 连接最大重试时间（秒）
+
+# SQLAlchemy 连接池配置
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "100"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "100"))
+# checkpointer（psycopg AsyncConnectionPool）连接池配置
+CHECKPOINT_POOL_MIN_SIZE = int(os.getenv("CHECKPOINT_POOL_MIN_SIZE", "2"))
+CHECKPOINT_POOL_MAX_SIZE = int(os.getenv("CHECKPOINT_POOL_MAX_SIZE", "10"))
+# 同步数据库调用（工具等）专用线程池大小，0 表示按 SQLAlchemy 常驻连接数推算（最多 32）
+DB_EXECUTOR_MAX_WORKERS = int(os.getenv("DB_EXECUTOR_MAX_WORKERS", "0"))
+# 本进程最多占用 Postgres 可用连接数（max_connections - superuser_reserved_connections）的比例
+DB_CONNECTION_BUDGET_RATIO = float(os.getenv("DB_CONNECTION_BUDGET_RATIO", "0.8"))
+# 连接同一数据库的进程数（多 worker / 多副本部署时设置），预算在进程间平均分配
+DB_CONNECTION_BUDGET_PROCESSES = int(os.getenv("DB_CONNECTION_BUDGET_PROCESSES", "1"))
 # Load environment variables from .env if present
 try:
     from dotenv import load_dotenv
@@ -37,20 +57,107 @@ def get_db_url() -> str:
     return url
 _engine = None
 _SessionLocal = None
+_pool_budget = None
+_pool_budget_lock = threading.Lock()
+_db_executor = None
+
+
+@dataclass(frozen=True)
+class PoolBudget:
+    """本进程两个连接池（SQLAlchemy + checkpointer）的连接分配"""
+    pool_size: int
+    max_overflow: int
+    checkpoint_min_size: int
+    checkpoint_max_size: int
+    available: Optional[int] = None  # 本进程可用连接上限，查询失败时为 None
+
+    @property
+    def total(self) -> int:
+        return self.pool_size + self.max_overflow + self.checkpoint_max_size
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d["total"] = self.total
+        return d
+
+
+def _query_available_connections(url: str) -> Optional[int]:
+    """查询 Postgres 留给普通用户的连接数，失败返回 None"""
+    try:
+        import psycopg
+        with psycopg.connect(url, autocommit=True, connect_timeout=5) as conn:
+            max_conn = int(conn.execute("SHOW max_connections").fetchone()[0])
+            reserved = int(conn.execute("SHOW superuser_reserved_connections").fetchone()[0])
+        return max_conn - reserved
+    except Exception as e:
+        logger.warning(f"Failed to query max_connections, pool sizes will not be capped: {e}")
+        return None
+
+
+def _allocate_pool_budget(available: Optional[int]) -> PoolBudget:
+    """按比例把连接预算分给 SQLAlchemy 和 checkpointer，总量不超过时保持配置值"""
+    budget = PoolBudget(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        checkpoint_min_size=CHECKPOINT_POOL_MIN_SIZE,
+        checkpoint_max_size=max(CHECKPOINT_POOL_MAX_SIZE, CHECKPOINT_POOL_MIN_SIZE),
+    )
+    if available is None:
+        return budget
+
+    limit = max(2, int(available * DB_CONNECTION_BUDGET_RATIO) // max(1, DB_CONNECTION_BUDGET_PROCESSES))
+    if budget.total <= limit:
+        return PoolBudget(**{**asdict(budget), "available": limit})
+
+    factor = limit / budget.total
+    checkpoint_max = max(1, min(budget.checkpoint_min_size, limit // 2), int(budget.checkpoint_max_size * factor))
+    checkpoint_min = min(budget.checkpoint_min_size, checkpoint_max)
+    sqlalchemy_total = max(1, limit - checkpoint_max)
+    sqlalchemy_configured = budget.pool_size + budget.max_overflow
+    pool_size = max(1, int(sqlalchemy_total * budget.pool_size / sqlalchemy_configured)) if sqlalchemy_configured else 1
+    max_overflow = max(0, sqlalchemy_total - pool_size)
+    logger.warning(
+        f"Configured connection pools ({budget.total}) exceed budget ({limit}), "
+        f"scaled down: sqlalchemy={pool_size}+{max_overflow}, checkpointer={checkpoint_min}..{checkpoint_max}"
+    )
+    return PoolBudget(
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        checkpoint_min_size=checkpoint_min,
+        checkpoint_max_size=checkpoint_max,
+        available=limit,
+    )
+
+
+def get_pool_budget() -> PoolBudget:
+    """
+    获取本进程的连接池分配（只计算一次）
+
+    首次调用会同步连接数据库查询 max_connections，服务启动时应通过 asyncio.to_thread 预先计算，
+    事件循环上只读取已计算好的结果
+    """
+    global _pool_budget
+    if _pool_budget is None:
+        with _pool_budget_lock:
+            if _pool_budget is None:
+                url = get_db_url()
+                _pool_budget = _allocate_pool_budget(_query_available_connections(url) if url else None)
+                logger.info(f"Database connection budget: {_pool_budget.to_dict()}")
+    return _pool_budget
+
 
 def _create_engine_with_retry():
     url = get_db_url()
     if url is None or url == "":
         logger.error("PGDATABASE_URL is not set")
         raise ValueError("PGDATABASE_URL is not set")
-    size = 100
-    overflow = 100
+    budget = get_pool_budget()
     recycle = 1800
     timeout = 30
     engine = create_engine(
         url,
-        pool_size=size,
-        max_overflow=overflow,
+        pool_size=budget.pool_size,
+        max_overflow=budget.max_overflow,
         pool_pre_ping=True,
         pool_recycle=recycle,
         pool_timeout=timeout,
@@ -86,9 +193,47 @@ def get_sessionmaker():
 def get_session():
     return get_sessionmaker()()
 
+def get_db_executor() -> ThreadPoolExecutor:
+    """获取同步数据库调用专用线程池，线程数不超过连接池常驻连接数，避免线程排队等连接"""
+    global _db_executor
+    if _db_executor is None:
+        workers = DB_EXECUTOR_MAX_WORKERS
+        if workers <= 0:
+            try:
+                workers = min(32, get_pool_budget().pool_size)
+            except Exception as e:
+                logger.warning(f"Failed to size db executor from pool budget: {e}")
+                workers = 16
+        _db_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        logger.info(f"DB executor created: max_workers={workers}")
+    return _db_executor
+
+async def run_in_db_executor(func, *args, **kwargs):
+    """在数据库专用线程池中执行同步函数，保留当前 contextvars"""
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(get_db_executor(), call)
+
+def get_engine_pool_stats() -> Dict[str, Any]:
+    """SQLAlchemy 连接池状态，引擎未创建时返回空字典"""
+    if _engine is None:
+        return {}
+    pool = _engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
 __all__ = [
     "get_db_url",
     "get_engine",
     "get_sessionmaker",
     "get_session",
+    "get_pool_budget",
+    "get_engine_pool_stats",
+    "get_db_executor",
+    "run_in_db_executor",
+    "PoolBudget",
 ]
@@ -0,0 +1,262 @@
+"""
+带进程内 LRU 缓存的写穿透 checkpointer
+
+在 AsyncPostgresSaver 前面加一层按 thread_id 组织的 LRU，缓存每个会话最近一次的
+checkpoint。同一 worker 连续服务同一会话时，读取最新 checkpoint 不再访问 Postgres；
+所有写操作仍然先落库，成功后再更新缓存。
+
+缓存只在单个进程内一致，命中时不会向库核对最新 checkpoint_id：会话被其他 worker/副本写入后，
+本进程最多在 ttl_seconds 内读到旧的 checkpoint（以及旧的 pending writes）。因此缓存默认关闭
+（CHECKPOINT_CACHE_MAX_THREADS=0），只应在同一会话固定路由到同一进程（会话粘性，如按
+session_id 做一致性哈希、单 worker 单副本）的部署中开启。
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    copy_checkpoint,
+    get_checkpoint_id,
+    get_serializable_checkpoint_metadata,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CachedCheckpointSaver(BaseCheckpointSaver):
+    """
+    写穿透的两级 checkpointer：进程内 LRU + 持久化 saver
+
+    - 读最新 checkpoint（不带 checkpoint_id）优先命中缓存，未命中时回源并回填
+    - put 先写持久化 saver，成功后用新 checkpoint 覆盖缓存
+    - put_writes 先写持久化 saver，再使对应 checkpoint 的缓存失效（pending writes 以库为准）
+    - 缓存按 thread_id 做 LRU 淘汰和失效，每个 thread 下按 checkpoint_ns 分别缓存
+    - 缓存只在当前进程内有效，要求会话粘性；ttl_seconds 只是粘性失效（扩缩容、重新路由）时的兜底
+    - 命中时返回 checkpoint 的副本：pregel 执行过程中会原地修改 channel_versions/versions_seen，
+      运行在 put 之前失败也不能污染缓存
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver, max_threads: int = 1024, ttl_seconds: float = 300):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        # thread_id -> {checkpoint_ns: (CheckpointTuple, 写入时间)}
+        self._cache: "OrderedDict[str, Dict[str, Tuple[CheckpointTuple, float]]]" = OrderedDict()
+        # 同步接口在后台线程调用、异步接口在事件循环调用，字典操作需要加锁
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def config_specs(self) -> list:
+        return self.saver.config_specs
+
+    def get_next_version(self, current, channel):
+        return self.saver.get_next_version(current, channel)
+
+    # ==================== 缓存操作 ====================
+
+    @staticmethod
+    def _cache_key(config: RunnableConfig) -> Tuple[str, str]:
+        configurable = config["configurable"]
+        return str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")
+
+    def _cache_get(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id, checkpoint_ns = self._cache_key(config)
+        checkpoint_id = get_checkpoint_id(config)
+        with self._lock:
+            entries = self._cache.get(thread_id)
+            entry = entries.get(checkpoint_ns) if entries else None
+            if entry is None:
+                self.misses += 1
+                return None
+            cached, stored_at = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del entries[checkpoint_ns]
+                self.misses += 1
+                return None
+            # 指定了 checkpoint_id 时只有命中最新 checkpoint 才能走缓存
+            if checkpoint_id and cached.config["configurable"]["checkpoint_id"] != checkpoint_id:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(thread_id)
+            self.hits += 1
+        return self._copy_tuple(cached)
+
+    @staticmethod
+    def _copy_tuple(value: CheckpointTuple) -> CheckpointTuple:
+        return value._replace(
+            checkpoint=copy_checkpoint(value.checkpoint),
+            pending_writes=list(value.pending_writes) if value.pending_writes is not None else None,
+        )
+
+    def _cache_set(self, config: RunnableConfig, value: CheckpointTuple):
+        thread_id, checkpoint_ns = self._cache_key(config)
+        with self._lock:
+            self._cache.setdefault(thread_id, {})[checkpoint_ns] = (value, time.monotonic())
+            self._cache.move_to_end(thread_id)
+            while len(self._cache) > self.max_threads:
+                self._cache.popitem(last=False)
+
+    def _cache_fill(self, config: RunnableConfig, value: Optional[CheckpointTuple]):
+        """回源结果只有在读的是最新 checkpoint 时才回填"""
+        if value is not None and not get_checkpoint_id(config):
+            self._cache_set(config, self._copy_tuple(value))
+
+    def _cache_drop_checkpoint(self, config: RunnableConfig):
+        thread_id, checkpoint_ns = self._cache_key(config)
+        checkpoint_id = get_checkpoint_id(config)
+        with self._lock:
+            entries = self._cache.get(thread_id)
+            entry = entries.get(checkpoint_ns) if entries else None
+            if entry and entry[0].config["configurable"]["checkpoint_id"] == checkpoint_id:
+                del entries[checkpoint_ns]
+
+    def _after_put(
+            self,
+            config: RunnableConfig,
+            next_config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+    ):
+        thread_id, checkpoint_ns = self._cache_key(config)
+        parent_checkpoint_id = get_checkpoint_id(config)
+        parent_config = None
+        if parent_checkpoint_id:
+            parent_config = {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": parent_checkpoint_id,
+                }
+            }
+        self._cache_set(next_config, CheckpointTuple(
+            config=next_config,
+            checkpoint=copy_checkpoint(checkpoint),
+            metadata=get_serializable_checkpoint_metadata(config, metadata),
+            parent_config=parent_config,
+            pending_writes=[],
+        ))
+
+    def invalidate(self, thread_id: str):
+        """使指定 thread_id 的缓存失效"""
+        with self._lock:
+            self._cache.pop(str(thread_id), None)
+
+    def clear(self):
+        """清空全部缓存"""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "threads": len(self._cache),
+                "max_threads": self.max_threads,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    # ==================== 同步接口 ====================
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        cached = self._cache_get(config)
+        if cached is not None:
+            return cached
+        value = self.saver.get_tuple(config)
+        self._cache_fill(config, value)
+        return value
+
+    def list(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def put(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = self.saver.put(config, checkpoint, metadata, new_versions)
+        self._after_put(config, next_config, checkpoint, metadata)
+        return next_config
+
+    def put_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[Tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        self.saver.put_writes(config, writes, task_id, task_path)
+        self._cache_drop_checkpoint(config)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.invalidate(thread_id)
+        self.saver.delete_thread(thread_id)
+
+    # ==================== 异步接口 ====================
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        cached = self._cache_get(config)
+        if cached is not None:
+            return cached
+        value = await self.saver.aget_tuple(config)
+        self._cache_fill(config, value)
+        return value
+
+    async def alist(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        async for item in self.saver.alist(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = await self.saver.aput(config, checkpoint, metadata, new_versions)
+        self._after_put(config, next_config, checkpoint, metadata)
+        return next_config
+
+    async def aput_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[Tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        await self.saver.aput_writes(config, writes, task_id, task_path)
+        self._cache_drop_checkpoint(config)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.invalidate(thread_id)
+        await self.saver.adelete_thread(thread_id)
@@ -1,64 +1,107 @@
 import psycopg
 from psycopg_pool import AsyncConnectionPool
-from langgraph.checkpoint.postgres import PostgresSaver
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.checkpoint.base import BaseCheckpointSaver
-from typing import Optional, Union
+from typing import Any, Dict, Optional, Union
+import asyncio
 import logging
+import os
+import threading
 import time
 
+from storage.memory.cached_saver import CachedCheckpointSaver
+
 logger = logging.getLogger(__name__)
 
 # 数据库连接超时时间（秒），每次尝试 15 秒，共尝试 2 次
 DB_CONNECTION_TIMEOUT = 15
 DB_MAX_RETRIES = 2
+# 建 schema/表时使用的 Postgres advisory lock key
+MEMORY_SETUP_LOCK_ID = 72541303
+# 等待 advisory lock 的最长时间（秒），超时后退化为 MemorySaver，避免一个卡住的副本拖住其他副本启动
+MEMORY_SETUP_LOCK_TIMEOUT = float(os.getenv("MEMORY_SETUP_LOCK_TIMEOUT", "60"))
+MEMORY_SETUP_LOCK_POLL_INTERVAL = 0.5
+
+# checkpointer 连接池配置（min/max 由 storage.database.db 的连接预算统一分配）
+CHECKPOINT_POOL_MAX_IDLE = float(os.getenv("CHECKPOINT_POOL_MAX_IDLE", "300"))
+CHECKPOINT_POOL_MAX_LIFETIME = float(os.getenv("CHECKPOINT_POOL_MAX_LIFETIME", "1800"))
+# 借出连接前是否做存活检查
+CHECKPOINT_POOL_CHECK = os.getenv("CHECKPOINT_POOL_CHECK", "true").lower() in ("1", "true", "yes")
+# psycopg prepare_threshold：0 表示所有语句都走预编译，"none" 表示关闭（pgbouncer 事务模式下需要关闭）
+_prepare_threshold = os.getenv("CHECKPOINT_POOL_PREPARE_THRESHOLD", "0")
+CHECKPOINT_POOL_PREPARE_THRESHOLD = None if _prepare_threshold.lower() == "none" else int(_prepare_threshold)
+# 启动预热时等待连接池建立 min_size 个连接的超时时间（秒）
+CHECKPOINT_POOL_WARMUP_TIMEOUT = float(os.getenv("CHECKPOINT_POOL_WARMUP_TIMEOUT", "30"))
+
+# checkpoint 进程内缓存：最多缓存的会话数（0 表示关闭，默认关闭）及缓存有效期（秒）
+# 缓存只在单进程内一致，读取前不会向库核对最新 checkpoint，会话被其他 worker/副本写入后
+# 最多读到 TTL 秒内的旧 checkpoint。只应在同一会话固定路由到同一进程（会话粘性）的部署中开启
+CHECKPOINT_CACHE_MAX_THREADS = int(os.getenv("CHECKPOINT_CACHE_MAX_THREADS", "0"))
+CHECKPOINT_CACHE_TTL_SECONDS = float(os.getenv("CHECKPOINT_CACHE_TTL_SECONDS", "300"))
 
 
 class MemoryManager:
-    """Memory Manager 单例类"""
+    """
+    Memory Manager 单例类
+
+    初始化（建连、建 schema/表、创建连接池）应在服务启动时通过 ainit() 完成：
+    - 全程异步，不阻塞事件循环
+    - 进程内 single-flight，并发调用只会执行一次
+    - 建表时持有 Postgres advisory lock，多进程/多副本同时启动也只有一个在执行 DDL
+    get_checkpointer() 不做阻塞初始化：启动初始化未完成时返回临时 MemorySaver，没有事件循环时使用内存兜底。
+    """
 
     _instance: Optional['MemoryManager'] = None
-    _checkpointer: Optional[Union[AsyncPostgresSaver, MemorySaver]] = None
+    _checkpointer: Optional[Union[CachedCheckpointSaver, AsyncPostgresSaver, MemorySaver]] = None
     _pool: Optional[AsyncConnectionPool] = None
     _setup_done: bool = False
+    _init_task: Optional[asyncio.Task] = None
+    _sync_lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def _connect_with_retry(self, db_url: str) -> Optional[psycopg.Connection]:
-        """带重试的数据库连接，每次 15 秒超时，共尝试 2 次"""
+    async def _aconnect_with_retry(self, db_url: str) -> Optional[psycopg.AsyncConnection]:
+        """异步版本的带重试数据库连接"""
         last_error = None
         for attempt in range(1, DB_MAX_RETRIES + 1):
             try:
-                logger.info(f"Attempting database connection (attempt {attempt}/{DB_MAX_RETRIES})")
-                conn = psycopg.connect(db_url, autocommit=True, connect_timeout=DB_CONNECTION_TIMEOUT)
-                logger.info(f"Database connection established on attempt {attempt}")
+                logger.info(f"Attempting async database connection (attempt {attempt}/{DB_MAX_RETRIES})")
+                conn = await psycopg.AsyncConnection.connect(
+                    db_url, autocommit=True, connect_timeout=DB_CONNECTION_TIMEOUT
+                )
+                logger.info(f"Async database connection established on attempt {attempt}")
                 return conn
             except Exception as e:
                 last_error = e
-                logger.warning(f"Database connection attempt {attempt} failed: {e}")
+                logger.warning(f"Async database connection attempt {attempt} failed: {e}")
                 if attempt < DB_MAX_RETRIES:
-                    time.sleep(1)  # 重试前短暂等待
-        logger.error(f"All {DB_MAX_RETRIES} database connection attempts failed, last error: {last_error}")
+                    await asyncio.sleep(1)  # 重试前短暂等待
+        logger.error(f"All {DB_MAX_RETRIES} async database connection attempts failed, last error: {last_error}")
         return None
 
-    def _setup_schema_and_tables(self, db_url: str) -> bool:
-        """同步创建 schema 和表（只执行一次），返回是否成功"""
+    async def _asetup_schema_and_tables(self, db_url: str) -> bool:
+        """异步创建 schema 和表，持有 advisory lock 保证多进程间只有一个在执行 DDL"""
         if self._setup_done:
             return True
 
-        conn = self._connect_with_retry(db_url)
+        conn = await self._aconnect_with_retry(db_url)
         if conn is None:
             return False
 
         try:
-            with conn.cursor() as cur:
-                cur.execute("CREATE SCHEMA IF NOT EXISTS memory")
-            conn.execute("SET search_path TO memory")
-            PostgresSaver(conn).setup()
+            deadline = time.monotonic() + MEMORY_SETUP_LOCK_TIMEOUT
+            while not (await (await conn.execute(
+                    "SELECT pg_try_advisory_lock(%s)", (MEMORY_SETUP_LOCK_ID,))).fetchone())[0]:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"advisory lock not acquired within {MEMORY_SETUP_LOCK_TIMEOUT}s")
+                await asyncio.sleep(MEMORY_SETUP_LOCK_POLL_INTERVAL)
+            await conn.execute("CREATE SCHEMA IF NOT EXISTS memory")
+            await conn.execute("SET search_path TO memory")
+            await AsyncPostgresSaver(conn).setup()
             self._setup_done = True
             logger.info("Memory schema and tables created")
             return True
@@ -66,7 +109,8 @@ class MemoryManager:
             logger.warning(f"Failed to setup schema/tables: {e}")
             return False
         finally:
-            conn.close()
+            # advisory lock 是会话级的，关闭连接即释放
+            await conn.close()
 
     def _get_db_url_safe(self) -> Optional[str]:
         """安全获取 db_url，失败时返回 None"""
@@ -87,48 +131,176 @@ class MemoryManager:
         logger.warning("Using MemorySaver as fallback checkpointer (data will not persist across restarts)")
         return self._checkpointer
 
-    def get_checkpointer(self) -> BaseCheckpointSaver:
-        """获取 checkpointer，优先使用 PostgresSaver，失败时退化为 MemorySaver"""
+    @staticmethod
+    def _with_search_path(db_url: str) -> str:
+        """连接字符串加上 search_path"""
+        if "?" in db_url:
+            return f"{db_url}&options=-csearch_path%3Dmemory"
+        return f"{db_url}?options=-csearch_path%3Dmemory"
+
+    def _create_postgres_checkpointer(self, db_url: str, budget) -> BaseCheckpointSaver:
+        """创建连接池（不打开）和 AsyncPostgresSaver，需在事件循环中调用"""
+        pool = AsyncConnectionPool(
+            conninfo=self._with_search_path(db_url),
+            name="checkpointer",
+            open=False,
+            timeout=DB_CONNECTION_TIMEOUT,
+            min_size=budget.checkpoint_min_size,
+            max_size=budget.checkpoint_max_size,
+            max_idle=CHECKPOINT_POOL_MAX_IDLE,
+            max_lifetime=CHECKPOINT_POOL_MAX_LIFETIME,
+            check=AsyncConnectionPool.check_connection if CHECKPOINT_POOL_CHECK else None,
+            kwargs={
+                "autocommit": True,
+                "prepare_threshold": CHECKPOINT_POOL_PREPARE_THRESHOLD,
+            },
+        )
+        checkpointer: BaseCheckpointSaver = AsyncPostgresSaver(pool)
+        logger.info("AsyncPostgresSaver initialized successfully")
+        if CHECKPOINT_CACHE_MAX_THREADS > 0:
+            checkpointer = CachedCheckpointSaver(
+                checkpointer,
+                max_threads=CHECKPOINT_CACHE_MAX_THREADS,
+                ttl_seconds=CHECKPOINT_CACHE_TTL_SECONDS,
+            )
+            logger.info(f"Checkpoint LRU cache enabled: max_threads={CHECKPOINT_CACHE_MAX_THREADS}, ttl={CHECKPOINT_CACHE_TTL_SECONDS}s")
+        self._pool = pool
+        return checkpointer
+
+    async def ainit(self) -> BaseCheckpointSaver:
+        """启动时异步初始化 checkpointer，并发调用共享同一次初始化"""
         if self._checkpointer is not None:
             return self._checkpointer
+        # shield: 某个等待方被取消不影响初始化本身
+        return await asyncio.shield(self._start_init(asyncio.get_running_loop()))
+
+    def _start_init(self, loop: asyncio.AbstractEventLoop) -> asyncio.Task:
+        """在 loop 上启动（或复用）初始化任务，任务引用保存在 _init_task 中，避免被回收"""
+        if self._init_task is None:
+            self._init_task = loop.create_task(self._ainit())
+            self._init_task.add_done_callback(self._on_init_done)
+        return self._init_task
+
+    def _on_init_done(self, task: asyncio.Task):
+        if task.cancelled():
+            logger.warning("Checkpointer initialization was cancelled")
+            self._init_task = None
+        elif task.exception() is not None:
+            logger.error(f"Checkpointer initialization failed: {task.exception()}", exc_info=task.exception())
+            # 允许下一次 ainit / get_checkpointer 重新初始化
+            self._init_task = None
 
-        # 1. 尝试获取 db_url
-        db_url = self._get_db_url_safe()
+    async def _ainit(self) -> BaseCheckpointSaver:
+        # 1. 尝试获取 db_url（可能需要访问环境变量服务，放到线程中执行）
+        db_url = await asyncio.to_thread(self._get_db_url_safe)
         if not db_url:
             return self._create_fallback_checkpointer()
 
-        # 2. 尝试连接数据库并创建 schema/表（带重试）
-        if not self._setup_schema_and_tables(db_url):
+        # 2. 异步连接数据库并在 advisory lock 下创建 schema/表
+        if not await self._asetup_schema_and_tables(db_url):
             return self._create_fallback_checkpointer()
 
-        # 3. 连接字符串加上 search_path
-        if "?" in db_url:
-            db_url = f"{db_url}&options=-csearch_path%3Dmemory"
-        else:
-            db_url = f"{db_url}?options=-csearch_path%3Dmemory"
-
-        # 4. 尝试创建连接池和 checkpointer
+        # 3. 创建并预热连接池，完成后才对外可见
         try:
-            self._pool = AsyncConnectionPool(
-                conninfo=db_url,
-                timeout=DB_CONNECTION_TIMEOUT,
-                min_size=1,
-                max_idle=300,
-            )
-            self._checkpointer = AsyncPostgresSaver(self._pool)
-            logger.info("AsyncPostgresSaver initialized successfully")
+            from storage.database.db import get_pool_budget
+            budget = await asyncio.to_thread(get_pool_budget)
+            checkpointer = self._create_postgres_checkpointer(db_url, budget)
         except Exception as e:
             logger.warning(f"Failed to create AsyncPostgresSaver: {e}, will fallback to MemorySaver")
             return self._create_fallback_checkpointer()
-
+        try:
+            await self.open_pool()
+        except Exception as e:
+            logger.warning(f"Failed to open checkpointer pool: {e}, will fallback to MemorySaver")
+            await self._discard_pool()
+            return self._create_fallback_checkpointer()
+        self._checkpointer = checkpointer
         return self._checkpointer
 
+    def get_checkpointer(self) -> BaseCheckpointSaver:
+        """
+        获取 checkpointer，优先使用 PostgresSaver，失败时退化为 MemorySaver
+
+        不做任何阻塞的建连/建表：
+        - 在事件循环线程上调用且启动初始化（ainit）尚未完成时，在该循环上启动初始化，
+          本次返回一个临时 MemorySaver（不缓存），初始化完成后的调用拿到 PostgresSaver
+        - 没有运行中的事件循环（如命令行直接运行）时，AsyncPostgresSaver 无循环可绑定，使用内存兜底
+        """
+        if self._checkpointer is not None:
+            return self._checkpointer
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is not None:
+            self._start_init(loop)
+            logger.warning("Checkpointer initialization still in progress, using a temporary MemorySaver")
+            return MemorySaver()
+
+        with self._sync_lock:
+            if self._checkpointer is not None:
+                return self._checkpointer
+            logger.warning("No running event loop for AsyncPostgresSaver, will fallback to MemorySaver")
+            return self._create_fallback_checkpointer()
+
+    async def open_pool(self):
+        """
+        打开连接池并等待首个连接可用（启动时调用，避免首个请求承担建连开销）
+
+        不使用 open(wait=True)：psycopg_pool 在 wait 超时后会关闭连接池，且关闭后无法再次打开。
+        这里先以 wait=False 打开（连接池在后台持续建立 min_size 个连接、失败自动重连），
+        再借出一个连接验证可用，预热超时只记录日志，连接池保持打开。
+        """
+        if self._pool is None:
+            return
+        await self._pool.open(wait=False)
+        try:
+            async with self._pool.connection(timeout=CHECKPOINT_POOL_WARMUP_TIMEOUT) as conn:
+                await conn.execute("SELECT 1")
+            logger.info(f"Checkpointer pool opened: {self._pool.get_stats()}")
+        except Exception as e:
+            logger.warning(f"Checkpointer pool warm-up failed, pool keeps reconnecting in background: {e}")
+
+    async def _discard_pool(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            try:
+                await pool.close()
+            except Exception as e:
+                logger.warning(f"Failed to close checkpointer pool: {e}")
+
+    async def close_pool(self):
+        """关闭连接池"""
+        if self._pool is not None:
+            await self._pool.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """checkpointer 连接池与缓存统计"""
+        stats: Dict[str, Any] = {
+            "type": type(self._checkpointer).__name__ if self._checkpointer is not None else None,
+        }
+        if self._pool is not None:
+            stats["pool"] = self._pool.get_stats()
+        if isinstance(self._checkpointer, CachedCheckpointSaver):
+            stats["cache"] = {"enabled": True, **self._checkpointer.get_stats()}
+        else:
+            stats["cache"] = {"enabled": False}
+        return stats
+
 _memory_manager: Optional[MemoryManager] = None
 
 
 def get_memory_saver() -> BaseCheckpointSaver:
     """获取 checkpointer，优先使用 PostgresSaver，db_url 不可用或连接失败时退化为 MemorySaver"""
+    return get_memory_manager().get_checkpointer()
+
+
+def get_memory_manager() -> MemoryManager:
+    """获取 MemoryManager 单例"""
     global _memory_manager
     if _memory_manager is None:
         _memory_manager = MemoryManager()
-    return _memory_manager.get_checkpointer()
\ No newline at end of file
+    return _memory_manager
+
@@ -0,0 +1,96 @@
+"""
+签名 URL 缓存
+
+管理后台和工具返回里反复为同一批头像、医院、景点图片生成签名 URL，
+这里按 (签名端点, bucket, key) 缓存，容量有上限（LRU）：
+- 只有剩余有效期扣除 S3_PRESIGN_SAFETY_MARGIN 后仍不短于调用方要求的有效期时才复用
+- 为了让缓存能够命中，签名时在调用方要求的有效期之外多签 安全余量 + S3_PRESIGN_REUSE_WINDOW 秒，
+  同一 URL 可在 S3_PRESIGN_REUSE_WINDOW 秒内被复用；调用方拿到的 URL 有效期可能长于请求值
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# 距离签名过期不足多少秒时不再复用
+S3_PRESIGN_SAFETY_MARGIN = float(os.getenv("S3_PRESIGN_SAFETY_MARGIN", "300"))
+# 最多缓存的 URL 数
+S3_PRESIGN_CACHE_SIZE = int(os.getenv("S3_PRESIGN_CACHE_SIZE", "10000"))
+# 签名 URL 可被复用的时长（秒），签名时额外延长的有效期
+S3_PRESIGN_REUSE_WINDOW = int(os.getenv("S3_PRESIGN_REUSE_WINDOW", "600"))
+
+CacheKey = Tuple[str, str, str]
+
+
+class PresignedUrlCache:
+    """线程安全的签名 URL LRU 缓存"""
+
+    def __init__(self, max_size: int = S3_PRESIGN_CACHE_SIZE, safety_margin: float = S3_PRESIGN_SAFETY_MARGIN,
+                 reuse_window: int = S3_PRESIGN_REUSE_WINDOW):
+        self.max_size = max_size
+        self.safety_margin = safety_margin
+        self.reuse_window = reuse_window
+        # key -> (url, 过期时间 time.monotonic())
+        self._entries: "OrderedDict[CacheKey, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: CacheKey, expire_time: int) -> Optional[str]:
+        """
+        命中条件：URL 的剩余有效期扣除安全余量后，仍不短于本次请求的有效期
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                url, expires_at = entry
+                if time.monotonic() + expire_time <= expires_at - self.safety_margin:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return url
+                del self._entries[key]
+            self.stats["misses"] += 1
+            return None
+
+    def signing_lifetime(self, expire_time: int) -> int:
+        """向签名服务申请的有效期：缓存关闭时与请求值一致"""
+        if self.max_size <= 0 or self.reuse_window <= 0:
+            return expire_time
+        return int(expire_time + self.safety_margin + self.reuse_window)
+
+    def put(self, key: CacheKey, url: str, expire_time: int, signed_at: float):
+        """expire_time 为实际签名的有效期；signed_at 为发起签名请求前的 time.monotonic()，保守估计过期时间"""
+        if self.max_size <= 0 or expire_time <= self.safety_margin:
+            return
+        with self._lock:
+            self._entries[key] = (url, signed_at + expire_time)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "safety_margin": self.safety_margin,
+                "reuse_window": self.reuse_window,
+            }
+
+
+_presign_cache: Optional[PresignedUrlCache] = None
+_presign_cache_lock = threading.Lock()
+
+
+def get_presign_cache() -> PresignedUrlCache:
+    """进程内共享的签名 URL 缓存，S3SyncStorage 各实例共用"""
+    global _presign_cache
+    if _presign_cache is None:
+        with _presign_cache_lock:
+            if _presign_cache is None:
+                _presign_cache = PresignedUrlCache()
+    return _presign_cache
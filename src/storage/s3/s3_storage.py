@@ -1,18 +1,33 @@
+import asyncio
+import io
 import os
 import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Any, Dict, List, TypedDict, Iterable
+from typing import Optional, Any, Dict, List, TypedDict, Iterable, Iterator
 from uuid import uuid4
 
 import boto3
 from botocore.exceptions import ClientError
 from boto3.s3.transfer import TransferConfig
 import logging
+
+from storage.s3.token_cache import AccessTokenCache, get_storage_token_cache
+from storage.s3.presign_cache import CacheKey, get_presign_cache
 logger = logging.getLogger(__name__)
 
 # 允许的文件名字符集（面向用户输入的约束）
 FILE_NAME_ALLOWED_RE = re.compile(r"^[A-Za-z0-9._\-/]+$")
 
+# 并发传输：分片大小（代理层限制单片 5MB 左右）、并发数、触发分片的阈值
+S3_TRANSFER_PART_SIZE = int(os.getenv("S3_TRANSFER_PART_SIZE", str(5 * 1024 * 1024)))
+S3_TRANSFER_CONCURRENCY = int(os.getenv("S3_TRANSFER_CONCURRENCY", "4"))
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", str(5 * 1024 * 1024)))
+# delete_objects 单次最多 1000 个 key
+S3_DELETE_BATCH_SIZE = 1000
+
 
 class ListFilesResult(TypedDict):
     # list_files 的返回结构类型
@@ -20,16 +35,24 @@ class ListFilesResult(TypedDict):
     is_truncated: bool
     next_continuation_token: Optional[str]
 
+class DeleteFilesResult(TypedDict):
+    # delete_files 的返回结构类型
+    deleted: List[str]
+    errors: List[Dict[str, str]]
+
 class S3SyncStorage:
     """S3兼容存储实现"""
 
-    def __init__(self, *, endpoint_url: Optional[str] = None, access_key: str, secret_key: str, bucket_name: str, region: str = "cn-beijing"):
+    def __init__(self, *, endpoint_url: Optional[str] = None, access_key: str, secret_key: str, bucket_name: str, region: str = "cn-beijing",
+                 token_cache: Optional[AccessTokenCache] = None):
         self.endpoint_url = os.environ.get("COZE_BUCKET_ENDPOINT_URL") or endpoint_url or ''
         self.access_key = access_key
         self.secret_key = secret_key
         self.bucket_name = bucket_name
         self.region = region
         self._client = None
+        # x-storage-token 缓存，默认进程内共享；测试时可传入使用桩 provider 的实例
+        self._token_cache = token_cache or get_storage_token_cache()
 
     def _get_client(self):
         if self._client is None:
@@ -63,16 +86,7 @@ class S3SyncStorage:
             # 注册 before-call 钩子，发送前注入 x-storage-token 头
             def _inject_header(**kwargs):
                 try:
-                    from coze_workload_identity import Client as CozeClient
-                    coze_client = CozeClient()
-                    try:
-                        token = coze_client.get_access_token()
-                    except Exception as e:
-                        logger.error("Error loading COZE_WORKLOAD_IDENTITY_TOKEN: %s", e)
-                        token = None
-                        raise e
-                    finally:
-                        coze_client.close()
+                    token = self._token_cache.get()
                     params = kwargs.get("params", {})
                     headers = params.setdefault("headers", {})
                     headers["x-storage-token"] = token
@@ -152,6 +166,33 @@ class S3SyncStorage:
             logger.error(self._error_msg("Error uploading file to S3", e))
             raise e
 
+    def delete_files(self, *, file_keys: Iterable[str], bucket: Optional[str] = None) -> DeleteFilesResult:
+        """批量删除，按 1000 个一批调用 delete_objects；返回已删除的 key 和删除失败的 key/原因"""
+        try:
+            client = self._get_client()
+            target_bucket = self._resolve_bucket(bucket)
+            keys = list(dict.fromkeys(file_keys))
+            result: DeleteFilesResult = {"deleted": [], "errors": []}
+            for i in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+                batch = keys[i:i + S3_DELETE_BATCH_SIZE]
+                resp = client.delete_objects(
+                    Bucket=target_bucket,
+                    Delete={"Objects": [{"Key": k} for k in batch], "Quiet": True},
+                )
+                errors = resp.get("Errors", []) or []
+                failed = {err.get("Key") for err in errors}
+                result["deleted"].extend(k for k in batch if k not in failed)
+                result["errors"].extend(
+                    {"key": err.get("Key", ""), "code": err.get("Code", ""), "message": err.get("Message", "")}
+                    for err in errors
+                )
+            if result["errors"]:
+                logger.error(f"Failed to delete {len(result['errors'])} of {len(keys)} files from S3: {result['errors'][:5]}")
+            return result
+        except Exception as e:
+            logger.error(self._error_msg("Error batch deleting files from S3", e))
+            raise e
+
     def delete_file(self, *, file_key: str, bucket: Optional[str] = None) -> bool:
         try:
             client = self._get_client()
@@ -198,6 +239,128 @@ class S3SyncStorage:
             logger.error(self._error_msg("Error reading file from S3", e))
             raise e
 
+    def _transfer_config(self, *, part_size: Optional[int] = None, max_concurrency: Optional[int] = None) -> TransferConfig:
+        part_size = part_size or S3_TRANSFER_PART_SIZE
+        max_concurrency = max_concurrency or S3_TRANSFER_CONCURRENCY
+        return TransferConfig(
+            multipart_chunksize=part_size,
+            multipart_threshold=max(part_size, S3_MULTIPART_THRESHOLD),
+            max_concurrency=max_concurrency,
+            use_threads=max_concurrency > 1,
+        )
+
+    def download_file(self, *, file_key: str, dest_path: str, bucket: Optional[str] = None,
+                      part_size: Optional[int] = None, max_concurrency: Optional[int] = None) -> str:
+        """下载到本地文件；大文件按 part_size 分段并发 Range GET，直接写入目标文件"""
+        try:
+            client = self._get_client()
+            target_bucket = self._resolve_bucket(bucket)
+            config = self._transfer_config(part_size=part_size, max_concurrency=max_concurrency)
+            client.download_file(Bucket=target_bucket, Key=file_key, Filename=dest_path, Config=config)
+            return dest_path
+        except Exception as e:
+            logger.error(self._error_msg("Error downloading file from S3", e))
+            raise e
+
+    def _get_range(self, client, bucket: str, key: str, start: int, end: int, etag: Optional[str]) -> bytes:
+        kwargs: Dict[str, Any] = {"Bucket": bucket, "Key": key, "Range": f"bytes={start}-{end}"}
+        if etag:
+            # 下载过程中对象被覆盖时直接失败，避免拼出新旧混合的内容
+            kwargs["IfMatch"] = etag
+        body = client.get_object(**kwargs)["Body"]
+        try:
+            return body.read()
+        finally:
+            body.close()
+
+    def iter_file_parallel(self, *, file_key: str, bucket: Optional[str] = None,
+                           part_size: Optional[int] = None, max_concurrency: Optional[int] = None) -> Iterator[bytes]:
+        """
+        并发 Range GET，按顺序逐段产出内容
+        同时在途的分段不超过 max_concurrency 个，内存占用约为 max_concurrency * part_size
+        """
+        part_size = part_size or S3_TRANSFER_PART_SIZE
+        max_concurrency = max_concurrency or S3_TRANSFER_CONCURRENCY
+        client = self._get_client()
+        target_bucket = self._resolve_bucket(bucket)
+        try:
+            head = client.head_object(Bucket=target_bucket, Key=file_key)
+        except Exception as e:
+            logger.error(self._error_msg("Error reading file from S3", e))
+            raise e
+        size = int(head.get("ContentLength", 0))
+        etag = head.get("ETag")
+        ranges = iter([(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)])
+
+        pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3-range-get")
+        pending = deque()
+        try:
+            for start, end in ranges:
+                pending.append(pool.submit(self._get_range, client, target_bucket, file_key, start, end, etag))
+                if len(pending) >= max_concurrency:
+                    break
+            while pending:
+                data = pending.popleft().result()
+                nxt = next(ranges, None)
+                if nxt is not None:
+                    pending.append(pool.submit(self._get_range, client, target_bucket, file_key, nxt[0], nxt[1], etag))
+                yield data
+        except Exception as e:
+            logger.error(self._error_msg("Error reading file from S3", e))
+            raise e
+        finally:
+            # 调用方提前停止迭代时取消尚未开始的分段
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def iter_file(self, *, file_key: str, bucket: Optional[str] = None, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """
+        流式读取对象，逐块产出，内存占用与文件大小无关
+        可直接交给 FastAPI StreamingResponse 或增量解析器
+        """
+        try:
+            client = self._get_client()
+            target_bucket = self._resolve_bucket(bucket)
+            resp = client.get_object(Bucket=target_bucket, Key=file_key)
+        except Exception as e:
+            logger.error(self._error_msg("Error reading file from S3", e))
+            raise e
+        body = resp.get("Body")
+        if body is None:
+            raise RuntimeError("S3 get_object returned no Body")
+        try:
+            yield from body.iter_chunks(chunk_size=chunk_size)
+        except Exception as e:
+            logger.error(self._error_msg("Error reading file from S3", e))
+            raise e
+        finally:
+            try:
+                body.close()
+            except Exception as ce:
+                logger.debug("Failed to close S3 response body: %s", ce)
+
+    def open_file(self, *, file_key: str, bucket: Optional[str] = None, buffer_size: int = 1024 * 1024) -> io.BufferedReader:
+        """
+        以只读、可 seek 的文件对象打开对象：每次读取按需发起 Range GET，
+        pypdf 等需要随机访问的解析器可以只读取用到的部分
+        """
+        try:
+            client = self._get_client()
+            target_bucket = self._resolve_bucket(bucket)
+            head = client.head_object(Bucket=target_bucket, Key=file_key)
+        except Exception as e:
+            logger.error(self._error_msg("Error opening file from S3", e))
+            raise e
+        raw = S3ObjectReader(
+            storage=self,
+            bucket=target_bucket,
+            key=file_key,
+            size=int(head.get("ContentLength", 0)),
+            etag=head.get("ETag"),
+        )
+        return io.BufferedReader(raw, buffer_size=buffer_size)
+
     def list_files(self, *, prefix: Optional[str] = None, bucket: Optional[str] = None, max_keys: int = 1000, continuation_token: Optional[str] = None) -> ListFilesResult:
         """列出对象，支持前缀过滤与分页；返回 keys/is_truncated/next_continuation_token。"""
         try:
@@ -231,20 +394,70 @@ class S3SyncStorage:
             raise e
 
     def generate_presigned_url(self, *, key: str, bucket: Optional[str] = None, expire_time: int = 1800) -> str:
-        """通过 S3 Proxy 生成签名 URL。"""
+        """通过 S3 Proxy 生成签名 URL；同一对象的签名 URL 在过期前（留出安全余量）直接复用。"""
+        cache_key = self._presign_cache_key(key, bucket)
+        if cache_key is not None:
+            url = get_presign_cache().get(cache_key, expire_time)
+            if url is not None:
+                return url
+        return self._sign_and_cache(cache_key, key=key, bucket=bucket, expire_time=expire_time)
+
+    def generate_presigned_urls(self, *, keys: Iterable[str], bucket: Optional[str] = None, expire_time: int = 1800,
+                                max_concurrency: Optional[int] = None) -> Dict[str, str]:
+        """批量生成签名 URL，返回 key -> url；缓存未命中的 key 并发请求签名服务"""
+        cache = get_presign_cache()
+        result: Dict[str, str] = {}
+        misses = []
+        for key in dict.fromkeys(keys):
+            cache_key = self._presign_cache_key(key, bucket)
+            url = cache.get(cache_key, expire_time) if cache_key is not None else None
+            if url is not None:
+                result[key] = url
+            else:
+                misses.append((cache_key, key))
+        if not misses:
+            return result
+
+        def _sign(item):
+            return self._sign_and_cache(item[0], key=item[1], bucket=bucket, expire_time=expire_time)
+
+        workers = min(len(misses), max_concurrency or S3_TRANSFER_CONCURRENCY)
+        if workers <= 1:
+            urls = [_sign(item) for item in misses]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s3-presign") as pool:
+                urls = list(pool.map(_sign, misses))
+        for (_, key), url in zip(misses, urls):
+            result[key] = url
+        return result
+
+    def _presign_cache_key(self, key: str, bucket: Optional[str]) -> Optional[CacheKey]:
+        try:
+            sign_base = os.environ.get("COZE_BUCKET_ENDPOINT_URL") or self.endpoint_url
+            return (sign_base, self._resolve_bucket(bucket), key)
+        except Exception:
+            # 配置缺失时不走缓存，由 _sign_url 抛出具体错误
+            return None
+
+    def _sign_and_cache(self, cache_key: Optional[CacheKey], *, key: str, bucket: Optional[str], expire_time: int) -> str:
+        if cache_key is None:
+            return self._sign_url(key=key, bucket=bucket, expire_time=expire_time)
+        cache = get_presign_cache()
+        # 多签一段有效期，URL 才能在之后的请求中满足剩余有效期要求而被复用
+        lifetime = cache.signing_lifetime(expire_time)
+        signed_at = time.monotonic()
+        url = self._sign_url(key=key, bucket=bucket, expire_time=lifetime)
+        # 签名服务返回非 URL 文本时不缓存
+        if url.startswith(("http://", "https://")):
+            cache.put(cache_key, url, lifetime, signed_at)
+        return url
+
+    def _sign_url(self, *, key: str, bucket: Optional[str] = None, expire_time: int = 1800) -> str:
+        """请求签名服务生成签名 URL（不经过缓存）"""
         import json
         import urllib.request as urllib_request
         try:
-            from coze_workload_identity import Client as CozeClient
-            coze_client = CozeClient()
-            try:
-                token = coze_client.get_access_token()
-            finally:
-                try:
-                    coze_client.close()
-                except Exception:
-                    # 资源释放失败不影响后续流程
-                    pass
+            token = self._token_cache.get()
         except Exception as e:
             logger.error(f"Error loading x-storage-token: {e}")
             raise RuntimeError(f"获取 x-storage-token 失败: {e}")
@@ -331,6 +544,29 @@ class S3SyncStorage:
             logger.error(self._error_msg("Error streaming upload (fileobj) to S3", e))
             raise e
 
+    def multipart_upload_file(
+            self,
+            *,
+            fileobj,
+            file_name: str,
+            content_type: str = "application/octet-stream",
+            bucket: Optional[str] = None,
+            part_size: Optional[int] = None,
+            max_concurrency: Optional[int] = None,
+    ) -> str:
+        """并发分片上传（文件对象），分片大小和并发数默认取 S3_TRANSFER_PART_SIZE / S3_TRANSFER_CONCURRENCY"""
+        config = self._transfer_config(part_size=part_size, max_concurrency=max_concurrency)
+        return self.stream_upload_file(
+            fileobj=fileobj,
+            file_name=file_name,
+            content_type=content_type,
+            bucket=bucket,
+            multipart_chunksize=config.multipart_chunksize,
+            multipart_threshold=config.multipart_threshold,
+            max_concurrency=config.max_request_concurrency,
+            use_threads=config.use_threads,
+        )
+
     def upload_from_url(
             self,
             *,
@@ -422,3 +658,107 @@ class S3SyncStorage:
             except Exception as ae:
                 logger.error(self._error_msg("abort_multipart_upload failed", ae))
             raise e
+
+
+class S3ObjectReader(io.RawIOBase):
+    """S3 对象的随机访问读取器，readinto 对应一次 Range GET，一般包在 BufferedReader 中使用"""
+
+    def __init__(self, *, storage: S3SyncStorage, bucket: str, key: str, size: int, etag: Optional[str] = None):
+        self.storage = storage
+        self.bucket = bucket
+        self.key = key
+        self.size = size
+        self.etag = etag
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def _read_range(self, start: int, length: int) -> bytes:
+        try:
+            return self.storage._get_range(
+                self.storage._get_client(), self.bucket, self.key, start, start + length - 1, self.etag
+            )
+        except Exception as e:
+            logger.error(self.storage._error_msg("Error reading file range from S3", e))
+            raise e
+
+    def readinto(self, b) -> int:
+        length = min(len(b), self.size - self._pos)
+        if length <= 0:
+            return 0
+        data = self._read_range(self._pos, length)
+        n = len(data)
+        b[:n] = data
+        self._pos += n
+        return n
+
+    def readall(self) -> bytes:
+        # 默认实现按 8KB 循环 readinto，这里一次取完剩余部分
+        if self._pos >= self.size:
+            return b""
+        data = self._read_range(self._pos, self.size - self._pos)
+        self._pos += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError(f"negative seek position {pos}")
+        self._pos = pos
+        return pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+class S3AsyncStorage:
+    """
+    S3SyncStorage 的异步门面：boto3 是同步客户端，调用放到线程中执行，不阻塞事件循环
+    """
+
+    def __init__(self, storage: S3SyncStorage):
+        self.storage = storage
+
+    async def _run(self, func, **kwargs):
+        return await asyncio.to_thread(func, **kwargs)
+
+    async def upload_file(self, **kwargs) -> str:
+        return await self._run(self.storage.upload_file, **kwargs)
+
+    async def multipart_upload_file(self, **kwargs) -> str:
+        return await self._run(self.storage.multipart_upload_file, **kwargs)
+
+    async def read_file(self, **kwargs) -> bytes:
+        return await self._run(self.storage.read_file, **kwargs)
+
+    async def download_file(self, **kwargs) -> str:
+        return await self._run(self.storage.download_file, **kwargs)
+
+    async def file_exists(self, **kwargs) -> bool:
+        return await self._run(self.storage.file_exists, **kwargs)
+
+    async def delete_file(self, **kwargs) -> bool:
+        return await self._run(self.storage.delete_file, **kwargs)
+
+    async def delete_files(self, **kwargs) -> DeleteFilesResult:
+        return await self._run(self.storage.delete_files, **kwargs)
+
+    async def list_files(self, **kwargs) -> ListFilesResult:
+        return await self._run(self.storage.list_files, **kwargs)
+
+    async def generate_presigned_url(self, **kwargs) -> str:
+        return await self._run(self.storage.generate_presigned_url, **kwargs)
+
+    async def generate_presigned_urls(self, **kwargs) -> Dict[str, str]:
+        return await self._run(self.storage.generate_presigned_urls, **kwargs)
@@ -0,0 +1,222 @@
+"""
+对象存储 x-storage-token 缓存
+
+S3SyncStorage 每次 S3 调用、每次生成签名 URL 都要带上 workload identity 的 access token：
+- token 缓存在进程内，过期前 S3_TOKEN_REFRESH_AHEAD 秒起由后台线程提前刷新，请求路径不等待
+- 已过期（或首次获取）时同步刷新，并发请求只有一个真正去取 token（single-flight），其余等待结果
+- 后台刷新失败时按指数退避推迟下一次刷新，旧 token 到期前不会每个请求都再拉起一次刷新
+- token 提供方可替换，测试时传入本地桩函数即可
+"""
+import functools
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 距离过期多少秒开始后台刷新
+S3_TOKEN_REFRESH_AHEAD = float(os.getenv("S3_TOKEN_REFRESH_AHEAD", "300"))
+# 提供方拿不到有效期时使用的默认有效期（秒）
+S3_TOKEN_DEFAULT_TTL = float(os.getenv("S3_TOKEN_DEFAULT_TTL", "3600"))
+# 后台刷新失败后的重试间隔（秒），连续失败时翻倍，不超过上限
+S3_TOKEN_RETRY_BACKOFF = float(os.getenv("S3_TOKEN_RETRY_BACKOFF", "5"))
+S3_TOKEN_RETRY_BACKOFF_MAX = float(os.getenv("S3_TOKEN_RETRY_BACKOFF_MAX", "60"))
+
+# 已核对过 TokenCache 内部结构（_lock、_cache["access_token"]["expires_at"]）的 SDK 版本
+_SDK_TOKEN_CACHE_VERSIONS = ("0.1.4",)
+_SDK_ACCESS_TOKEN_KEY = "access_token"
+
+# 返回 (token, 剩余有效秒数)
+TokenProvider = Callable[[], Tuple[str, float]]
+
+
+@functools.lru_cache(maxsize=None)
+def _sdk_token_cache() -> Optional[Any]:
+    """
+    SDK 的进程级 token 缓存，只在已核对过的版本上返回，否则返回 None（只告警一次）
+
+    这里访问的是 SDK 私有字段，版本不在 _SDK_TOKEN_CACHE_VERSIONS 中或结构不符时不做任何操作，
+    此时 SDK 缓存不会被提前清理，有效期按 S3_TOKEN_DEFAULT_TTL 计算
+    """
+    try:
+        from importlib.metadata import version
+        from coze_workload_identity.client import get_global_token_cache
+        sdk_version = version("coze-workload-identity")
+        sdk_cache = get_global_token_cache()
+    except Exception as e:
+        logger.warning(f"coze_workload_identity token cache unavailable, storage token uses default TTL: {e}")
+        return None
+    if (
+            sdk_version not in _SDK_TOKEN_CACHE_VERSIONS
+            or not isinstance(getattr(sdk_cache, "_cache", None), dict)
+            or getattr(sdk_cache, "_lock", None) is None
+    ):
+        logger.warning(f"Unverified coze_workload_identity {sdk_version}, storage token uses default TTL")
+        return None
+    return sdk_cache
+
+
+def _sdk_evict_access_token():
+    sdk_cache = _sdk_token_cache()
+    if sdk_cache is not None:
+        with sdk_cache._lock:
+            sdk_cache._cache.pop(_SDK_ACCESS_TOKEN_KEY, None)
+
+
+def _sdk_access_token_expires_at() -> Optional[float]:
+    """SDK 缓存项中的过期时间（time.time()），取不到时返回 None"""
+    sdk_cache = _sdk_token_cache()
+    if sdk_cache is None:
+        return None
+    with sdk_cache._lock:
+        entry = sdk_cache._cache.get(_SDK_ACCESS_TOKEN_KEY)
+    expires_at = entry.get("expires_at") if isinstance(entry, dict) else None
+    return float(expires_at) if isinstance(expires_at, (int, float)) else None
+
+
+def coze_access_token_provider() -> Tuple[str, float]:
+    """
+    通过 coze_workload_identity 获取 access token
+
+    SDK 自带的进程级缓存只在 token 过期后才换新，提前刷新时先清掉它的缓存项，
+    换到新 token 后再从缓存项里读出过期时间
+    """
+    from coze_workload_identity import Client as CozeClient
+    _sdk_evict_access_token()
+
+    coze_client = CozeClient()
+    try:
+        token = coze_client.get_access_token()
+    finally:
+        try:
+            coze_client.close()
+        except Exception:
+            # 资源释放失败不影响后续流程
+            pass
+
+    expires_at = _sdk_access_token_expires_at()
+    return token, (expires_at - time.time()) if expires_at else S3_TOKEN_DEFAULT_TTL
+
+
+class AccessTokenCache:
+    """带提前刷新和 single-flight 的 token 缓存，线程安全"""
+
+    def __init__(self, provider: TokenProvider = coze_access_token_provider,
+                 refresh_ahead: float = S3_TOKEN_REFRESH_AHEAD,
+                 retry_backoff: float = S3_TOKEN_RETRY_BACKOFF,
+                 retry_backoff_max: float = S3_TOKEN_RETRY_BACKOFF_MAX):
+        self.provider = provider
+        self.refresh_ahead = refresh_ahead
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self._consecutive_failures = 0
+        self._token: Optional[str] = None
+        self._expires_at = 0.0  # time.monotonic()
+        self._refresh_at = 0.0
+        # 持有 _refresh_lock 的线程负责刷新，其余线程等锁后直接复用刷新结果
+        self._refresh_lock = threading.Lock()
+        self._background_refreshing = False
+        self._state_lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "sync_refreshes": 0,
+            "background_refreshes": 0,
+            "waited": 0,
+            "failures": 0,
+            "last_refresh_ms": 0.0,
+        }
+
+    def get(self) -> str:
+        token, expires_at = self._token, self._expires_at
+        now = time.monotonic()
+        if token is not None and now < expires_at:
+            self.stats["hits"] += 1
+            if now >= self._refresh_at:
+                self._start_background_refresh()
+            return token
+        return self._refresh_sync()
+
+    def _refresh_sync(self) -> str:
+        with self._refresh_lock:
+            # 等锁期间其他线程可能已经刷新完成
+            if self._token is not None and time.monotonic() < self._expires_at:
+                self.stats["waited"] += 1
+                return self._token
+            self.stats["sync_refreshes"] += 1
+            return self._fetch()
+
+    def _start_background_refresh(self):
+        with self._state_lock:
+            if self._background_refreshing:
+                return
+            self._background_refreshing = True
+        threading.Thread(target=self._background_refresh, name="s3-token-refresh", daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            with self._refresh_lock:
+                # 同步刷新可能已经抢先完成
+                if self._token is not None and time.monotonic() < self._refresh_at:
+                    return
+                self.stats["background_refreshes"] += 1
+                self._fetch()
+        except Exception as e:
+            # 旧 token 仍然有效，退避一段时间后再后台重试，到期后由同步刷新兜底
+            delay = self._backoff()
+            logger.warning(f"Background refresh of storage token failed, retrying in {delay}s: {e}")
+        finally:
+            with self._state_lock:
+                self._background_refreshing = False
+
+    def _backoff(self) -> float:
+        """推迟下一次后台刷新，返回退避秒数"""
+        with self._state_lock:
+            delay = min(self.retry_backoff * (2 ** (self._consecutive_failures - 1)), self.retry_backoff_max)
+            self._refresh_at = time.monotonic() + delay
+        return delay
+
+    def _fetch(self) -> str:
+        # 调用方持有 _refresh_lock
+        start = time.perf_counter()
+        try:
+            token, ttl = self.provider()
+        except Exception:
+            with self._state_lock:
+                self.stats["failures"] += 1
+                self._consecutive_failures += 1
+            raise
+        self.stats["last_refresh_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        ttl = max(0.0, ttl)
+        now = time.monotonic()
+        with self._state_lock:
+            self._consecutive_failures = 0
+            self._token = token
+            self._expires_at = now + ttl
+            # 有效期很短的 token 最多提前一半有效期刷新，避免持续触发后台刷新
+            self._refresh_at = now + ttl - min(self.refresh_ahead, ttl / 2)
+        return token
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "cached": self._token is not None,
+            "consecutive_failures": self._consecutive_failures,
+            "expires_in": round(max(0.0, self._expires_at - time.monotonic()), 1) if self._token else 0.0,
+            "refresh_ahead": self.refresh_ahead,
+        }
+
+
+_storage_token_cache: Optional[AccessTokenCache] = None
+_storage_token_cache_lock = threading.Lock()
+
+
+def get_storage_token_cache() -> AccessTokenCache:
+    """进程内共享的 x-storage-token 缓存"""
+    global _storage_token_cache
+    if _storage_token_cache is None:
+        with _storage_token_cache_lock:
+            if _storage_token_cache is None:
+                _storage_token_cache = AccessTokenCache()
+    return _storage_token_cache
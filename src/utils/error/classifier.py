@@ -4,9 +4,12 @@
 
 import logging
 import re
-from collections import defaultdict
-from dataclasses import dataclass, field
-from typing import Optional, Dict, Any, List
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Deque, Tuple
 
 from .codes import ErrorCategory, get_error_description
 from .exceptions import VibeCodingError, classify_error
@@ -41,24 +44,150 @@ class ErrorInfo:
         }
 
 
-@dataclass
+class _CounterShards:
+    """
+    按线程分片的计数器
+
+    每个线程只写自己的分片，写入不加锁；读取时合并各分片的副本（dict.copy 在 GIL 下是原子的）。
+    已退出线程的分片在读取时、以及新增分片使分片数达到阈值时并入公共分片，
+    避免每个请求新建的线程让分片无限增长（即使 /metrics 从不被读取）。
+    """
+
+    # 分片数达到该值时在新增分片时清理一次，之后阈值取存活分片数的两倍（均摊开销）
+    PRUNE_THRESHOLD = 64
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[Tuple["weakref.ref[threading.Thread]", Dict[Any, int]]] = []
+        self._retired: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+        self._prune_at = self.PRUNE_THRESHOLD
+
+    def _shard(self) -> Dict[Any, int]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+                if len(self._shards) >= self._prune_at:
+                    self._prune()
+                    self._prune_at = max(self.PRUNE_THRESHOLD, 2 * len(self._shards))
+        return shard
+
+    def _prune(self):
+        """把已退出线程的分片并入公共分片，调用方持有 self._lock"""
+        keep = []
+        for ref, shard in self._shards:
+            thread = ref()
+            if thread is None or not thread.is_alive():
+                for k, v in shard.copy().items():
+                    self._retired[k] = self._retired.get(k, 0) + v
+            else:
+                keep.append((ref, shard))
+        self._shards = keep
+
+    def incr(self, key: Any, n: int = 1):
+        shard = self._shard()
+        shard[key] = shard.get(key, 0) + n
+
+    def snapshot(self) -> Dict[Any, int]:
+        with self._lock:
+            self._prune()
+            alive = [shard for _, shard in self._shards]
+            merged = dict(self._retired)
+        for shard in alive:
+            for k, v in shard.copy().items():
+                merged[k] = merged.get(k, 0) + v
+        return merged
+
+
 class ErrorStats:
-    """错误统计结构"""
-    total_count: int = 0
-    by_category: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
-    by_code: Dict[int, int] = field(default_factory=lambda: defaultdict(int))
-    by_node: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
-    recent_errors: List[ErrorInfo] = field(default_factory=list)
+    """
+    错误统计结构（线程安全）
 
-    def to_dict(self) -> Dict[str, Any]:
+    计数器按线程分片，最近错误用定长 deque 作为环形缓冲，snapshot() 返回某一时刻的只读副本。
+    """
+
+    # 计数器的 key: ("total", None) / ("category", name) / ("code", code) / ("node", name)
+    def __init__(self, max_recent_errors: int = 100, window_seconds: float = 60.0, max_window_events: int = 10000):
+        self.started_at = time.time()
+        self.window_seconds = window_seconds
+        self._counters = _CounterShards()
+        self._recent_errors: Deque[ErrorInfo] = deque(maxlen=max_recent_errors)
+        # 滑动窗口内的错误事件 (时间戳, 错误码, 大类, 节点)，用于计算近期错误率
+        self._window_events: Deque[Tuple[float, int, str, str]] = deque(maxlen=max_window_events)
+
+    def record(self, error_info: ErrorInfo):
+        counters = self._counters
+        counters.incr(("total", None))
+        counters.incr(("category", error_info.category_name))
+        counters.incr(("code", error_info.code))
+        if error_info.node_name:
+            counters.incr(("node", error_info.node_name))
+        self._recent_errors.append(error_info)
+        self._window_events.append(
+            (time.time(), error_info.code, error_info.category_name, error_info.node_name)
+        )
+
+    @property
+    def total_count(self) -> int:
+        return self._counters.snapshot().get(("total", None), 0)
+
+    @property
+    def by_category(self) -> Dict[str, int]:
+        return self._group(self._counters.snapshot(), "category")
+
+    @property
+    def by_code(self) -> Dict[int, int]:
+        return self._group(self._counters.snapshot(), "code")
+
+    @property
+    def by_node(self) -> Dict[str, int]:
+        return self._group(self._counters.snapshot(), "node")
+
+    @property
+    def recent_errors(self) -> List[ErrorInfo]:
+        return list(self._recent_errors.copy())
+
+    @staticmethod
+    def _group(counts: Dict[Tuple[str, Any], int], kind: str) -> Dict[Any, int]:
+        return {key: v for (k, key), v in counts.items() if k == kind}
+
+    def snapshot(self, recent: int = 10) -> Dict[str, Any]:
+        """获取统计快照：累计计数、窗口内错误率（次/分钟）和最近的错误"""
+        counts = self._counters.snapshot()
+        now = time.time()
+        cutoff = now - self.window_seconds
+        window = [e for e in self._window_events.copy() if e[0] >= cutoff]
+        per_min = 60.0 / self.window_seconds
+        window_by_code: Dict[str, float] = {}
+        window_by_category: Dict[str, float] = {}
+        window_by_node: Dict[str, float] = {}
+        for _, code, category, node in window:
+            window_by_code[str(code)] = window_by_code.get(str(code), 0) + per_min
+            window_by_category[category] = window_by_category.get(category, 0) + per_min
+            if node:
+                window_by_node[node] = window_by_node.get(node, 0) + per_min
+        recent_errors = self._recent_errors.copy()
         return {
-            "total_count": self.total_count,
-            "by_category": dict(self.by_category),
-            "by_code": {str(k): v for k, v in self.by_code.items()},
-            "by_node": dict(self.by_node),
-            "recent_errors": [e.to_dict() for e in self.recent_errors[-10:]],  # 最近10个错误
+            "total_count": counts.get(("total", None), 0),
+            "uptime_seconds": round(now - self.started_at, 1),
+            "by_category": self._group(counts, "category"),
+            "by_code": {str(k): v for k, v in self._group(counts, "code").items()},
+            "by_node": self._group(counts, "node"),
+            "rate_per_min": {
+                "window_seconds": self.window_seconds,
+                "total": round(len(window) * per_min, 2),
+                "by_category": window_by_category,
+                "by_code": window_by_code,
+                "by_node": window_by_node,
+            },
+            "recent_errors": [e.to_dict() for e in list(recent_errors)[-recent:]] if recent else [],
         }
 
+    def to_dict(self) -> Dict[str, Any]:
+        return self.snapshot()
+
 
 class ErrorClassifier:
     """
@@ -71,8 +200,8 @@ class ErrorClassifier:
     """
 
     def __init__(self, max_recent_errors: int = 100):
-        self._stats = ErrorStats()
         self._max_recent_errors = max_recent_errors
+        self._stats = ErrorStats(max_recent_errors)
 
     def classify(
             self,
@@ -175,14 +304,7 @@ class ErrorClassifier:
     ):
         """更新错误统计"""
         ctx = context or {}
-
-        self._stats.total_count += 1
-        self._stats.by_category[error.category.name] += 1
-        self._stats.by_code[error.code] += 1
-
         node_name = ctx.get("node_name", "unknown")
-        if node_name:
-            self._stats.by_node[node_name] += 1
 
         # 记录最近的错误
         error_info = ErrorInfo(
@@ -196,19 +318,19 @@ class ErrorClassifier:
             node_name=node_name,
             task_id=ctx.get("task_id", ""),
         )
-        self._stats.recent_errors.append(error_info)
-
-        # 限制最近错误数量
-        if len(self._stats.recent_errors) > self._max_recent_errors:
-            self._stats.recent_errors = self._stats.recent_errors[-self._max_recent_errors:]
+        self._stats.record(error_info)
 
     def get_stats(self) -> ErrorStats:
         """获取错误统计"""
         return self._stats
 
+    def get_stats_snapshot(self, recent: int = 10) -> Dict[str, Any]:
+        """获取错误统计快照"""
+        return self._stats.snapshot(recent)
+
     def reset_stats(self):
         """重置统计"""
-        self._stats = ErrorStats()
+        self._stats = ErrorStats(self._max_recent_errors)
 
     @staticmethod
     def parse_error_from_log(log_line: str) -> Optional[ErrorInfo]:
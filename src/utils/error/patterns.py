@@ -4,7 +4,7 @@
 统一管理所有错误关键词到错误码的映射，避免在多个函数中重复定义匹配逻辑。
 """
 
-from typing import List, Tuple, Optional
+from typing import Dict, FrozenSet, List, Tuple, Optional
 from .codes import ErrorCode
 
 
@@ -381,6 +381,68 @@ CUSTOM_EXCEPTION_PATTERNS: List[ErrorPattern] = [
 ]
 
 
+class PatternMatcher:
+    """
+    编译后的模式表
+
+    关键词在编译时统一转小写；多个模式共用的关键词（如 'typeerror:'、'失败'）每次匹配只查找一次。
+    仍按表的顺序返回第一个命中的模式，结果与逐条线性匹配一致。
+    """
+
+    def __init__(self, patterns: List[ErrorPattern]):
+        self.patterns = patterns
+        counts: Dict[str, int] = {}
+        for keywords, _, _ in patterns:
+            for kw in {kw.lower() for kw in keywords}:
+                counts[kw] = counts.get(kw, 0) + 1
+        # 每个模式: (关键词元组, 需要缓存结果的关键词, 错误码, 消息模板)
+        self._compiled: List[Tuple[Tuple[str, ...], FrozenSet[str], int, str]] = []
+        for keywords, code, msg_template in patterns:
+            lowered = tuple(dict.fromkeys(kw.lower() for kw in keywords))
+            shared = frozenset(kw for kw in lowered if counts[kw] > 1)
+            self._compiled.append((lowered, shared, code, msg_template))
+
+    def match(self, error_str: str, require_all: bool = False) -> Tuple[Optional[int], Optional[str]]:
+        error_lower = error_str.lower()
+        seen: Dict[str, bool] = {}
+        for keywords, shared, code, msg_template in self._compiled:
+            for kw in keywords:
+                if kw in shared:
+                    hit = seen.get(kw)
+                    if hit is None:
+                        hit = seen[kw] = kw in error_lower
+                else:
+                    hit = kw in error_lower
+                if hit != require_all:
+                    # 任一匹配模式下命中即可返回；全部匹配模式下有一个未命中即可跳过
+                    break
+            else:
+                if require_all:
+                    return code, f"{msg_template}: {error_str[:200]}"
+                continue
+            if not require_all:
+                return code, f"{msg_template}: {error_str[:200]}"
+        return None, None
+
+
+# 模式表 -> 编译结果；模式表视为常量，调用方修改表内容后需调用 compile_patterns 重新编译
+_compiled_matchers: Dict[int, Tuple[List[ErrorPattern], PatternMatcher]] = {}
+
+
+def compile_patterns(patterns: List[ErrorPattern]) -> PatternMatcher:
+    """编译并缓存模式表"""
+    matcher = PatternMatcher(patterns)
+    _compiled_matchers[id(patterns)] = (patterns, matcher)
+    return matcher
+
+
+def get_pattern_matcher(patterns: List[ErrorPattern]) -> PatternMatcher:
+    entry = _compiled_matchers.get(id(patterns))
+    if entry is not None and entry[0] is patterns:
+        return entry[1]
+    return compile_patterns(patterns)
+
+
 def match_error_pattern(
     error_str: str,
     patterns: List[ErrorPattern] = None,
@@ -399,18 +461,7 @@ def match_error_pattern(
     """
     if patterns is None:
         patterns = ERROR_PATTERNS
-    
-    error_lower = error_str.lower()
-    
-    for keywords, code, msg_template in patterns:
-        if require_all:
-            if all(kw.lower() in error_lower for kw in keywords):
-                return code, f"{msg_template}: {error_str[:200]}"
-        else:
-            if any(kw.lower() in error_lower for kw in keywords):
-                return code, f"{msg_template}: {error_str[:200]}"
-    
-    return None, None
+    return get_pattern_matcher(patterns).match(error_str, require_all)
 
 
 def match_traceback_pattern(error_str: str) -> Tuple[Optional[int], Optional[str]]:
@@ -421,3 +472,8 @@ def match_traceback_pattern(error_str: str) -> Tuple[Optional[int], Optional[str
 def match_custom_exception_pattern(error_str: str) -> Tuple[Optional[int], Optional[str]]:
     """匹配自定义 Exception 的模式"""
     return match_error_pattern(error_str, CUSTOM_EXCEPTION_PATTERNS)
+
+
+# 内置模式表在导入时编译
+for _patterns in (ERROR_PATTERNS, TRACEBACK_EXCEPTION_PATTERNS, CUSTOM_EXCEPTION_PATTERNS):
+    compile_patterns(_patterns)
@@ -1,14 +1,101 @@
 import os
+import io
+import codecs
+import mmap
+import hashlib
+import tempfile
+import threading
+import time
 import requests
 import uuid
 import chardet
 from io import BytesIO
-from typing import Literal,Callable, Any, Optional,Union
+from typing import Literal,Callable, Any, Optional,Union,Iterable,Iterator,IO
 from pydantic import BaseModel, Field, field_validator,PrivateAttr
 from urllib.parse import urlparse
 from pptx import Presentation
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.file.text_cache import get_text_cache, content_digest
 
 MAX_FILE_SIZE = 10 * 1024 * 1024
+# 下载缓冲留在内存中的上限，超过后落盘到 FileOps.DOWNLOAD_DIR
+FILE_SPOOL_MAX_MEMORY = int(os.getenv("FILE_SPOOL_MAX_MEMORY", str(1024 * 1024)))
+# 需要专门解析库处理的文档后缀（CPU 密集）
+DOCUMENT_EXTS = ('.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx')
+# 提取文本的字符预算，超出部分截断，0 表示不限制
+FILE_EXTRACT_MAX_CHARS = int(os.getenv("FILE_EXTRACT_MAX_CHARS", "50000"))
+# 纯文本编码探测只采样开头的字节数
+FILE_EXTRACT_DETECT_BYTES = int(os.getenv("FILE_EXTRACT_DETECT_BYTES", "65536"))
+# 表格最多读取的工作表数和列数
+FILE_EXTRACT_MAX_SHEETS = int(os.getenv("FILE_EXTRACT_MAX_SHEETS", "5"))
+FILE_EXTRACT_MAX_COLUMNS = int(os.getenv("FILE_EXTRACT_MAX_COLUMNS", "50"))
+# 下载连接池：缓存的主机数、每个主机常驻连接数、重试次数、退避系数
+FILE_HTTP_POOL_HOSTS = int(os.getenv("FILE_HTTP_POOL_HOSTS", "10"))
+FILE_HTTP_POOL_PER_HOST = int(os.getenv("FILE_HTTP_POOL_PER_HOST", "10"))
+FILE_HTTP_RETRIES = int(os.getenv("FILE_HTTP_RETRIES", "3"))
+FILE_HTTP_BACKOFF = float(os.getenv("FILE_HTTP_BACKOFF", "0.5"))
+# 首次失败后允许继续重试的总时长（秒），单次退避等待也不超过该值
+FILE_HTTP_RETRY_MAX_TIME = float(os.getenv("FILE_HTTP_RETRY_MAX_TIME", "30"))
+# 解析失败时返回的说明文本前缀，这类结果不进缓存
+PARSE_ERROR_PREFIXES = ("[FileOps Error]", "[暂不支持解析", "[解析库缺失]", "[解析失败]", "[PPT解析失败]", "[Error]")
+
+
+def is_parse_error(text: str) -> bool:
+    return text.startswith(PARSE_ERROR_PREFIXES)
+
+class _BoundedRetry(Retry):
+    """在 Retry 的次数限制之外，再限制首次失败后的总重试时长"""
+
+    max_retry_time = FILE_HTTP_RETRY_MAX_TIME
+    _first_failure_at: Optional[float] = None
+
+    def new(self, **kw) -> "Retry":
+        # urllib3 每次失败都通过 increment -> new 生成新的 Retry，首次失败时间沿用下去
+        retry = super().new(**kw)
+        retry._first_failure_at = self._first_failure_at or time.monotonic()
+        return retry
+
+    def is_exhausted(self) -> bool:
+        if self._first_failure_at is not None and time.monotonic() - self._first_failure_at > self.max_retry_time:
+            return True
+        return super().is_exhausted()
+
+
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    FileOps 下载共用的 Session：同一主机复用 keep-alive 连接，每个主机常驻 FILE_HTTP_POOL_PER_HOST 个连接
+    （并发超出时临时新建连接、用完即关，不会阻塞等待），连接错误和 429/5xx 按指数退避重试，
+    重试总时长不超过 FILE_HTTP_RETRY_MAX_TIME
+    """
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                retry = _BoundedRetry(
+                    total=FILE_HTTP_RETRIES,
+                    backoff_factor=FILE_HTTP_BACKOFF,
+                    backoff_max=FILE_HTTP_RETRY_MAX_TIME,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=frozenset({"GET", "HEAD"}),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=FILE_HTTP_POOL_HOSTS,
+                    pool_maxsize=FILE_HTTP_POOL_PER_HOST,
+                    max_retries=retry,
+                    pool_block=False,
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _http_session = session
+    return _http_session
+
 
 class File(BaseModel):
     """
@@ -104,36 +191,54 @@ class FileOps:
     @staticmethod
     def _get_bytes_stream(file_obj:File) -> tuple[bytes, str]:
         """
-        获取文件内容和后缀, 5MB大小限制检查, 超出抛异常
+        获取文件内容和后缀, 大小限制检查, 超出抛异常
+        """
+        stream, ext, _ = FileOps._open_stream(file_obj)
+        with stream:
+            return stream.read(), ext
+
+    @staticmethod
+    def _open_stream(file_obj: File, headers: Optional[dict] = None) -> tuple[Optional[IO[bytes]], str, dict]:
+        """
+        以只读文件对象的形式打开文件内容, 返回 (文件对象, 后缀, 校验字段), 调用方负责 close
+        - 远程文件: 边下载边写入 SpooledTemporaryFile, 小文件留在内存, 超过 FILE_SPOOL_MAX_MEMORY 落盘；
+          校验字段为响应的 {"etag", "last_modified"}，headers 带条件请求头且源站返回 304 时文件对象为 None
+        - 本地文件: mmap 映射, 不整体读入内存
         """
         _, ext = infer_file_category(file_obj.url)
 
         if file_obj.is_remote:
             try:
                 # stream=True: 此时只下载 Headers，连接保持打开，还没下载 Body
-                with requests.get(file_obj.url, stream=True, timeout=60) as resp:
+                with get_http_session().get(file_obj.url, headers=headers, stream=True, timeout=60) as resp:
+                    validators = {"etag": resp.headers.get('ETag'), "last_modified": resp.headers.get('Last-Modified')}
+                    if headers and resp.status_code == 304:
+                        return None, ext, validators
                     resp.raise_for_status()
 
                     content_length = resp.headers.get('Content-Length')
                     if content_length and int(content_length) > MAX_FILE_SIZE:
                         raise Exception(
-                            f"文件大小 ({int(content_length)} bytes) 超过限制 5MB，已终止下载。"
+                            f"文件大小 ({int(content_length)} bytes) 超过限制 {MAX_FILE_SIZE} bytes，已终止下载。"
                         )
 
                     # 场景：Header 缺失 Content-Length 或服务器 Header 欺骗
-                    downloaded_content = BytesIO()
-                    current_size = 0
-
-                    # 分块读取，每块 8KB
-                    for chunk in resp.iter_content(chunk_size=8192):
-                        if chunk:
-                            current_size += len(chunk)
-                            if current_size > MAX_FILE_SIZE:
-                                raise Exception(f"检测到文件超过 5MB，已中断。")
-                            downloaded_content.write(chunk)
-
-                    # 获取完整 bytes
-                    return downloaded_content.getvalue(), ext
+                    os.makedirs(FileOps.DOWNLOAD_DIR, exist_ok=True)
+                    spool = tempfile.SpooledTemporaryFile(max_size=FILE_SPOOL_MAX_MEMORY, dir=FileOps.DOWNLOAD_DIR)
+                    try:
+                        current_size = 0
+                        # 分块读取，每块 64KB
+                        for chunk in resp.iter_content(chunk_size=65536):
+                            if chunk:
+                                current_size += len(chunk)
+                                if current_size > MAX_FILE_SIZE:
+                                    raise Exception(f"检测到文件超过 {MAX_FILE_SIZE} bytes，已中断。")
+                                spool.write(chunk)
+                        spool.seek(0)
+                    except BaseException:
+                        spool.close()
+                        raise
+                    return spool, ext, validators
 
             except requests.RequestException as e:
                 raise RuntimeError(f"网络请求失败: {e}")
@@ -142,14 +247,16 @@ class FileOps:
             if not os.path.exists(file_obj.url):
                 raise FileNotFoundError(f"本地文件不存在: {file_obj.url}")
 
-            '''
             file_size = os.path.getsize(file_obj.url)
             if file_size > MAX_FILE_SIZE:
-                 raise Exception(f"本地文件大小 ({file_size} bytes) 超过限制 5MB")
-            '''
+                raise Exception(f"本地文件大小 ({file_size} bytes) 超过限制 {MAX_FILE_SIZE} bytes")
+            if file_size == 0:
+                # 空文件无法 mmap
+                return BufferIO(b""), ext, {}
 
             with open(file_obj.url, 'rb') as f:
-                return f.read(), ext
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return BufferIO(mapped, on_close=mapped.close), ext, {}
 
     @staticmethod
     def save_to_local(file_obj: File, filename: str) -> str:
@@ -172,7 +279,7 @@ class FileOps:
             local_path = os.path.join(FileOps.DOWNLOAD_DIR, filename)
 
             headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
-            with requests.get(file_obj.url, headers=headers, stream=True, timeout=120) as r:
+            with get_http_session().get(file_obj.url, headers=headers, stream=True, timeout=120) as r:
                 r.raise_for_status()
                 with open(local_path, 'wb') as f:
                     for chunk in r.iter_content(chunk_size=8192):
@@ -192,90 +299,291 @@ class FileOps:
         return content
 
     @staticmethod
-    def extract_text(file_obj: File) -> str:
+    def extract_text(file_obj: File, parse_document: Optional[Callable[[IO[bytes], str], str]] = None) -> str:
         """
         提取文本内容
         场景：RAG、HTML解析、文档分析
+        parse_document: 可选的文档解析函数 (stream, ext) -> 文本，用于把 pdf/docx 等格式的解析交给进程池
         """
         try:
-            content, ext = FileOps._get_bytes_stream(file_obj)
-
-            if ext in ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx']:
-                return FileOps._parse_document_bytes(file_obj, content, ext)
-
-            # 默认直接读
-            charset = chardet.detect(content)
-            if 'encoding' in charset:
-                return content.decode(charset['encoding'])
-            else:
-                return content.decode('utf-8')
+            cache = get_text_cache()
+            entry = cache.get_url_entry(file_obj.url) if file_obj.is_remote else None
+            stream, ext, validators = FileOps._open_stream(file_obj, cache.conditional_headers(entry))
+            if stream is None:
+                text = cache.get_revalidated_text(entry)
+                if text is not None:
+                    return text
+                # 304 但缓存文本已被淘汰，重新完整下载
+                stream, ext, validators = FileOps._open_stream(file_obj)
+            with stream:
+                digest = stream_digest(stream)
+                text = cache.get_text(digest)
+                if text is None:
+                    if parse_document is not None and ext in DOCUMENT_EXTS:
+                        text = parse_document(stream, ext)
+                    else:
+                        text = FileOps._content_to_text(file_obj, stream, ext)
+                    if not is_parse_error(text):
+                        cache.put_text(digest, text)
+            if file_obj.is_remote and not is_parse_error(text):
+                cache.put_url(file_obj.url, digest, **validators)
+            return text
 
         except Exception as e:
             return f"[FileOps Error] Failed to read content: {str(e)}"
 
     @staticmethod
-    def _parse_document_bytes(file_obj: File, content: bytes, ext:str) -> str:
-        stream = BytesIO(content)
-        text_result = ""
+    def _content_to_text(file_obj: Optional[File], content: Union[bytes, bytearray, IO[bytes]], ext: str) -> str:
+        if ext in DOCUMENT_EXTS:
+            return FileOps._parse_document_bytes(file_obj, content, ext)
+        return FileOps._decode_text(content)
+
+    @staticmethod
+    def _decode_text(content: Union[bytes, bytearray, IO[bytes]], max_chars: int = None) -> str:
+        """
+        解码纯文本：只读取、解码预算内需要的部分
+        绝大多数上传文件是 utf-8，先按 utf-8 严格解码，失败时才用 chardet 采样开头的字节探测编码
+        """
+        if max_chars is None:
+            max_chars = FILE_EXTRACT_MAX_CHARS
+        # 任何编码单个字符都不超过 4 字节
+        limit = max_chars * 4 if max_chars > 0 else -1
+        if hasattr(content, 'read'):
+            head = content.read(limit)
+        else:
+            head = bytes(content[:limit] if limit >= 0 else content)
+        truncated = 0 <= limit <= len(head)
+        try:
+            # 增量解码：按预算截断时末尾不完整的多字节字符留在解码器里，不算解码失败
+            text = codecs.getincrementaldecoder('utf-8-sig')('strict').decode(head, final=not truncated)
+        except UnicodeDecodeError:
+            charset = chardet.detect(head[:FILE_EXTRACT_DETECT_BYTES])
+            try:
+                text = head.decode(charset.get('encoding') or 'gb18030', errors='replace')
+            except LookupError:
+                text = head.decode('gb18030', errors='replace')
+        return collect_text([text], max_chars)
+
+    @staticmethod
+    def _parse_document_bytes(file_obj: Optional[File], content: Union[bytes, bytearray, IO[bytes]], ext:str, max_chars: int = None) -> str:
+        """
+        按页/行惰性读取文档，达到字符预算后不再继续解析
+        content 可以是文件对象（直接交给解析库），也可以是内存缓冲（零拷贝包装成文件对象）
+        """
+        if max_chars is None:
+            max_chars = FILE_EXTRACT_MAX_CHARS
+        owned = not hasattr(content, 'read')
+        stream = BufferIO(content) if owned else content
 
         try:
             if ext == '.pdf':
-                import pypdf
-                reader = pypdf.PdfReader(stream)
-                for page in reader.pages:
-                    text_result += page.extract_text() + "\n"
+                chunks = iter_pdf_pages(stream)
             elif ext in ['.docx', '.doc']:
-                text_result = read_docx(stream)
-            elif ext in ['.xlsx', '.xls', '.csv']:
-                import pandas as pd
-                if ext == '.csv':
-                    df = pd.read_csv(stream)
-                else:
-                    df = pd.read_excel(stream)
-                text_result = df.to_string()
+                chunks = iter_docx(stream)
+            elif ext in ['.xlsx', '.xls']:
+                chunks = iter_sheet_rows(stream, ext)
             elif ext in ['.ppt', '.pptx']:
-                text_result = read_ppt(stream)
+                chunks = _joined(iter_ppt_slides(stream), "\n\n")
             else:
-                text_result = f"[暂不支持解析该文档格式: {ext}]"
+                return f"[暂不支持解析该文档格式: {ext}]"
+            return collect_text(chunks, max_chars)
         except ImportError as e:
-            text_result = f"[解析库缺失] {e}"
+            return f"[解析库缺失] {e}"
         except Exception as e:
-            text_result = f"[解析失败] {e}"
+            return f"[解析失败] {e}"
+        finally:
+            if owned:
+                stream.close()
+
+
+class BufferIO(io.RawIOBase):
+    """
+    只读、可 seek 的零拷贝文件对象，包装 bytes / bytearray / mmap 等缓冲区，
+    解析库按需 read，不会像 BytesIO(bytearray) 那样先整体复制一份
+    """
+
+    def __init__(self, buffer, on_close: Optional[Callable[[], None]] = None):
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+        self._on_close = on_close
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), self._pos + size)
+        data = self._view[self._pos:end].tobytes() if end > self._pos else b""
+        self._pos = max(self._pos, end)
+        return data
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError(f"negative seek position {pos}")
+        self._pos = pos
+        return pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def getbuffer(self) -> memoryview:
+        return self._view
+
+    def close(self):
+        if self.closed:
+            return
+        # 先释放 memoryview，mmap 才能关闭
+        self._view.release()
+        super().close()
+        if self._on_close:
+            self._on_close()
+
+
+def stream_digest(stream: IO[bytes]) -> str:
+    """计算文件对象内容的 SHA-256，完成后回到开头"""
+    getbuffer = getattr(stream, 'getbuffer', None)
+    if getbuffer is not None:
+        digest = content_digest(getbuffer())
+    else:
+        h = hashlib.sha256()
+        while True:
+            chunk = stream.read(1024 * 1024)
+            if not chunk:
+                break
+            h.update(chunk)
+        digest = h.hexdigest()
+    stream.seek(0)
+    return digest
+
+
+def collect_text(chunks: Iterable[str], max_chars: int = FILE_EXTRACT_MAX_CHARS) -> str:
+    """
+    拼接分段文本，达到字符预算（max_chars <= 0 表示不限制）后截断并停止读取后续分段
+    """
+    parts = []
+    size = 0
+    try:
+        for chunk in chunks:
+            if max_chars > 0 and size + len(chunk) > max_chars:
+                parts.append(chunk[:max_chars - size])
+                parts.append(f"\n[内容过长，已截断，仅保留前 {max_chars} 个字符]")
+                break
+            parts.append(chunk)
+            size += len(chunk)
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+    return "".join(parts)
+
+
+def _joined(chunks: Iterable[str], sep: str) -> Iterator[str]:
+    """惰性版 sep.join(chunks)"""
+    for i, chunk in enumerate(chunks):
+        yield chunk if i == 0 else sep + chunk
+
+
+def iter_pdf_pages(stream) -> Iterator[str]:
+    import pypdf
+    reader = pypdf.PdfReader(stream)
+    for page in reader.pages:
+        yield page.extract_text() + "\n"
+
+
+def _format_row(values) -> str:
+    cells = ["" if v is None else str(v).strip() for v in values]
+    # 去掉行尾空单元格
+    while cells and not cells[-1]:
+        cells.pop()
+    return " | ".join(cells)
+
+
+def iter_sheet_rows(stream, ext: str) -> Iterator[str]:
+    """
+    逐行读取表格，只读取前 FILE_EXTRACT_MAX_SHEETS 个工作表、前 FILE_EXTRACT_MAX_COLUMNS 列，跳过空行
+    """
+    if ext == '.xlsx':
+        import openpyxl
+        wb = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+        try:
+            for ws in wb.worksheets[:FILE_EXTRACT_MAX_SHEETS]:
+                yield f"=== {ws.title} ===\n"
+                for values in ws.iter_rows(max_col=FILE_EXTRACT_MAX_COLUMNS, values_only=True):
+                    row = _format_row(values)
+                    if row:
+                        yield row + "\n"
+        finally:
+            wb.close()
+    else:
+        import xlrd
+        book = xlrd.open_workbook(file_contents=stream.read(), on_demand=True)
+        try:
+            for index in range(min(book.nsheets, FILE_EXTRACT_MAX_SHEETS)):
+                sheet = book.sheet_by_index(index)
+                yield f"=== {sheet.name} ===\n"
+                for i in range(sheet.nrows):
+                    row = _format_row(sheet.row_values(i, end_colx=min(sheet.ncols, FILE_EXTRACT_MAX_COLUMNS)))
+                    if row:
+                        yield row + "\n"
+                book.unload_sheet(index)
+        finally:
+            book.release_resources()
 
-        return text_result
 
 def read_docx(cont_stream) -> str:
     """
     使用docx2python按顺序读取内容
     """
+    return "".join(iter_docx(cont_stream))
+
+def iter_docx(cont_stream) -> Iterator[str]:
     from docx2python import docx2python
     doc_result = docx2python(cont_stream)
 
     # 获取文档结构
-    all_parts = []
+    try:
+        yield from _joined(_iter_docx_parts(doc_result.body), "\n\n")
+    finally:
+        # 关闭文档
+        doc_result.close()
 
+def _iter_docx_parts(body) -> Iterator[str]:
     # docx2python以嵌套列表形式返回内容
     # 遍历文档主体
-    for section in doc_result.body:
+    for section in body:
         if isinstance(section, list):
             for item in section:
                 if isinstance(item, list):
                     # 可能是表格或多级内容
                     for sub_item in item:
                         if isinstance(sub_item, str) and sub_item.strip():
-                            all_parts.append(sub_item.strip())
+                            yield sub_item.strip()
                         elif isinstance(sub_item, list):
                             # 表格行
                             row_text = "\n".join([str(cell).strip() for cell in sub_item if str(cell).strip()])
                             if row_text:
-                                all_parts.append(row_text)
+                                yield row_text
                 elif isinstance(item, str) and item.strip():
-                    all_parts.append(item.strip())
-
-    # 关闭文档
-    doc_result.close()
-
-    return "\n\n".join(all_parts)
+                    yield item.strip()
 
 def read_ppt(file_input: Union[str, bytes, BytesIO]) -> str:
     if not Presentation:
@@ -291,38 +599,38 @@ def read_ppt(file_input: Union[str, bytes, BytesIO]) -> str:
         ppt_stream = file_input
 
     try:
-        prs = Presentation(ppt_stream)
-        full_text = []
-
-        for i, slide in enumerate(prs.slides):
-            page_content = []
-            page_content.append(f"=== 第 {i+1} 页 ===")
-
-            # shape.text_frame 包含了形状内的文本段落
-            for shape in slide.shapes:
-                # 提取普通文本框
-                if hasattr(shape, "text") and shape.text.strip():
-                    page_content.append(shape.text.strip())
-
-                # B. 提取表格内容 (普通 shape.text 无法获取表格内的字)
-                if shape.has_table:
-                    table_texts = []
-                    for row in shape.table.rows:
-                        row_cells = [cell.text_frame.text.strip() for cell in row.cells if cell.text_frame.text.strip()]
-                        if row_cells:
-                            table_texts.append(" | ".join(row_cells))
-                    if table_texts:
-                        page_content.append("[表格]\n" + "\n".join(table_texts))
-
-            # 很多重要信息藏在备注里
-            if slide.has_notes_slide:
-                notes = slide.notes_slide.notes_text_frame.text
-                if notes.strip():
-                    page_content.append(f"[备注]: {notes.strip()}")
-
-            full_text.append("\n".join(page_content))
-
-        return "\n\n".join(full_text)
-
+        return "\n\n".join(iter_ppt_slides(ppt_stream))
     except Exception as e:
         return f"[PPT解析失败] {str(e)}"
+
+def iter_ppt_slides(ppt_stream) -> Iterator[str]:
+    """逐页提取幻灯片文本（含表格和备注）"""
+    prs = Presentation(ppt_stream)
+
+    for i, slide in enumerate(prs.slides):
+        page_content = []
+        page_content.append(f"=== 第 {i+1} 页 ===")
+
+        # shape.text_frame 包含了形状内的文本段落
+        for shape in slide.shapes:
+            # 提取普通文本框
+            if hasattr(shape, "text") and shape.text.strip():
+                page_content.append(shape.text.strip())
+
+            # B. 提取表格内容 (普通 shape.text 无法获取表格内的字)
+            if shape.has_table:
+                table_texts = []
+                for row in shape.table.rows:
+                    row_cells = [cell.text_frame.text.strip() for cell in row.cells if cell.text_frame.text.strip()]
+                    if row_cells:
+                        table_texts.append(" | ".join(row_cells))
+                if table_texts:
+                    page_content.append("[表格]\n" + "\n".join(table_texts))
+
+        # 很多重要信息藏在备注里
+        if slide.has_notes_slide:
+            notes = slide.notes_slide.notes_text_frame.text
+            if notes.strip():
+                page_content.append(f"[备注]: {notes.strip()}")
+
+        yield "\n".join(page_content)
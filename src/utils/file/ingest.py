@@ -0,0 +1,203 @@
+"""
+上传文件的异步解析
+
+to_stream_input 和 OpenAI 兼容接口中的文档附件在图运行前解析，这里把它从事件循环上挪走：
+- 下载、大小限制、条件请求和提取结果缓存复用 FileOps.extract_text，整体放进线程执行
+- pdf/docx/xlsx/pptx 等 CPU 密集格式的解析派发到进程池（spawn 方式，worker 入口见 parse_worker）
+- 同一条消息里的多个附件并发处理，每个文件有独立的超时；
+  解析超时或 worker 崩溃时回收并重建进程池，而不是永久退回线程解析
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Dict, IO, List, Optional
+
+from utils.file import parse_worker
+from utils.file.file import File, FileOps, is_parse_error
+
+logger = logging.getLogger(__name__)
+
+# 同时处理的附件数
+FILE_INGEST_CONCURRENCY = int(os.getenv("FILE_INGEST_CONCURRENCY", "4"))
+# 单个文件下载 + 解析的总超时（秒）
+FILE_INGEST_TIMEOUT = float(os.getenv("FILE_INGEST_TIMEOUT", "30"))
+# 文档解析进程数，0 表示不用进程池，改在线程中解析
+FILE_INGEST_PROCESS_WORKERS = int(os.getenv("FILE_INGEST_PROCESS_WORKERS", "2"))
+# 进程池启动（拉起 worker 并导入解析库）的超时（秒）
+FILE_INGEST_POOL_START_TIMEOUT = 60
+
+
+@contextmanager
+def _bare_main_module():
+    """
+    spawn 子进程启动时会按父进程 __main__ 的路径重新执行一遍（python main.py 启动时即 main.py），
+    拉起 worker 期间临时换成空模块，子进程只需导入 parse_worker
+    """
+    main_module = sys.modules.get("__main__")
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        if main_module is not None:
+            sys.modules["__main__"] = main_module
+
+
+def _terminate_workers(pool: ProcessPoolExecutor):
+    """强制结束进程池中的 worker（卡死的解析任务无法通过 shutdown 中断）"""
+    terminate = getattr(pool, "terminate_workers", None)
+    if terminate is not None:
+        terminate()
+        return
+    # Python 3.14 之前没有公开接口，只能通过 _processes 拿到子进程
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        try:
+            process.terminate()
+        except Exception as e:
+            logger.warning(f"Failed to terminate parser worker {process.pid}: {e}")
+
+
+class FileIngestor:
+    """附件下载与解析，事件循环只负责调度"""
+
+    def __init__(
+            self,
+            concurrency: int = FILE_INGEST_CONCURRENCY,
+            timeout: float = FILE_INGEST_TIMEOUT,
+            process_workers: int = FILE_INGEST_PROCESS_WORKERS,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.process_workers = process_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats = {"files": 0, "succeeded": 0, "failed": 0, "timeouts": 0, "pool_recycles": 0}
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        pool = ProcessPoolExecutor(
+            max_workers=self.process_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        # spawn 方式的 worker 在提交任务时按需拉起，这里一次性提交满 max_workers 个预热任务，
+        # 让全部 worker 都在 _bare_main_module 内启动，之后不会再拉起新进程
+        with _bare_main_module():
+            futures = [pool.submit(parse_worker.warmup) for _ in range(self.process_workers)]
+        try:
+            for future in futures:
+                future.result(timeout=FILE_INGEST_POOL_START_TIMEOUT)
+        except BaseException:
+            _terminate_workers(pool)
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        return pool
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.process_workers <= 0:
+            return None
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._create_pool()
+            return self._pool
+
+    def _recycle_pool(self, pool: ProcessPoolExecutor, reason: str):
+        """丢弃出问题的进程池，下次解析时重建"""
+        with self._lock:
+            if self._pool is not pool:
+                # 已被其他线程回收
+                return
+            self._pool = None
+            self.stats["pool_recycles"] += 1
+        logger.warning(f"Recycling document parser pool: {reason}")
+        _terminate_workers(pool)
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def start(self):
+        """创建进程池并拉起全部 worker，在 FastAPI startup 钩子中通过 to_thread 调用"""
+        try:
+            self._get_pool()
+        except Exception as e:
+            # 启动失败不影响服务，首次解析时会再尝试创建
+            logger.warning(f"Document parser pool startup failed: {e}")
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _parse_document(self, stream: IO[bytes], ext: str, deadline: float) -> str:
+        """FileOps.extract_text 的文档解析回调，在下载线程中调用，阻塞等待进程池结果"""
+        pool = self._get_pool()
+        if pool is None:
+            return FileOps._parse_document_bytes(None, stream, ext)
+        # 跨进程传递需要一份完整内容，大小已由 FileOps 按 MAX_FILE_SIZE 限制
+        content = stream.read()
+        for attempt in range(2):
+            try:
+                future = pool.submit(parse_worker.parse_document, content, ext)
+                return future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                # 卡住的 worker 会一直占着进程池，直接结束掉重建
+                self._recycle_pool(pool, f"parsing {ext} timed out")
+                raise TimeoutError(f"文档解析超时（{self.timeout}s）")
+            except BrokenProcessPool:
+                self._recycle_pool(pool, "worker exited unexpectedly")
+                if attempt:
+                    raise
+                # 可能是其他文件导致的崩溃或回收，在新进程池上重试一次
+                pool = self._get_pool()
+
+    async def extract_text(self, file_obj: File) -> str:
+        """异步版 FileOps.extract_text，失败时同样返回错误说明而不是抛异常"""
+        self.stats["files"] += 1
+        deadline = time.monotonic() + self.timeout
+        try:
+            text = await asyncio.wait_for(
+                asyncio.to_thread(
+                    FileOps.extract_text,
+                    file_obj,
+                    lambda stream, ext: self._parse_document(stream, ext, deadline),
+                ),
+                self.timeout,
+            )
+        except asyncio.TimeoutError:
+            # 下载线程无法中断，会在后台跑完后丢弃结果；卡住的解析由 _parse_document 在截止时间回收
+            self.stats["timeouts"] += 1
+            logger.warning(f"File extraction timed out after {self.timeout}s: {file_obj.url}")
+            return f"[FileOps Error] Failed to read content: 处理超时（{self.timeout}s）"
+        if is_parse_error(text):
+            self.stats["failed"] += 1
+        else:
+            self.stats["succeeded"] += 1
+        return text
+
+    async def extract_texts(self, files: List[File]) -> List[str]:
+        """并发提取多个文件，结果顺序与输入一致"""
+        if not files:
+            return []
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def _run(file_obj: File) -> str:
+            async with sem:
+                return await self.extract_text(file_obj)
+
+        return list(await asyncio.gather(*(_run(f) for f in files)))
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            **self.stats,
+            "concurrency": self.concurrency,
+            "timeout": self.timeout,
+            "process_workers": self.process_workers,
+            "pool_running": self._pool is not None,
+        }
+
+
+file_ingestor = FileIngestor()
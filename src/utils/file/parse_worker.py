@@ -0,0 +1,20 @@
+"""
+文档解析进程池的 worker 入口
+
+进程池以 spawn 方式创建，子进程只导入本模块（及其依赖的 utils.file.file），
+不会执行 main.py 中的路由、数据库和图初始化
+"""
+import os
+from typing import Union
+
+
+def parse_document(content: Union[bytes, bytearray], ext: str) -> str:
+    """进程池入口，必须是模块级函数才能被 pickle"""
+    from utils.file.file import FileOps
+    return FileOps._parse_document_bytes(None, content, ext)
+
+
+def warmup() -> int:
+    """预先拉起 worker 并导入解析库，返回 worker 进程号"""
+    import utils.file.file  # noqa: F401
+    return os.getpid()
@@ -0,0 +1,215 @@
+"""
+文档提取结果的磁盘缓存
+
+同一个附件 URL 会在多轮对话、多个会话里反复上传，这里缓存提取出的文本：
+- 文本按内容 SHA-256 + 提取字符预算存放（texts/<sha256>-<max_chars>.txt），内容相同的文件只解析一次，
+  修改 FILE_EXTRACT_MAX_CHARS 后不会命中按旧预算截断的文本
+- URL 索引（urls/<sha256(url)>.json）记录 URL -> 内容摘要 + ETag/Last-Modified，
+  每次都带 If-None-Match/If-Modified-Since 向源站校验，304 时复用文本；没有校验字段的响应不建索引
+- 总大小超过上限时按最近使用时间淘汰（命中时更新 mtime，重启后仍保持 LRU 顺序）
+- 缓存内容可能包含病历等敏感信息：目录权限 0700，文件权限 0600
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+FILE_TEXT_CACHE_ENABLED = os.getenv("FILE_TEXT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# 缓存目录总大小上限（字节）
+FILE_TEXT_CACHE_MAX_BYTES = int(os.getenv("FILE_TEXT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+_TEXTS = "texts"
+_URLS = "urls"
+
+
+def content_digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class ExtractedTextCache:
+    """按内容摘要缓存提取结果的 LRU 磁盘缓存，进程内线程安全"""
+
+    def __init__(self, root: str, max_chars: int, max_bytes: int = FILE_TEXT_CACHE_MAX_BYTES,
+                 enabled: bool = FILE_TEXT_CACHE_ENABLED):
+        self.root = root
+        # 提取字符预算，参与文本的缓存键
+        self.max_chars = max_chars
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        # 相对路径 -> 文件大小，按最近使用排序
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.stats = {"revalidated": 0, "content_hits": 0, "misses": 0, "evictions": 0}
+
+    def _load(self):
+        # 调用方持有 self._lock
+        if self._loaded:
+            return
+        files = []
+        for path in (self.root, os.path.join(self.root, _TEXTS), os.path.join(self.root, _URLS)):
+            os.makedirs(path, mode=0o700, exist_ok=True)
+            # 目录可能由旧版本以默认权限创建
+            os.chmod(path, 0o700)
+        for sub in (_TEXTS, _URLS):
+            for entry in os.scandir(os.path.join(self.root, sub)):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    st = entry.stat()
+                    files.append((st.st_mtime, f"{sub}/{entry.name}", st.st_size))
+        for _, rel, size in sorted(files):
+            self._entries[rel] = size
+            self._total_bytes += size
+        self._loaded = True
+        self._evict()
+
+    def _read(self, rel: str) -> Optional[str]:
+        path = os.path.join(self.root, rel)
+        with self._lock:
+            self._load()
+            if rel not in self._entries:
+                return None
+            self._entries.move_to_end(rel)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            self._forget(rel)
+            return None
+
+    def _write(self, rel: str, data: str):
+        path = os.path.join(self.root, rel)
+        encoded = data.encode("utf-8")
+        with self._lock:
+            self._load()
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as f:
+            f.write(encoded)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._total_bytes += len(encoded) - self._entries.pop(rel, 0)
+            self._entries[rel] = len(encoded)
+            self._evict()
+
+    def _forget(self, rel: str):
+        with self._lock:
+            self._total_bytes -= self._entries.pop(rel, 0)
+
+    def _evict(self):
+        # 调用方持有 self._lock
+        while self._total_bytes > self.max_bytes and self._entries:
+            rel, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.stats["evictions"] += 1
+            try:
+                os.remove(os.path.join(self.root, rel))
+            except OSError:
+                pass
+
+    def _text_rel(self, digest: str) -> str:
+        return f"{_TEXTS}/{digest}-{self.max_chars}.txt"
+
+    @staticmethod
+    def _url_rel(url: str) -> str:
+        return f"{_URLS}/{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+    def get_url_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        """URL 索引: {"digest", "etag", "last_modified"}"""
+        if not self.enabled:
+            return None
+        try:
+            raw = self._read(self._url_rel(url))
+            return json.loads(raw) if raw else None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read file text cache entry for {url}: {e}")
+            return None
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """按 URL 索引生成条件请求头，没有索引时为空"""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def get_revalidated_text(self, entry: Dict[str, Any]) -> Optional[str]:
+        """源站返回 304 后使用缓存文本"""
+        text = self._read_text(entry["digest"])
+        if text is not None:
+            self.stats["revalidated"] += 1
+        return text
+
+    def _read_text(self, digest: str) -> Optional[str]:
+        try:
+            return self._read(self._text_rel(digest))
+        except OSError as e:
+            logger.warning(f"Failed to read file text cache {digest}: {e}")
+            return None
+
+    def get_text(self, digest: str) -> Optional[str]:
+        """按内容摘要查找，命中时跳过解析"""
+        if not self.enabled:
+            return None
+        text = self._read_text(digest)
+        self.stats["content_hits" if text is not None else "misses"] += 1
+        return text
+
+    def put_text(self, digest: str, text: str):
+        if not self.enabled:
+            return
+        try:
+            self._write(self._text_rel(digest), text)
+        except OSError as e:
+            logger.warning(f"Failed to write file text cache {digest}: {e}")
+
+    def put_url(self, url: str, digest: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """只为带 ETag/Last-Modified 的响应建索引，否则无法向源站校验"""
+        if not self.enabled or not (etag or last_modified):
+            return
+        entry = {"digest": digest, "etag": etag, "last_modified": last_modified}
+        try:
+            self._write(self._url_rel(url), json.dumps(entry))
+        except OSError as e:
+            logger.warning(f"Failed to write file text cache entry for {url}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["revalidated"] + self.stats["content_hits"] + self.stats["misses"]
+            hits = lookups - self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "max_chars": self.max_chars,
+            }
+
+
+_text_cache: Optional[ExtractedTextCache] = None
+_text_cache_lock = threading.Lock()
+
+
+def get_text_cache() -> ExtractedTextCache:
+    """全局缓存，目录位于 FileOps.DOWNLOAD_DIR 下"""
+    global _text_cache
+    if _text_cache is None:
+        with _text_cache_lock:
+            if _text_cache is None:
+                from utils.file.file import FileOps, FILE_EXTRACT_MAX_CHARS
+                _text_cache = ExtractedTextCache(
+                    os.path.join(FileOps.DOWNLOAD_DIR, "extracted_text_cache"), max_chars=FILE_EXTRACT_MAX_CHARS,
+                )
+    return _text_cache
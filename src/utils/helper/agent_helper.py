@@ -1,9 +1,10 @@
 import uuid
 import json
 import os
-from typing import Any, Dict, List, Tuple, Iterator
+from typing import Any, Dict, List, Optional, Tuple, Iterator
 import time
 from utils.file.file import File, FileOps, infer_file_category
+from utils.file.ingest import file_ingestor
 from utils.error import classify_error
 
 from utils.messages.client import (
@@ -31,7 +32,17 @@ from utils.messages.server import (
 )
 
 
-def to_stream_input(msg: ClientMessage) -> Dict[str, Any]:
+def _iter_upload_files(msg: ClientMessage) -> Iterator[UploadFileBlockDetail]:
+    if msg and msg.content and msg.content.query and msg.content.query.prompt:
+        for block in msg.content.query.prompt:
+            if block.type == "upload_file" and block.content and block.content.upload_file:
+                yield block.content.upload_file
+
+
+def to_stream_input(msg: ClientMessage, file_contents: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    file_contents: 预先提取好的文档内容（url -> 文本），命中时不再同步下载解析
+    """
     content_parts = []
     if msg and msg.content and msg.content.query and msg.content.query.prompt:
         for block in msg.content.query.prompt:
@@ -82,7 +93,10 @@ def to_stream_input(msg: ClientMessage) -> Dict[str, Any]:
                         }
                     )
                 else:
-                    file_content = FileOps.extract_text(file_data)
+                    if file_contents is not None and file_info.url in file_contents:
+                        file_content = file_contents[file_info.url]
+                    else:
+                        file_content = FileOps.extract_text(file_data)
                     content_parts.append(
                         {
                             "type": "text",
@@ -93,6 +107,24 @@ def to_stream_input(msg: ClientMessage) -> Dict[str, Any]:
     return {"messages": [{"role": "user", "content": content_parts}]}
 
 
+async def ato_stream_input(msg: ClientMessage) -> Dict[str, Any]:
+    """
+    异步版 to_stream_input：文档附件并发下载，解析放在进程池，不阻塞事件循环
+    """
+    urls = []
+    for file_info in _iter_upload_files(msg):
+        file_type, _ = infer_file_category(file_info.url)
+        if file_type not in ("image", "video", "audio") and file_info.url not in urls:
+            urls.append(file_info.url)
+    file_contents = {}
+    if urls:
+        texts = await file_ingestor.extract_texts(
+            [File(url=url, file_type=infer_file_category(url)[0]) for url in urls]
+        )
+        file_contents = dict(zip(urls, texts))
+    return to_stream_input(msg, file_contents)
+
+
 def to_client_message(d: Dict[str, Any]) -> Tuple[ClientMessage, str]:
     prompt_list = d.get("content", {}).get("query", {}).get("prompt", [])
     blocks: List[PromptBlock] = []
@@ -1,12 +1,17 @@
 import os
 import inspect
+import logging
 import importlib
 import ast
 import textwrap
+import threading
+import weakref
 from pydantic import BaseModel
-from typing import get_type_hints,Type,Optional,get_origin,Union,get_args
+from typing import get_type_hints,Type,Optional,get_origin,Union,get_args,Any,Dict,Tuple
 from langgraph.graph.state import CompiledStateGraph
-from langgraph.graph import START, END
+from langgraph.graph import StateGraph, START, END
+
+logger = logging.getLogger(__name__)
 
 
 def get_graph_instance(module_name):
@@ -20,6 +25,52 @@ def get_agent_instance(module_name, ctx):
     module = importlib.import_module(module_name)
     return module.build_agent(ctx)
 
+class NodeGraphCache:
+    """
+    /node_run 使用的单节点编译图缓存：node_id -> (编译图, 入参类, 出参类)
+    工作流图在进程内不变，每个节点只构建、编译一次
+    """
+
+    def __init__(self, graph: CompiledStateGraph):
+        self.graph = graph
+        self._cache: Dict[str, Tuple[CompiledStateGraph, Any, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, node_id: str) -> Tuple[CompiledStateGraph, Any, Any]:
+        cached = self._cache.get(node_id)
+        if cached is not None:
+            return cached
+
+        from utils.log.parser import get_graph_parser
+        node_func, input_cls, output_cls = get_graph_node_func_with_inout(self.graph.get_graph(), node_id)
+        if node_func is None or input_cls is None:
+            raise KeyError(f"node_id '{node_id}' not found")
+        metadata = get_graph_parser(self.graph).get_node_metadata(node_id) or {}
+
+        _g = StateGraph(input_cls, input_schema=input_cls, output_schema=output_cls)
+        _g.add_node("sn", node_func, metadata=metadata)
+        _g.set_entry_point("sn")
+        _g.add_edge("sn", END)
+        # 并发首次访问时可能重复构建，结果等价，后写入的覆盖即可
+        cached = (_g.compile(), input_cls, output_cls)
+        self._cache[node_id] = cached
+        return cached
+
+    def warmup(self) -> int:
+        """预先构建所有节点的单节点图，返回已缓存的节点数"""
+        for node_id, node in self.graph.get_graph().nodes.items():
+            func = getattr(node.data, "func", None) if node_id not in (START, END) else None
+            if func is None:
+                continue
+            try:
+                self.get(func.__name__)
+            except Exception as e:
+                logger.warning(f"Failed to prebuild node graph for {func.__name__}: {e}")
+        return len(self._cache)
+
+
 # return: func, input_class, output_class
 def get_graph_node_func_with_inout(graph, node_name):
     for node_id, node in graph.nodes.items():
@@ -52,7 +103,49 @@ def is_dev_env() -> bool:
     return os.getenv("COZE_PROJECT_ENV", "") == "DEV"
 
 
+_MISSING = object()
+
+
 class ParamExtractHelper:
+    # 分析结果缓存：函数对象（弱引用）-> (code 对象, 结果)，函数被重新定义或 __code__ 被替换时失效
+    _return_class_cache: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+    _func_def_cache: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+    _cache_lock = threading.Lock()
+
+    @classmethod
+    def _cache_get(cls, cache, func):
+        try:
+            entry = cache.get(func)
+        except TypeError:
+            return _MISSING
+        if entry is not None and entry[0] is getattr(func, "__code__", None):
+            return entry[1]
+        return _MISSING
+
+    @classmethod
+    def _cache_set(cls, cache, func, value):
+        try:
+            with cls._cache_lock:
+                cache[func] = (getattr(func, "__code__", None), value)
+        except TypeError:
+            pass
+
+    @classmethod
+    def _get_func_def(cls, func) -> Optional[ast.AST]:
+        """获取函数定义的 AST 节点，每个函数只做一次 getsource + parse"""
+        func_def = cls._cache_get(cls._func_def_cache, func)
+        if func_def is not _MISSING:
+            return func_def
+        func_def = None
+        try:
+            # 获取源码并去缩进 (处理类方法或嵌套函数的情况)
+            src = textwrap.dedent(inspect.getsource(func))
+            tree = ast.parse(src)
+            func_def = tree.body[0]
+        finally:
+            cls._cache_set(cls._func_def_cache, func, func_def)
+        return func_def
+
     @classmethod
     def get_concrete_return_class(cls, func) -> Optional[Type[BaseModel]]:
         """
@@ -66,13 +159,21 @@ class ParamExtractHelper:
         """
 
         original_func = inspect.unwrap(func)
+        cached = cls._cache_get(cls._return_class_cache, original_func)
+        if cached is not _MISSING:
+            return cached
+        output_cls = cls._resolve_return_class(original_func)
+        cls._cache_set(cls._return_class_cache, original_func, output_cls)
+        return output_cls
 
+    @classmethod
+    def _resolve_return_class(cls, original_func) -> Optional[Type[BaseModel]]:
         # 1. type hints
         output_cls = cls._extract_model_from_hints(original_func)
 
         # 2. 如果没有type hints，或者是泛型BaseModel, 通过AST解析
         if output_cls is None or (output_cls is BaseModel):
-            print(f"Type hint insufficient for {original_func.__name__}, trying AST analysis...")
+            logger.debug(f"Type hint insufficient for {original_func.__name__}, trying AST analysis...")
             ast_cls = cls._extract_model_from_ast(original_func)
             if ast_cls:
                 output_cls = ast_cls
@@ -105,7 +206,7 @@ class ParamExtractHelper:
             if isinstance(return_type, type) and issubclass(return_type, BaseModel):
                 return return_type
         except Exception as e:
-            print(f"Error extracting hints: {e}")
+            logger.warning(f"Error extracting hints: {e}")
 
         return None
 
@@ -115,10 +216,9 @@ class ParamExtractHelper:
         解析函数源码，寻找 'return SomeClass()' 语句，并从函数上下文中找到对应的类。
         """
         try:
-            # 获取源码并去缩进 (处理类方法或嵌套函数的情况)
-            src = textwrap.dedent(inspect.getsource(func))
-            tree = ast.parse(src)
-            func_def = tree.body[0]
+            func_def = cls._get_func_def(func)
+            if func_def is None:
+                return None
 
             # 遍历函数体寻找 return 语句
             # 注意：这里只简单的找最后一个 return 或者所有 return，
@@ -134,7 +234,7 @@ class ParamExtractHelper:
 
             return cls._extract_model_from_ast_node(return_node.value, func)
         except Exception as e:
-            print(f"Error extracting hints: {e}")
+            logger.warning(f"Error extracting hints: {e}")
             pass
 
         return None
@@ -213,8 +313,9 @@ class ParamExtractHelper:
         # 这是一个复杂的问题，需要完整的控制流分析
         # 这里提供一个简化的实现，只查找直接赋值
         try:
-            source = inspect.getsource(func)
-            tree = ast.parse(source)
+            tree = cls._get_func_def(func)
+            if tree is None:
+                return None
 
             for node in ast.walk(tree):
                 if isinstance(node, ast.FunctionDef) and node.name == func.__name__:
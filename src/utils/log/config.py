@@ -8,3 +8,13 @@ from pathlib import Path
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
 LOG_DIR = Path(os.getenv("COZE_LOG_DIR", "/tmp/app/work/logs/bypass"))
+
+# 日志队列：根 logger 只挂 QueueHandler，格式化和文件/控制台输出由后台 QueueListener 线程完成
+LOG_QUEUE_ENABLED = os.getenv("LOG_QUEUE_ENABLED", "true").lower() in ("1", "true", "yes")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# 队列满时的策略: drop 丢弃并计数 / block 阻塞等待（最多 LOG_QUEUE_BLOCK_TIMEOUT 秒，超时后丢弃）
+LOG_QUEUE_OVERFLOW = os.getenv("LOG_QUEUE_OVERFLOW", "drop").lower()
+LOG_QUEUE_BLOCK_TIMEOUT = float(os.getenv("LOG_QUEUE_BLOCK_TIMEOUT", "1.0"))
+
+# 每个请求的诊断信息（运行配置、回调列表等），只在排查问题时打开，走 DEBUG 日志
+LOG_REQUEST_DIAGNOSTICS = os.getenv("LOG_REQUEST_DIAGNOSTICS", "false").lower() in ("1", "true", "yes")
@@ -1,42 +1,80 @@
 import os
+import atexit
+import logging
 import cozeloop
 from cozeloop.integration.langchain.trace_callback import LoopTracer
+from cozeloop.internal.trace.model.model import QueueConf
 from langchain_core.runnables import RunnableConfig
 from utils.log.common import get_execute_mode
+from utils.log.config import LOG_REQUEST_DIAGNOSTICS
 from utils.log.node_log import Logger
+from utils.log.tool_metrics import tool_metrics_handler
+from utils.log.trace_sampling import RootErrorTracer, RunSampler, TraceFlusher
 
 space_id = os.getenv("COZE_PROJECT_SPACE_ID", "YOUR_SPACE_ID")
 api_token = os.getenv("COZE_LOOP_API_TOKEN", "YOUR_LOOP_API_TOKEN")
 base_url = os.getenv("COZE_LOOP_BASE_URL", "https://api.coze.cn")
 commit_hash = os.getenv("COZE_PROJECT_COMMIT_HASH","") # 发布版本的hash值
 
+# 链路采样率（每次运行开始时决定），未采中的运行出错时只上报根 span
+TRACE_SAMPLE_RATE = float(os.getenv("COZE_LOOP_SAMPLE_RATE", "1.0"))
+# 后台 flush 间隔（秒），0 表示只依赖 SDK 自身的批量导出
+TRACE_FLUSH_INTERVAL = float(os.getenv("COZE_LOOP_FLUSH_INTERVAL", "5"))
+# SDK 导出队列长度和单批大小，队列满时 SDK 丢弃新 span
+TRACE_SPAN_QUEUE_LENGTH = int(os.getenv("COZE_LOOP_SPAN_QUEUE_LENGTH", "1024"))
+TRACE_SPAN_BATCH_LENGTH = int(os.getenv("COZE_LOOP_SPAN_BATCH_LENGTH", "100"))
+
 cozeloopTracer = cozeloop.new_client(
     workspace_id=space_id,
     api_token=api_token,
     api_base_url=base_url,
+    trace_queue_conf=QueueConf(
+        span_queue_length=TRACE_SPAN_QUEUE_LENGTH,
+        span_max_export_batch_length=TRACE_SPAN_BATCH_LENGTH,
+    ),
 )
 cozeloop.set_default_client(cozeloopTracer)
 
+logger = logging.getLogger(__name__)
+
+trace_sampler = RunSampler(TRACE_SAMPLE_RATE)
+
+trace_flusher = TraceFlusher(cozeloopTracer, TRACE_FLUSH_INTERVAL)
+trace_flusher.start()
+atexit.register(trace_flusher.stop)
+
+
+def get_trace_stats() -> dict:
+    return trace_sampler.get_stats()
+
+
+def _trace_callback_handler(ctx, **kwargs):
+    """采中的运行返回完整的 LoopTracer 回调，否则返回只在根 chain 出错时上报的轻量回调"""
+    tags = {
+        "project_id": ctx.project_id,
+        "execute_mode": get_execute_mode(),
+        "log_id": ctx.logid,
+        "commit_hash": commit_hash,
+    }
+    if trace_sampler.should_sample():
+        return LoopTracer.get_callback_handler(cozeloopTracer, tags=tags, **kwargs)
+    return RootErrorTracer(cozeloopTracer, trace_sampler, tags)
+
 
 def init_run_config(graph, ctx):
     tracer = Logger(graph, ctx)
     tracer.on_chain_start = tracer.on_chain_start_graph  # 非必须
     tracer.on_chain_end = tracer.on_chain_end_graph
-    trace_callback_handler = LoopTracer.get_callback_handler(
-        cozeloopTracer,
+    trace_callback_handler = _trace_callback_handler(
+        ctx,
         add_tags_fn=tracer.get_node_tags,
         modify_name_fn=tracer.get_node_name,
-        tags={
-            "project_id": ctx.project_id,
-            "execute_mode": get_execute_mode(),
-            "log_id": ctx.logid,
-            "commit_hash": commit_hash,
-        }
     )
     config = RunnableConfig(
         callbacks=[
             tracer,
-            trace_callback_handler
+            trace_callback_handler,
+            tool_metrics_handler,
         ],
     )
     return config
@@ -45,18 +83,12 @@ def init_run_config(graph, ctx):
 def init_agent_config(graph, ctx):
     config = RunnableConfig(
         callbacks=[
-            LoopTracer.get_callback_handler(
-                cozeloopTracer,
-                tags={
-                    "project_id": ctx.project_id,
-                    "execute_mode": get_execute_mode(),
-                    "log_id": ctx.logid,
-                    "commit_hash": commit_hash,
-                }
-                )
+            _trace_callback_handler(ctx),
+            tool_metrics_handler,
         ]
     )
-    print("config", config)
+    if LOG_REQUEST_DIAGNOSTICS:
+        logger.debug(f"agent run config: callbacks={[type(cb).__name__ for cb in config['callbacks']]}")
     return config
 
 
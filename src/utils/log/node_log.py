@@ -1,5 +1,8 @@
 import time
 import logging
+import queue
+import threading
+import atexit
 from uuid import UUID
 from openai import BaseModel
 from utils.log.config import LOG_DIR
@@ -12,7 +15,7 @@ import sys
 import json
 from typing import Dict, Optional, Any
 from pydantic import BaseModel
-from utils.log.parser import LangGraphParser
+from utils.log.parser import get_graph_parser
 import asyncio
 
 
@@ -54,23 +57,203 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+# 节点日志后台写入配置
+# NODE_LOG_ASYNC: 是否启用后台写入，关闭后退化为每条日志同步写入并 fsync
+NODE_LOG_ASYNC = os.getenv("NODE_LOG_ASYNC", "true").lower() in ("1", "true", "yes")
+# 队列上限，满了之后丢弃新日志并计数
+NODE_LOG_QUEUE_SIZE = int(os.getenv("NODE_LOG_QUEUE_SIZE", "10000"))
+# 单批最多写入的条数
+NODE_LOG_BATCH_SIZE = int(os.getenv("NODE_LOG_BATCH_SIZE", "256"))
+# fsync 策略: batch 每批 fsync / interval 按间隔 fsync / none 只 flush 交给操作系统
+NODE_LOG_FSYNC = os.getenv("NODE_LOG_FSYNC", "interval").lower()
+NODE_LOG_FSYNC_INTERVAL = float(os.getenv("NODE_LOG_FSYNC_INTERVAL", "1.0"))
+
+
+class NodeLogWriter:
+    """
+    节点日志后台写入器
+
+    调用方只把日志放入有界队列，由单个后台线程持有文件句柄批量写入，
+    按 fsync 策略落盘。队列满时丢弃并计数，不阻塞请求线程。
+    """
+
+    _STOP = object()
+
+    def __init__(
+            self,
+            path: str,
+            max_queue_size: int = NODE_LOG_QUEUE_SIZE,
+            batch_size: int = NODE_LOG_BATCH_SIZE,
+            fsync_policy: str = NODE_LOG_FSYNC,
+            fsync_interval: float = NODE_LOG_FSYNC_INTERVAL,
+    ):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_queue_size))
+        self._file = None
+        self._last_fsync = time.monotonic()
+        self._dirty = False
+        self._thread: Optional[threading.Thread] = None
+        # 保护后台线程的启动和计数器（请求线程与写入线程都会更新计数）
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="node-log-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, log_entry: dict) -> bool:
+        """放入写入队列，队列已满时丢弃并返回 False"""
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        try:
+            self._queue.put_nowait(log_entry)
+            return True
+        except queue.Full:
+            self._count("dropped")
+            return False
+
+    def close(self, timeout: float = 5.0):
+        """写完队列中剩余的日志后停止后台线程"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {"written": self.written, "dropped": self.dropped, "errors": self.errors}
+        return {
+            "queued": self._queue.qsize(),
+            "max_queue_size": self._queue.maxsize,
+            **counters,
+            "fsync_policy": self.fsync_policy,
+        }
+
+    # ==================== 后台线程 ====================
+
+    def _run(self):
+        while True:
+            # 按间隔 fsync 时，空闲状态下也要在间隔到期后落盘
+            timeout = self.fsync_interval if self._dirty and self.fsync_policy == "interval" else None
+            try:
+                first = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._sync(force=True)
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is self._STOP for item in batch)
+            self._write_batch([item for item in batch if item is not self._STOP])
+            if stop:
+                self._sync(force=True)
+                self._close_file()
+                return
+
+    def _write_batch(self, batch):
+        if not batch:
+            return
+        lines = []
+        for entry in batch:
+            try:
+                lines.append(json.dumps(entry, ensure_ascii=False))
+            except Exception as e:
+                self._count("errors")
+                print(f"Failed to serialize log: {e}", flush=True)
+        try:
+            f = self._ensure_file()
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            self._count("written", len(lines))
+            self._dirty = True
+            self._sync(force=self.fsync_policy == "batch")
+        except Exception as e:
+            self._count("errors")
+            print(f"Failed to write log: {e}", flush=True)
+            self._close_file()
+
+    def _sync(self, force: bool = False):
+        if not self._dirty or self._file is None or self.fsync_policy == "none":
+            self._dirty = False
+            return
+        now = time.monotonic()
+        if force or now - self._last_fsync >= self.fsync_interval:
+            try:
+                os.fsync(self._file.fileno())
+            except Exception as e:
+                self._count("errors")
+                print(f"Failed to fsync log: {e}", flush=True)
+            self._last_fsync = now
+            self._dirty = False
+
+    def _ensure_file(self):
+        """持有同一个文件句柄；文件被轮转或删除后重新打开"""
+        if self._file is not None:
+            try:
+                st = os.stat(self.path)
+                fst = os.fstat(self._file.fileno())
+                if (st.st_dev, st.st_ino) == (fst.st_dev, fst.st_ino):
+                    return self._file
+            except FileNotFoundError:
+                pass
+            self._sync(force=True)
+            self._close_file()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+
+node_log_writer = NodeLogWriter(LOG_FILE)
+atexit.register(node_log_writer.close)
+
+
+def _write_log_sync(log_entry):
+    """同步写入一条日志并 fsync"""
+    log_json = json.dumps(log_entry, ensure_ascii=False)
+    with open(LOG_FILE, 'a', encoding='utf-8', buffering=1) as f:  # 行缓冲模式
+        f.write(log_json + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
 def write_log(log_entry):
     """
-    直接使用文件操作写入JSON格式日志，确保立即刷新到磁盘
+    写入JSON格式日志；默认交给后台写入器批量落盘，NODE_LOG_ASYNC 关闭时同步写入
     :param log_entry: 符合要求格式的日志字典
     """
     try:
         if is_prod():
             #  线上不打日志，待具备清理能后再打
             return None
-        log_json = json.dumps(log_entry, ensure_ascii=False)
-
-        # 修改为行缓冲模式（buffering=1）而不是无缓冲模式
-        with open(LOG_FILE, 'a', encoding='utf-8', buffering=1) as f:  # 行缓冲模式
-            f.write(log_json + '\n')
-            # 显式调用flush和fsync确保数据写入磁盘
-            f.flush()
-            os.fsync(f.fileno())
+        if NODE_LOG_ASYNC:
+            node_log_writer.submit(log_entry)
+        else:
+            _write_log_sync(log_entry)
 
         # 同时输出到控制台以便调试
         level = log_entry.get('level', 'info').lower()
@@ -80,20 +263,6 @@ def write_log(log_entry):
     except Exception as e:
         # 如果写入失败，打印到标准错误
         print(f"Failed to write log: {e}", flush=True)
-        # 尝试再次写入作为备选
-        try:
-            log_json = json.dumps(log_entry, ensure_ascii=False)
-            print(f"Attempting fallback write: {log_json}", flush=True)
-            # 修改备选方案为行缓冲模式
-            f = open(LOG_FILE, 'a', encoding='utf-8', buffering=1)
-            try:
-                f.write(log_json + '\n')
-                f.flush()
-                os.fsync(f.fileno())
-            finally:
-                f.close()
-        except Exception as fallback_e:
-            print(f"Fallback log write failed: {fallback_e}", flush=True)
 
 
 def create_log_entry(level="info", message="", timestamp=None, log_id=None, latency=0,
@@ -234,7 +403,7 @@ class Logger(BaseCallbackHandler):
         self.graph = graph
         self.runtime_ctx = ctx
         self.start_time = time.time()
-        self.parser = LangGraphParser(graph)
+        self.parser = get_graph_parser(graph)
 
     run_id_map: Dict[uuid.UUID, str] = {}
 
@@ -1,4 +1,6 @@
 import inspect
+import threading
+import weakref
 from dataclasses import dataclass
 from typing import Dict, Optional, Any, Callable, cast
 from langgraph.graph.state import CompiledStateGraph
@@ -75,8 +77,8 @@ class NodeInfo:
 
 class LangGraphParser:
     def __init__(self, app: CompiledStateGraph):
-        # 从LangGraph中获取图结构
-        self.graph_app = app
+        # 从LangGraph中获取图结构；只持有弱引用，否则缓存值会通过它强引用缓存键，图永远无法回收
+        self._graph_app_ref = weakref.ref(app)
         self.graph = app.get_graph()
         # 从图中构建节点信息
         self.nodes: Dict[str, NodeInfo] = {}  # NodeId -> NodeInfo
@@ -84,6 +86,13 @@ class LangGraphParser:
         self._build_node_info()
         self.condition_funcs = self._pre_process_conditional_fork_node_info()  # 跟踪condition节点的判断函数，因为中间会插入哑结点和condition节点
 
+    @property
+    def graph_app(self) -> CompiledStateGraph:
+        app = self._graph_app_ref()
+        if app is None:
+            raise ReferenceError("CompiledStateGraph has been garbage collected")
+        return app
+
     def _is_agent_node(self, node_id: str) -> bool:
         """
         判断是否为Agent节点，当前是模型节点，通过add_node的metadata注入标记
@@ -253,3 +262,20 @@ class LangGraphParser:
                 conditional_funcs[check_func_name] = {
                     "cond_node_name": "cond_" + parent_id} # 拼成前端的条件节点名
         return conditional_funcs
+
+
+# 编译图 -> 解析结果；解析器构建后只读，可以在多次运行之间共享
+_parser_cache: "weakref.WeakKeyDictionary[CompiledStateGraph, LangGraphParser]" = weakref.WeakKeyDictionary()
+_parser_cache_lock = threading.Lock()
+
+
+def get_graph_parser(app: CompiledStateGraph) -> LangGraphParser:
+    """获取编译图对应的 LangGraphParser，每个图只解析一次"""
+    parser = _parser_cache.get(app)
+    if parser is None:
+        with _parser_cache_lock:
+            parser = _parser_cache.get(app)
+            if parser is None:
+                parser = LangGraphParser(app)
+                _parser_cache[app] = parser
+    return parser
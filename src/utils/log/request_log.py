@@ -0,0 +1,106 @@
+"""
+请求日志策略
+
+/run、/stream_run、/node_run 入口的请求日志：
+- 请求体只解析一次（parse_request_body），日志里只输出截断后的预览
+- 按路由和级别采样，避免每个请求都写出数 KB 的日志行
+"""
+import json
+import logging
+import os
+import random
+from typing import Any, Dict, Optional
+
+import orjson
+
+# 请求体预览的最大字节数，0 表示不输出请求体
+REQUEST_LOG_BODY_PREVIEW_BYTES = int(os.getenv("REQUEST_LOG_BODY_PREVIEW_BYTES", "512"))
+# 采样率，格式: "route:level=rate,route=rate,*:level=rate"，例如 "run:info=0.1,node_run=1,*:error=1"
+REQUEST_LOG_SAMPLE_RATES = os.getenv("REQUEST_LOG_SAMPLE_RATES", "")
+REQUEST_LOG_DEFAULT_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_DEFAULT_SAMPLE_RATE", "1.0"))
+
+
+def _parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in spec.split(","):
+        key, sep, value = item.strip().partition("=")
+        if not sep:
+            continue
+        try:
+            rates[key.strip().lower()] = min(1.0, max(0.0, float(value)))
+        except ValueError:
+            continue
+    return rates
+
+
+class RequestLogPolicy:
+    """按路由和日志级别决定是否记录请求日志，以及请求体预览的长度"""
+
+    def __init__(
+            self,
+            sample_rates: Optional[Dict[str, float]] = None,
+            default_rate: float = REQUEST_LOG_DEFAULT_SAMPLE_RATE,
+            preview_bytes: int = REQUEST_LOG_BODY_PREVIEW_BYTES,
+    ):
+        self.sample_rates = sample_rates if sample_rates is not None else _parse_sample_rates(REQUEST_LOG_SAMPLE_RATES)
+        self.default_rate = default_rate
+        self.preview_bytes = preview_bytes
+
+    def sample_rate(self, route: str, level: int) -> float:
+        level_name = logging.getLevelName(level).lower()
+        for key in (f"{route}:{level_name}", route, f"*:{level_name}"):
+            rate = self.sample_rates.get(key)
+            if rate is not None:
+                return rate
+        return self.default_rate
+
+    def should_log(self, route: str, level: int = logging.INFO) -> bool:
+        rate = self.sample_rate(route, level)
+        return rate >= 1.0 or (rate > 0 and random.random() < rate)
+
+    def preview(self, raw_body: bytes) -> str:
+        """截取请求体前 preview_bytes 字节，超出部分只保留长度信息"""
+        if self.preview_bytes <= 0:
+            return ""
+        text = raw_body[:self.preview_bytes].decode("utf-8", errors="replace")
+        if len(raw_body) > self.preview_bytes:
+            text += f"...(truncated, {len(raw_body)} bytes)"
+        return text
+
+
+request_log_policy = RequestLogPolicy()
+
+
+def parse_request_body(raw_body: bytes) -> Any:
+    """
+    解析 JSON 请求体（只解析一次）
+
+    优先用 orjson；orjson 不支持的输入（NaN、超 64 位整数等）回退到标准库，
+    非法 UTF-8 统一转成 json.JSONDecodeError。
+    """
+    try:
+        return orjson.loads(raw_body)
+    except orjson.JSONDecodeError:
+        pass
+    try:
+        return json.loads(raw_body)
+    except UnicodeDecodeError as e:
+        raise json.JSONDecodeError(f"Invalid UTF-8 body: {e}", "", 0)
+
+
+def log_request(
+        logger: logging.Logger,
+        route: str,
+        raw_body: bytes,
+        level: int = logging.INFO,
+        **fields: Any,
+):
+    """按策略记录请求日志，fields 原样拼在请求体预览之前"""
+    if not logger.isEnabledFor(level) or not request_log_policy.should_log(route, level):
+        return
+    parts = [f"{k}={v}" for k, v in fields.items()]
+    parts.append(f"body_size={len(raw_body)}")
+    body_preview = request_log_policy.preview(raw_body)
+    if body_preview:
+        parts.append(f"body={body_preview}")
+    logger.log(level, f"Received request for /{route}: " + ", ".join(parts))
@@ -0,0 +1,203 @@
+"""
+工具调用指标
+
+ToolMetricsHandler 作为 callback 挂在每次运行上，记录每次工具调用的：
+名称、耗时、数据库耗时、SQL 语句数、输出字符数、错误类型，并在进程内按工具聚合成直方图。
+数据库耗时通过 SQLAlchemy 全局 cursor 事件统计，借助 ContextVar 归属到当前工具调用。
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 直方图桶上界（毫秒），最后一个桶为 +Inf
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+@dataclass
+class _ToolCall:
+    """单次工具调用的进行中状态"""
+    name: str
+    start: float
+    db_time: float = 0.0
+    sql_count: int = 0
+
+
+# 当前线程/协程正在执行的工具调用，用于把 SQL 耗时归属到工具
+_current_tool_call: ContextVar[Optional[_ToolCall]] = ContextVar("current_tool_call", default=None)
+
+
+class Histogram:
+    """固定桶直方图"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按桶上界估算分位数"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(float(self.buckets[i]), self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [str(b) for b in self.buckets] + ["+Inf"]
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "avg": round(self.sum / self.count, 3) if self.count else 0,
+            "max": round(self.max, 3),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+@dataclass
+class ToolStats:
+    """单个工具的聚合指标"""
+    wall_ms: Histogram = field(default_factory=Histogram)
+    db_ms: Histogram = field(default_factory=Histogram)
+    sql_statements: int = 0
+    output_chars: int = 0
+    max_output_chars: int = 0
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        calls = self.wall_ms.count
+        return {
+            "calls": calls,
+            "wall_ms": self.wall_ms.to_dict(),
+            "db_ms": self.db_ms.to_dict(),
+            "sql_statements": self.sql_statements,
+            "avg_sql_statements": round(self.sql_statements / calls, 2) if calls else 0,
+            "output_chars": self.output_chars,
+            "avg_output_chars": round(self.output_chars / calls, 1) if calls else 0,
+            "max_output_chars": self.max_output_chars,
+            "errors": dict(self.errors),
+        }
+
+
+class ToolMetrics:
+    """进程内的工具指标注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools: Dict[str, ToolStats] = {}
+
+    def record(self, call: _ToolCall, output_chars: int, error: Optional[BaseException] = None):
+        wall_ms = (time.perf_counter() - call.start) * 1000
+        with self._lock:
+            stats = self._tools.get(call.name)
+            if stats is None:
+                stats = self._tools[call.name] = ToolStats()
+            stats.wall_ms.observe(wall_ms)
+            stats.db_ms.observe(call.db_time * 1000)
+            stats.sql_statements += call.sql_count
+            stats.output_chars += output_chars
+            stats.max_output_chars = max(stats.max_output_chars, output_chars)
+            if error is not None:
+                err_name = type(error).__name__
+                stats.errors[err_name] = stats.errors.get(err_name, 0) + 1
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """按总耗时降序返回各工具指标"""
+        with self._lock:
+            items = [dict(name=name, **stats.to_dict()) for name, stats in self._tools.items()]
+        items.sort(key=lambda d: d["wall_ms"]["sum"], reverse=True)
+        return items
+
+    def reset(self):
+        with self._lock:
+            self._tools.clear()
+
+
+tool_metrics = ToolMetrics()
+
+
+class ToolMetricsHandler(BaseCallbackHandler):
+    """记录工具调用指标的 callback，无状态地共享给所有运行"""
+
+    # 必须与工具在同一上下文中同步执行，ContextVar 才能传递给工具函数
+    run_inline = True
+
+    def __init__(self, metrics: ToolMetrics = tool_metrics):
+        self.metrics = metrics
+        self._calls: Dict[UUID, _ToolCall] = {}
+        self._lock = threading.Lock()
+
+    def on_tool_start(
+            self,
+            serialized: Dict[str, Any],
+            input_str: str,
+            *,
+            run_id: UUID,
+            **kwargs: Any,
+    ) -> Any:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        call = _ToolCall(name=name, start=time.perf_counter())
+        with self._lock:
+            self._calls[run_id] = call
+        _current_tool_call.set(call)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> Any:
+        call = self._pop(run_id)
+        if call is not None:
+            content = getattr(output, "content", output)
+            self.metrics.record(call, len(content) if isinstance(content, str) else len(str(content)))
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        call = self._pop(run_id)
+        if call is not None:
+            self.metrics.record(call, 0, error)
+
+    def _pop(self, run_id: UUID) -> Optional[_ToolCall]:
+        with self._lock:
+            call = self._calls.pop(run_id, None)
+        if call is not None and _current_tool_call.get() is call:
+            _current_tool_call.set(None)
+        return call
+
+
+tool_metrics_handler = ToolMetricsHandler()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # 开始时间挂在本次执行的 context 上：语句出错时不会走 after_cursor_execute，
+    # 放在连接级的栈里会残留，导致同一池化连接上后续语句的计时错位
+    if context is not None and _current_tool_call.get() is not None:
+        context._tool_query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    call = _current_tool_call.get()
+    start = getattr(context, "_tool_query_start", None)
+    if call is None or start is None:
+        return
+    call.db_time += time.perf_counter() - start
+    call.sql_count += 1
@@ -0,0 +1,109 @@
+"""
+cozeloop 链路采样与后台导出
+
+- RunSampler: 在每次运行开始时决定是否采样（头部采样）；采中的运行挂完整的 LoopTracer 回调，
+  未采中的运行只挂 RootErrorTracer，不为子节点创建任何 span
+- RootErrorTracer: 只记录根 chain，根 chain 出错时补发一个根 span（出错的运行始终可见，但不含子节点）
+- TraceFlusher: 后台线程按固定间隔 flush，请求路径不再同步等待导出
+"""
+import json
+import logging
+import random
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+
+class RunSampler:
+    """按运行采样，统计线程安全"""
+
+    def __init__(self, sample_rate: float = 1.0):
+        self.sample_rate = min(1.0, max(0.0, sample_rate))
+        self._lock = threading.Lock()
+        self.stats = {"sampled": 0, "unsampled": 0, "errors_reported": 0}
+
+    def should_sample(self) -> bool:
+        sampled = self.sample_rate >= 1.0 or (self.sample_rate > 0.0 and random.random() < self.sample_rate)
+        with self._lock:
+            self.stats["sampled" if sampled else "unsampled"] += 1
+        return sampled
+
+    def record_error(self):
+        with self._lock:
+            self.stats["errors_reported"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "sample_rate": self.sample_rate}
+
+
+class RootErrorTracer(BaseCallbackHandler):
+    """未采中运行的回调：只跟踪根 chain，出错时通过 cozeloop 公开接口补发根 span"""
+
+    def __init__(self, client, sampler: RunSampler, tags: Optional[Dict[str, Any]] = None):
+        self.client = client
+        self.sampler = sampler
+        self.tags = tags or {}
+        # 根 run_id -> (名称, 开始时间, 输入)
+        self._roots: Dict[UUID, tuple] = {}
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Any, *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        if parent_run_id is None:
+            self._roots[run_id] = (kwargs.get("name") or "LangGraph", datetime.now(), inputs)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._roots.pop(run_id, None)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        root = self._roots.pop(run_id, None)
+        if root is None:
+            return
+        name, start_time, inputs = root
+        try:
+            span = self.client.start_span(name, "graph", start_time=start_time, start_new_trace=True)
+            span.set_tags({**self.tags, "input": json.dumps(inputs, ensure_ascii=False, default=str)})
+            span.set_error(error)
+            span.finish()
+            self.sampler.record_error()
+        except Exception as e:
+            logger.warning(f"Failed to report error trace for unsampled run: {e}")
+
+
+class TraceFlusher:
+    """后台定时 flush 链路数据"""
+
+    def __init__(self, client, interval: float):
+        self.client = client
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="trace-flusher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        try:
+            self.client.flush()
+        except Exception as e:
+            logger.warning(f"Failed to flush traces: {e}")
+
+    def stop(self):
+        """停止后台线程并做最后一次 flush"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval)
+            self._thread = None
+        self.flush()
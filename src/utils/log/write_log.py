@@ -1,13 +1,24 @@
+import atexit
+import copy
 import logging
 import logging.handlers
-import json
 import os
+import queue
+import sys
 from contextvars import ContextVar
 from typing import Optional
 from pathlib import Path
 
+import orjson
+
 from coze_coding_utils.runtime_ctx.context import Context
-from utils.log.config import LOG_DIR
+from utils.log.config import (
+    LOG_DIR,
+    LOG_QUEUE_ENABLED,
+    LOG_QUEUE_SIZE,
+    LOG_QUEUE_OVERFLOW,
+    LOG_QUEUE_BLOCK_TIMEOUT,
+)
 
 request_context: ContextVar[Optional[Context]] = ContextVar('request_context', default=None)
 
@@ -45,74 +56,162 @@ class APSchedulerFilter(logging.Filter):
         return True
 
 
+# LogRecord 自带属性和上下文字段，不作为 extra 输出；只在模块加载时构建一次
+RESERVED_RECORD_KEYS = frozenset([
+    'name', 'msg', 'args', 'created', 'filename', 'funcName',
+    'levelname', 'levelno', 'lineno', 'module', 'msecs',
+    'message', 'pathname', 'process', 'processName', 'relativeCreated',
+    'thread', 'threadName', 'exc_info', 'exc_text', 'stack_info',
+    'log_id', 'run_id', 'space_id', 'project_id', 'method',
+    'x_tt_env', 'rpc_persist_rec_rec_biz_scene',
+    'rpc_persist_coze_record_root_id', 'rpc_persist_rec_root_entity_type',
+    'rpc_persist_rec_root_entity_id',
+])
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _json_default(obj):
+    """orjson 无法直接序列化的 extra 字段统一转成字符串"""
+    return str(obj)
+
+
 class JsonFormatter(logging.Formatter):
-    
-    def format(self, record: logging.LogRecord) -> str:
+
+    def _log_data(self, record: logging.LogRecord) -> dict:
+        get = record.__dict__.get
         log_data = {
             'message': record.getMessage(),
             'timestamp': self.formatTime(record, self.datefmt),
             'level': record.levelname,
             'logger': record.name,
-            'log_id': getattr(record, 'log_id', ''),
-            'run_id': getattr(record, 'run_id', ''),
-            'space_id': getattr(record, 'space_id', ''),
-            'project_id': getattr(record, 'project_id', ''),
-            'method': getattr(record, 'method', ''),
-            'x_tt_env': getattr(record, 'x_tt_env', ''),
+            'log_id': get('log_id', ''),
+            'run_id': get('run_id', ''),
+            'space_id': get('space_id', ''),
+            'project_id': get('project_id', ''),
+            'method': get('method', ''),
+            'x_tt_env': get('x_tt_env', ''),
             'lineno': record.lineno,
             'funcName': record.funcName,
         }
 
         if record.exc_info:
             log_data['exc_info'] = self.formatException(record.exc_info)
-        
+        elif record.exc_text:
+            # 经过 QueueHandler 的记录异常已提前格式化为文本
+            log_data['exc_info'] = record.exc_text
+
         for key, value in record.__dict__.items():
-            if key not in ['name', 'msg', 'args', 'created', 'filename', 'funcName', 
-                          'levelname', 'levelno', 'lineno', 'module', 'msecs', 
-                          'message', 'pathname', 'process', 'processName', 'relativeCreated',
-                          'thread', 'threadName', 'exc_info', 'exc_text', 'stack_info',
-                          'log_id', 'run_id', 'space_id', 'project_id', 'method',
-                          'x_tt_env', 'rpc_persist_rec_rec_biz_scene', 
-                          'rpc_persist_coze_record_root_id', 'rpc_persist_rec_root_entity_type',
-                          'rpc_persist_rec_root_entity_id']:
+            if key not in RESERVED_RECORD_KEYS:
                 log_data[key] = value
-        
-        return json.dumps(log_data, ensure_ascii=False)
 
+        return log_data
 
-class PlainTextFormatter(logging.Formatter):
-    
     def format(self, record: logging.LogRecord) -> str:
-        log_data = {
-            'message': record.getMessage(),
-            'timestamp': self.formatTime(record, self.datefmt),
-            'level': record.levelname,
-            'logger': record.name,
-            'log_id': getattr(record, 'log_id', ''),
-            'run_id': getattr(record, 'run_id', ''),
-            'space_id': getattr(record, 'space_id', ''),
-            'project_id': getattr(record, 'project_id', ''),
-            'method': getattr(record, 'method', ''),
-            'x_tt_env': getattr(record, 'x_tt_env', ''),
-            'lineno': record.lineno,
-            'funcName': record.funcName,
-        }
-        
+        return orjson.dumps(self._log_data(record), default=_json_default, option=_ORJSON_OPTIONS).decode()
+
+
+class PlainTextFormatter(JsonFormatter):
+    """输出与 JsonFormatter 相同，保留类名兼容已有配置"""
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    有界队列的 QueueHandler
+
+    在调用线程只做上下文注入和消息拼接，格式化与 I/O 交给 QueueListener 线程；
+    队列满时按 overflow_policy 丢弃（计数）或限时阻塞。
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow_policy: str = "drop", block_timeout: float = 1.0):
+        super().__init__(log_queue)
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 只合并 msg/args 并把异常转成文本，保留 extra 字段供 JsonFormatter 使用
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
         if record.exc_info:
-            log_data['exc_info'] = self.formatException(record.exc_info)
-        
-        for key, value in record.__dict__.items():
-            if key not in ['name', 'msg', 'args', 'created', 'filename', 'funcName', 
-                          'levelname', 'levelno', 'lineno', 'module', 'msecs', 
-                          'message', 'pathname', 'process', 'processName', 'relativeCreated',
-                          'thread', 'threadName', 'exc_info', 'exc_text', 'stack_info',
-                          'log_id', 'run_id', 'space_id', 'project_id', 'method',
-                          'x_tt_env', 'rpc_persist_rec_rec_biz_scene', 
-                          'rpc_persist_coze_record_root_id', 'rpc_persist_rec_root_entity_type',
-                          'rpc_persist_rec_root_entity_id']:
-                log_data[key] = value
-        
-        return json.dumps(log_data, ensure_ascii=False)
+            if not record.exc_text:
+                record.exc_text = _exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            if self.overflow_policy == "block":
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "max_queue_size": self.queue.maxsize,
+            "dropped": self.dropped,
+            "overflow_policy": self.overflow_policy,
+        }
+
+
+class BoundedQueueListener(logging.handlers.QueueListener):
+    """
+    有界队列的 QueueListener
+
+    标准库的 stop() 用 put_nowait 放入结束标记，队列满时抛出 queue.Full，监听线程不会退出，
+    剩余日志也不会写完。这里限时等待队列腾出空间；仍然放不进去时在 stderr 记录未写出的条数，
+    不再等待监听线程（日志系统本身可能已经卡住，不能再走 logging）。
+    """
+
+    def __init__(self, log_queue: queue.Queue, *handlers, respect_handler_level: bool = False,
+                 stop_timeout: float = 5.0):
+        super().__init__(log_queue, *handlers, respect_handler_level=respect_handler_level)
+        self.stop_timeout = stop_timeout
+        self.sentinel_dropped = 0
+
+    def stop(self):
+        if self._thread is None:
+            return
+        try:
+            self.queue.put(self._sentinel, timeout=self.stop_timeout)
+        except queue.Full:
+            self.sentinel_dropped += 1
+            sys.stderr.write(
+                f"Log queue listener did not stop within {self.stop_timeout}s, "
+                f"{self.queue.qsize()} queued records were not written\n"
+            )
+            self._thread = None
+            return
+        self._thread.join(self.stop_timeout)
+        self._thread = None
+
+
+_exc_formatter = logging.Formatter()
+_queue_handler: Optional[BoundedQueueHandler] = None
+_queue_listener: Optional[BoundedQueueListener] = None
+
+
+def _stop_queue_listener():
+    global _queue_listener, _queue_handler
+    if _queue_listener is not None:
+        try:
+            _queue_listener.stop()
+        except Exception:
+            pass
+    _queue_listener = None
+    _queue_handler = None
+
+
+atexit.register(_stop_queue_listener)
+
+
+def get_logging_stats() -> dict:
+    """获取日志队列统计，未启用队列模式时返回 {"queue": None}"""
+    return {"queue": _queue_handler.get_stats() if _queue_handler is not None else None}
 
 
 def setup_logging(
@@ -121,8 +220,12 @@ def setup_logging(
     backup_count: int = 5,
     log_level: str = "INFO",
     use_json_format: bool = True,
-    console_output: bool = True
+    console_output: bool = True,
+    use_queue: bool = LOG_QUEUE_ENABLED,
+    queue_size: int = LOG_QUEUE_SIZE,
+    overflow_policy: str = LOG_QUEUE_OVERFLOW,
 ):
+    global _queue_handler, _queue_listener
     
     if log_file is None:
         try:
@@ -138,6 +241,7 @@ def setup_logging(
     root_logger = logging.getLogger()
     root_logger.setLevel(getattr(logging, log_level.upper(), logging.INFO))
     
+    _stop_queue_listener()
     root_logger.handlers.clear()
     
     context_filter = ContextFilter()
@@ -162,7 +266,7 @@ def setup_logging(
     file_handler.setFormatter(file_formatter)
     file_handler.addFilter(context_filter)
     file_handler.addFilter(apscheduler_filter)
-    root_logger.addHandler(file_handler)
+    handlers = [file_handler]
     
     if console_output:
         console_handler = logging.StreamHandler()
@@ -175,11 +279,34 @@ def setup_logging(
         console_handler.setFormatter(console_formatter)
         console_handler.addFilter(context_filter)
         console_handler.addFilter(apscheduler_filter)
-        root_logger.addHandler(console_handler)
-    
-    logging.info(f"Logging configured: file={log_file}, max_bytes={max_bytes}, backup_count={backup_count}")
+        handlers.append(console_handler)
+
+    if use_queue:
+        # request_context 是 ContextVar，必须在调用线程上注入，后台线程里已经拿不到，
+        # 所以过滤器挪到 QueueHandler 上
+        for handler in handlers:
+            handler.removeFilter(context_filter)
+            handler.removeFilter(apscheduler_filter)
+        _queue_handler = BoundedQueueHandler(
+            queue.Queue(maxsize=max(1, queue_size)),
+            overflow_policy=overflow_policy,
+            block_timeout=LOG_QUEUE_BLOCK_TIMEOUT,
+        )
+        _queue_handler.addFilter(context_filter)
+        _queue_handler.addFilter(apscheduler_filter)
+        root_logger.addHandler(_queue_handler)
+        _queue_listener = BoundedQueueListener(
+            _queue_handler.queue, *handlers, respect_handler_level=True
+        )
+        _queue_listener.start()
+    else:
+        for handler in handlers:
+            root_logger.addHandler(handler)
+
+    logging.info(f"Logging configured: file={log_file}, max_bytes={max_bytes}, backup_count={backup_count}, "
+                 f"queue={'on' if use_queue else 'off'}")
     
     return log_file
 
 
-__all__ = ['setup_logging', 'request_context', 'ContextFilter', 'APSchedulerFilter', 'JsonFormatter', 'PlainTextFormatter']
+__all__ = ['setup_logging', 'get_logging_stats', 'request_context', 'BoundedQueueHandler', 'ContextFilter', 'APSchedulerFilter', 'JsonFormatter', 'PlainTextFormatter']
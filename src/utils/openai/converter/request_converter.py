@@ -1,11 +1,12 @@
 """OpenAI 请求转换器: OpenAI Request → LangGraph Input"""
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from utils.openai.types.request import (
     ChatCompletionRequest,
     ChatMessage,
 )
 from utils.file.file import File, FileOps, infer_file_category
+from utils.file.ingest import file_ingestor
 
 
 class RequestConverter:
@@ -40,27 +41,57 @@ class RequestConverter:
         return request.session_id
 
     @staticmethod
-    def to_stream_input(request: ChatCompletionRequest) -> Dict[str, Any]:
+    def _last_user_message(request: ChatCompletionRequest) -> Optional[ChatMessage]:
+        for msg in reversed(request.messages):
+            if msg.role == "user":
+                return msg
+        return None
+
+    @staticmethod
+    def to_stream_input(
+        request: ChatCompletionRequest,
+        file_contents: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
         """
         转换为 LangGraph stream 输入格式
 
         只取最后一条 user 消息进行处理，历史由 session_id + checkpointer 管理
+        file_contents: 预先提取好的文档内容（url -> 文本），命中时不再同步下载解析
         """
-        # 找到最后一条 user 消息
-        last_user_msg: ChatMessage | None = None
-        for msg in reversed(request.messages):
-            if msg.role == "user":
-                last_user_msg = msg
-                break
-
+        last_user_msg = RequestConverter._last_user_message(request)
         if last_user_msg is None:
             return {"messages": []}
 
-        content_parts = RequestConverter._convert_content(last_user_msg.content)
+        content_parts = RequestConverter._convert_content(last_user_msg.content, file_contents)
         return {"messages": [{"role": "user", "content": content_parts}]}
 
     @staticmethod
-    def _convert_content(content: Any) -> List[Dict[str, Any]]:
+    async def ato_stream_input(request: ChatCompletionRequest) -> Dict[str, Any]:
+        """
+        异步版 to_stream_input：file_url 文档通过 file_ingestor 并发下载解析，不阻塞事件循环
+        """
+        last_user_msg = RequestConverter._last_user_message(request)
+        urls: List[str] = []
+        if last_user_msg is not None and isinstance(last_user_msg.content, list):
+            for part in last_user_msg.content:
+                if not isinstance(part, dict) or part.get("type") != "file_url":
+                    continue
+                url = (part.get("file_url") or {}).get("url", "")
+                if not url or url in urls:
+                    continue
+                file_type, _ = infer_file_category(url)
+                if file_type not in ("image", "video", "audio"):
+                    urls.append(url)
+        file_contents: Dict[str, str] = {}
+        if urls:
+            texts = await file_ingestor.extract_texts(
+                [File(url=url, file_type=infer_file_category(url)[0]) for url in urls]
+            )
+            file_contents = dict(zip(urls, texts))
+        return RequestConverter.to_stream_input(request, file_contents)
+
+    @staticmethod
+    def _convert_content(content: Any, file_contents: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
         """
         转换消息内容为 LangGraph 格式
 
@@ -79,14 +110,14 @@ class RequestConverter:
         if isinstance(content, list):
             result: List[Dict[str, Any]] = []
             for part in content:
-                converted = RequestConverter._convert_content_part(part)
+                converted = RequestConverter._convert_content_part(part, file_contents)
                 result.extend(converted)
             return result
 
         return []
 
     @staticmethod
-    def _convert_content_part(part: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _convert_content_part(part: Dict[str, Any], file_contents: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
         """转换单个内容部分"""
         part_type = part.get("type", "text")
 
@@ -129,13 +160,17 @@ class RequestConverter:
             url = file_url_data.get("url", "")
             file_name = file_url_data.get("file_name", "")
             if url:
-                return RequestConverter._process_file_url(url, file_name)
+                return RequestConverter._process_file_url(url, file_name, file_contents)
             return []
 
         return []
 
     @staticmethod
-    def _process_file_url(url: str, file_name: str = "") -> List[Dict[str, Any]]:
+    def _process_file_url(
+        url: str,
+        file_name: str = "",
+        file_contents: Optional[Dict[str, str]] = None,
+    ) -> List[Dict[str, Any]]:
         """处理文件 URL，根据文件类型进行不同处理"""
         try:
             file_type, _ = infer_file_category(url)
@@ -155,7 +190,10 @@ class RequestConverter:
                 return [{"type": "text", "text": f"audio url: {url}"}]
             else:
                 # 其他文件类型，尝试提取文本内容
-                file_content = FileOps.extract_text(file_data)
+                if file_contents is not None and url in file_contents:
+                    file_content = file_contents[url]
+                else:
+                    file_content = FileOps.extract_text(file_data)
                 return [{
                     "type": "text",
                     "text": f"file name: {file_name}, url: {url}\n\nFile Content:\n{file_content}",
@@ -65,7 +65,7 @@ class OpenAIChatHandler:
             )
 
             # 3. 转换为 LangGraph 输入
-            stream_input = self.request_converter.to_stream_input(request)
+            stream_input = await self.request_converter.ato_stream_input(request)
 
             if not stream_input.get("messages"):
                 return self._error_response(
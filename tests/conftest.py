@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 服务代码以 src 为根目录导入（与 main.py 的运行方式一致）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
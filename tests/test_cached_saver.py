@@ -0,0 +1,77 @@
+import asyncio
+
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.memory import MemorySaver
+
+from storage.memory.cached_saver import CachedCheckpointSaver
+
+
+def _config(thread_id="t1"):
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+
+
+def _put(saver, thread_id="t1"):
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_versions"] = {"messages": 1}
+    return saver.put(_config(thread_id), checkpoint, {"source": "input", "step": 0}, {"messages": 1})
+
+
+def test_hit_returns_copy():
+    saver = CachedCheckpointSaver(MemorySaver())
+    _put(saver)
+
+    first = saver.get_tuple(_config())
+    # 模拟 pregel apply_writes 原地修改后运行失败、没有 put
+    first.checkpoint["channel_versions"]["messages"] = 99
+    first.checkpoint["versions_seen"]["node"] = {"messages": 99}
+
+    second = saver.get_tuple(_config())
+    assert saver.get_stats()["hits"] == 2
+    assert second.checkpoint["channel_versions"] == {"messages": 1}
+    assert "node" not in second.checkpoint["versions_seen"]
+    assert second.checkpoint is not first.checkpoint
+
+
+def test_async_hit_returns_copy():
+    saver = CachedCheckpointSaver(MemorySaver())
+    _put(saver)
+
+    async def run():
+        first = await saver.aget_tuple(_config())
+        first.checkpoint["channel_versions"]["messages"] = 99
+        return await saver.aget_tuple(_config())
+
+    assert asyncio.run(run()).checkpoint["channel_versions"] == {"messages": 1}
+
+
+def test_backfill_is_isolated_from_caller():
+    inner = MemorySaver()
+    _put(inner)
+    saver = CachedCheckpointSaver(inner)
+
+    miss = saver.get_tuple(_config())
+    miss.checkpoint["channel_versions"]["messages"] = 99
+    assert saver.get_tuple(_config()).checkpoint["channel_versions"] == {"messages": 1}
+
+
+def test_ttl_expiry_reads_through(monkeypatch):
+    saver = CachedCheckpointSaver(MemorySaver(), ttl_seconds=5)
+    _put(saver)
+    assert saver.get_tuple(_config()) is not None
+
+    import storage.memory.cached_saver as module
+    now = module.time.monotonic()
+    monkeypatch.setattr(module.time, "monotonic", lambda: now + 6)
+    assert saver.get_tuple(_config()) is not None
+    assert saver.get_stats()["misses"] == 1
+
+
+def test_stats_report_hit_rate():
+    saver = CachedCheckpointSaver(MemorySaver())
+    _put(saver)
+    saver.get_tuple(_config())
+    saver.invalidate("t1")
+    saver.get_tuple(_config())
+
+    stats = saver.get_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
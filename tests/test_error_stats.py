@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from utils.error import classifier as classifier_module
+from utils.error.classifier import ErrorClassifier, ErrorInfo, ErrorStats
+from utils.error.codes import ErrorCategory
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(classifier_module.time, "time", clock)
+    return clock
+
+
+def _info(code: int = 100001, category: ErrorCategory = ErrorCategory.CODE_ERROR, node: str = "node_a") -> ErrorInfo:
+    return ErrorInfo(
+        code=code,
+        message="boom",
+        category=category,
+        category_name=category.name,
+        description="",
+        node_name=node,
+    )
+
+
+def test_window_rate_counts_only_recent_events(clock):
+    stats = ErrorStats(window_seconds=30)
+
+    stats.record(_info(code=100001, node="node_a"))
+    stats.record(_info(code=100001, node="node_a"))
+    clock.now += 20
+    stats.record(_info(code=300001, category=ErrorCategory.API_ERROR, node="node_b"))
+
+    # 30 秒窗口内的 3 次错误折算为每分钟 6 次
+    rate = stats.snapshot()["rate_per_min"]
+    assert rate["window_seconds"] == 30
+    assert rate["total"] == 6.0
+    assert rate["by_code"] == {"100001": 4.0, "300001": 2.0}
+    assert rate["by_category"] == {"CODE_ERROR": 4.0, "API_ERROR": 2.0}
+    assert rate["by_node"] == {"node_a": 4.0, "node_b": 2.0}
+
+    # 前两次滑出窗口，累计计数不受影响
+    clock.now += 15
+    snapshot = stats.snapshot()
+    assert snapshot["rate_per_min"]["total"] == 2.0
+    assert snapshot["rate_per_min"]["by_code"] == {"300001": 2.0}
+    assert snapshot["total_count"] == 3
+    assert snapshot["by_code"] == {"100001": 2, "300001": 1}
+
+    clock.now += 60
+    assert stats.snapshot()["rate_per_min"]["total"] == 0
+
+
+def test_recent_errors_ring_buffer_keeps_latest(clock):
+    stats = ErrorStats(max_recent_errors=3)
+    for i in range(5):
+        stats.record(_info(code=100000 + i))
+
+    assert [e.code for e in stats.recent_errors] == [100002, 100003, 100004]
+    assert [e["code"] for e in stats.snapshot(recent=2)["recent_errors"]] == [100003, 100004]
+    assert stats.total_count == 5
+
+
+def test_counters_merge_across_threads(clock):
+    stats = ErrorStats()
+
+    def worker():
+        for _ in range(100):
+            stats.record(_info(node="node_t"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # 退出线程的分片并入公共分片后计数不丢
+    assert stats.total_count == 800
+    assert stats.by_node == {"node_t": 800}
+    assert stats.by_category == {"CODE_ERROR": 800}
+
+
+def test_classifier_snapshot_reports_classified_errors(clock):
+    error_classifier = ErrorClassifier()
+    error_classifier.classify(ValueError("bad value"), {"node_name": "node_v"})
+
+    snapshot = error_classifier.get_stats_snapshot()
+    assert snapshot["total_count"] == 1
+    assert snapshot["by_node"] == {"node_v": 1}
+    assert snapshot["rate_per_min"]["total"] == 1.0
+    assert snapshot["recent_errors"][0]["node_name"] == "node_v"
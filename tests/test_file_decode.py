@@ -0,0 +1,28 @@
+import io
+
+import utils.file.file as file_mod
+from utils.file.file import FileOps
+
+
+def test_utf8_decoded_without_detection(monkeypatch):
+    monkeypatch.setattr(file_mod.chardet, "detect", lambda data: (_ for _ in ()).throw(AssertionError("detect called")))
+    assert FileOps._decode_text("价格：¥12，数量 3".encode("utf-8"), max_chars=0) == "价格：¥12，数量 3"
+
+
+def test_utf8_bom_is_stripped():
+    assert FileOps._decode_text(b"\xef\xbb\xbfhello", max_chars=0) == "hello"
+
+
+def test_truncation_inside_multibyte_char_stays_utf8():
+    # 预算 2 字符 -> 读取 8 字节，截断在第 3 个汉字中间
+    assert FileOps._decode_text(io.BytesIO("一二三四".encode("utf-8")), max_chars=2) == "一二"
+
+
+def test_non_utf8_falls_back_to_detection():
+    text = "这是一个用于测试编码探测的中文段落，包含足够多的字符以便探测器判断编码。" * 4
+    assert FileOps._decode_text(text.encode("gb18030"), max_chars=0) == text
+
+
+def test_undetectable_bytes_use_gb18030(monkeypatch):
+    monkeypatch.setattr(file_mod.chardet, "detect", lambda data: {"encoding": None})
+    assert FileOps._decode_text("中文".encode("gbk"), max_chars=0) == "中文"
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+import utils.file.file as file_mod
+from utils.file import parse_worker
+from utils.file.file import File
+from utils.file.ingest import FileIngestor
+from utils.file.text_cache import ExtractedTextCache
+
+
+def _hang(content, ext):
+    time.sleep(60)
+
+
+def _crash(content, ext):
+    os._exit(1)
+
+
+@pytest.fixture
+def ingestor(monkeypatch, tmp_path):
+    cache = ExtractedTextCache(str(tmp_path / "cache"), max_chars=1000, max_bytes=1 << 20, enabled=False)
+    monkeypatch.setattr(file_mod, "get_text_cache", lambda: cache)
+    ing = FileIngestor(concurrency=2, timeout=3, process_workers=1)
+    ing.start()
+    yield ing
+    ing.close()
+
+
+def _pdf(tmp_path, name="a.pdf") -> File:
+    path = tmp_path / name
+    path.write_bytes(b"%PDF-1.4 not really a pdf")
+    return File(url=str(path), file_type="document")
+
+
+def test_start_spawns_workers_up_front(ingestor):
+    pool = ingestor._pool
+    assert pool is not None
+    assert len(pool._processes) == ingestor.process_workers
+
+
+def test_plain_text_skips_pool(ingestor, tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("你好", encoding="utf-8")
+    assert asyncio.run(ingestor.extract_text(File(url=str(path), file_type="document"))) == "你好"
+    assert ingestor.get_stats()["succeeded"] == 1
+
+
+def test_hung_parse_recycles_pool(ingestor, monkeypatch, tmp_path):
+    pool = ingestor._pool
+    parse_document = parse_worker.parse_document
+    monkeypatch.setattr(parse_worker, "parse_document", _hang)
+
+    text = asyncio.run(ingestor.extract_text(_pdf(tmp_path)))
+
+    assert text.startswith("[FileOps Error]")
+    assert ingestor.get_stats()["pool_recycles"] == 1
+    # 卡住的 worker 被结束，下次解析使用新的进程池
+    monkeypatch.setattr(parse_worker, "parse_document", parse_document)
+    asyncio.run(ingestor.extract_text(_pdf(tmp_path, "b.pdf")))
+    assert ingestor._pool is not None and ingestor._pool is not pool
+
+
+def test_crashed_worker_recycles_pool(ingestor, monkeypatch, tmp_path):
+    pool = ingestor._pool
+    monkeypatch.setattr(parse_worker, "parse_document", _crash)
+
+    text = asyncio.run(ingestor.extract_text(_pdf(tmp_path)))
+
+    assert text.startswith("[FileOps Error]")
+    assert ingestor.get_stats()["pool_recycles"] == 2  # 首次崩溃回收后重试一次，仍然崩溃
+    assert ingestor._pool is None or ingestor._pool is not pool
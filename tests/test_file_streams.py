@@ -0,0 +1,135 @@
+import hashlib
+import io
+import mmap
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.file import file as file_module
+from utils.file import text_cache as text_cache_module
+from utils.file.file import BufferIO, File, FileOps, stream_digest
+from utils.file.text_cache import ExtractedTextCache
+
+
+def test_buffer_io_reads_and_seeks_without_copy():
+    data = bytearray(b"0123456789")
+    stream = BufferIO(data)
+
+    assert stream.read(3) == b"012"
+    assert stream.tell() == 3
+    buf = bytearray(4)
+    assert stream.readinto(buf) == 4
+    assert bytes(buf) == b"3456"
+    assert stream.seek(-2, io.SEEK_END) == 8
+    assert stream.read() == b"89"
+    assert stream.read(5) == b""
+
+    # 视图直接指向原缓冲区
+    data[0:1] = b"X"
+    stream.seek(0)
+    assert stream.read(1) == b"X"
+    assert stream.getbuffer().obj is data
+
+    with pytest.raises(ValueError):
+        stream.seek(-1)
+
+
+def test_buffer_io_works_with_buffered_reader():
+    reader = io.BufferedReader(BufferIO(b"line1\nline2\n"))
+    assert reader.readline() == b"line1\n"
+    assert reader.read() == b"line2\n"
+
+
+def test_local_file_is_mmapped_and_closed(tmp_path, monkeypatch):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"hello mmap")
+
+    closed = []
+    real_mmap = mmap.mmap
+
+    class TrackingMmap(real_mmap):
+        def close(self):
+            closed.append(True)
+            super().close()
+
+    monkeypatch.setattr(file_module.mmap, "mmap", TrackingMmap)
+
+    stream, ext, validators = FileOps._open_stream(File(url=str(path)))
+    assert ext == ".txt"
+    assert validators == {}
+    assert isinstance(stream.getbuffer().obj, TrackingMmap)
+    assert stream_digest(stream) == hashlib.sha256(b"hello mmap").hexdigest()
+    assert stream.tell() == 0
+    assert stream.read() == b"hello mmap"
+
+    stream.close()
+    assert closed == [True]
+    # 重复 close 不会再次关闭 mmap
+    stream.close()
+    assert closed == [True]
+
+
+def test_empty_local_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_cache_module, "_text_cache", ExtractedTextCache(str(tmp_path / "cache"), 1000))
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    stream, _, _ = FileOps._open_stream(File(url=str(path)))
+    with stream:
+        assert stream.read() == b""
+    assert FileOps.extract_text(File(url=str(path))) == ""
+
+
+def test_local_file_over_limit_is_rejected(tmp_path, monkeypatch):
+    path = tmp_path / "big.txt"
+    path.write_bytes(b"x" * 32)
+    monkeypatch.setattr(file_module, "MAX_FILE_SIZE", 16)
+    with pytest.raises(Exception, match="超过限制"):
+        FileOps._open_stream(File(url=str(path)))
+
+
+@pytest.fixture
+def origin():
+    body = b"a" * 4096
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/data.txt", body
+    server.shutdown()
+    server.server_close()
+
+
+def test_remote_download_spills_to_disk_past_memory_limit(origin, tmp_path, monkeypatch):
+    url, body = origin
+    monkeypatch.setattr(FileOps, "DOWNLOAD_DIR", str(tmp_path))
+
+    monkeypatch.setattr(file_module, "FILE_SPOOL_MAX_MEMORY", 1 << 20)
+    stream, _, _ = FileOps._open_stream(File(url=url))
+    with stream:
+        assert not stream._rolled
+        assert stream.read() == body
+
+    monkeypatch.setattr(file_module, "FILE_SPOOL_MAX_MEMORY", 1024)
+    stream, _, _ = FileOps._open_stream(File(url=url))
+    with stream:
+        assert stream._rolled
+        assert stream_digest(stream) == hashlib.sha256(body).hexdigest()
+        assert stream.read() == body
+
+
+def test_remote_download_over_limit_is_rejected(origin, tmp_path, monkeypatch):
+    url, _ = origin
+    monkeypatch.setattr(FileOps, "DOWNLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(file_module, "MAX_FILE_SIZE", 1024)
+    with pytest.raises(Exception, match="超过限制"):
+        FileOps._open_stream(File(url=url))
@@ -0,0 +1,100 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError
+
+from utils.file import file as file_module
+from utils.file.file import _BoundedRetry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(file_module.time, "monotonic", clock)
+    return clock
+
+
+def _fail(retry: _BoundedRetry) -> _BoundedRetry:
+    return retry.increment(method="GET", url="/", error=ConnectionError("refused"))
+
+
+def test_total_time_caps_retries_before_count(clock, monkeypatch):
+    monkeypatch.setattr(_BoundedRetry, "max_retry_time", 10)
+    retry = _BoundedRetry(total=100, backoff_factor=0)
+    assert retry._first_failure_at is None
+
+    retry = _fail(retry)
+    assert retry._first_failure_at == 100.0
+    clock.now += 5
+    retry = _fail(retry)
+    # 首次失败时间沿用下去，不随每次失败刷新
+    assert retry._first_failure_at == 100.0
+    assert not retry.is_exhausted()
+
+    clock.now += 6
+    assert retry.is_exhausted()
+    with pytest.raises(MaxRetryError):
+        _fail(retry)
+
+
+def test_count_limit_still_applies(clock):
+    retry = _BoundedRetry(total=1, backoff_factor=0)
+    retry = _fail(retry)
+    with pytest.raises(MaxRetryError):
+        _fail(retry)
+
+
+def test_backoff_wait_capped():
+    retry = _BoundedRetry(total=10, backoff_factor=1, backoff_max=2)
+    for _ in range(6):
+        retry = _fail(retry)
+    assert retry.get_backoff_time() == 2
+
+
+def test_session_stops_retrying_after_max_time(monkeypatch):
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(time.monotonic())
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(_BoundedRetry, "max_retry_time", 0.5)
+    retry = _BoundedRetry(
+        total=1000, backoff_factor=0.05, backoff_max=0.1,
+        status_forcelist=(503,), allowed_methods=frozenset({"GET"}), raise_on_status=False,
+    )
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(max_retries=retry))
+    try:
+        started = time.monotonic()
+        resp = session.get(f"http://127.0.0.1:{server.server_port}/", timeout=5)
+        elapsed = time.monotonic() - started
+    finally:
+        session.close()
+        server.shutdown()
+        server.server_close()
+
+    # 超过总时长后返回最后一次的 503，而不是把 1000 次重试用完
+    assert resp.status_code == 503
+    assert elapsed < 3
+    assert 2 <= len(hits) < 50
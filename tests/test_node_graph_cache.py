@@ -0,0 +1,76 @@
+import pytest
+from langgraph.graph import StateGraph, END
+from pydantic import BaseModel
+
+from utils.helper.graph_helper import NodeGraphCache
+
+
+class State(BaseModel):
+    text: str = ""
+    upper: str = ""
+    length: int = 0
+
+
+class UpperInput(BaseModel):
+    text: str = ""
+
+
+class UpperOutput(BaseModel):
+    upper: str = ""
+
+
+class LengthInput(BaseModel):
+    upper: str = ""
+
+
+class LengthOutput(BaseModel):
+    length: int = 0
+
+
+def upper_node(state: UpperInput) -> UpperOutput:
+    return UpperOutput(upper=state.text.upper())
+
+
+def length_node(state: LengthInput) -> LengthOutput:
+    return LengthOutput(length=len(state.upper))
+
+
+@pytest.fixture
+def graph():
+    builder = StateGraph(State)
+    builder.add_node("upper_node", upper_node)
+    builder.add_node("length_node", length_node)
+    builder.set_entry_point("upper_node")
+    builder.add_edge("upper_node", "length_node")
+    builder.add_edge("length_node", END)
+    return builder.compile()
+
+
+def test_get_reuses_compiled_node_graph(graph):
+    cache = NodeGraphCache(graph)
+
+    compiled, input_cls, output_cls = cache.get("upper_node")
+    assert input_cls is UpperInput
+    assert output_cls is UpperOutput
+    assert compiled.invoke({"text": "abc"}) == {"upper": "ABC"}
+
+    again, _, _ = cache.get("upper_node")
+    assert again is compiled
+    assert len(cache) == 1
+
+
+def test_unknown_node_raises_key_error(graph):
+    cache = NodeGraphCache(graph)
+    with pytest.raises(KeyError):
+        cache.get("missing_node")
+    assert len(cache) == 0
+
+
+def test_warmup_prebuilds_every_node(graph):
+    cache = NodeGraphCache(graph)
+    assert cache.warmup() == 2
+
+    compiled, _, _ = cache.get("length_node")
+    assert cache.get("length_node")[0] is compiled
+    assert compiled.invoke({"upper": "ABCD"}) == {"length": 4}
+    assert len(cache) == 2
@@ -0,0 +1,58 @@
+import json
+import threading
+import time
+
+from utils.log.node_log import NodeLogWriter
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_full_queue_drops_and_counts(tmp_path):
+    path = tmp_path / "node.log"
+    writer = NodeLogWriter(str(path), max_queue_size=2, batch_size=1, fsync_policy="none")
+    release = threading.Event()
+    write_batch = writer._write_batch
+
+    def _blocked(batch):
+        release.wait(5)
+        write_batch(batch)
+
+    writer._write_batch = _blocked
+
+    assert writer.submit({"i": 0})
+    # 后台线程取走第一条后卡在写入上，队列还能再放 2 条
+    _wait(lambda: writer._queue.qsize() == 0)
+    assert writer.submit({"i": 1}) and writer.submit({"i": 2})
+    assert [writer.submit({"i": i}) for i in range(3, 6)] == [False, False, False]
+
+    release.set()
+    writer.close()
+
+    stats = writer.get_stats()
+    assert (stats["written"], stats["dropped"], stats["errors"]) == (3, 3, 0)
+    assert [json.loads(line)["i"] for line in path.read_text().splitlines()] == [0, 1, 2]
+
+
+def test_counters_are_consistent_under_concurrent_drops(tmp_path):
+    writer = NodeLogWriter(str(tmp_path / "node.log"), max_queue_size=1, batch_size=1, fsync_policy="none")
+    release = threading.Event()
+    write_batch = writer._write_batch
+    writer._write_batch = lambda batch: (release.wait(5), write_batch(batch))
+    writer.submit({"i": -1})
+    _wait(lambda: writer._queue.qsize() == 0)
+    writer.submit({"i": 0})
+
+    threads = [threading.Thread(target=lambda: [writer.submit({"i": 1}) for _ in range(500)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    release.set()
+    writer.close()
+
+    assert writer.get_stats()["dropped"] == 8 * 500
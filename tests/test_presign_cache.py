@@ -0,0 +1,72 @@
+import storage.s3.presign_cache as presign_cache
+from storage.s3.presign_cache import PresignedUrlCache
+
+KEY = ("https://sign.example.com", "bucket", "avatars/1.png")
+
+
+class _Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _cache(monkeypatch, clock, **kwargs) -> PresignedUrlCache:
+    monkeypatch.setattr(presign_cache.time, "monotonic", clock)
+    return PresignedUrlCache(**{"max_size": 10, "safety_margin": 300, "reuse_window": 600, **kwargs})
+
+
+def test_hit_requires_remaining_lifetime(monkeypatch):
+    clock = _Clock()
+    cache = _cache(monkeypatch, clock)
+    cache.put(KEY, "https://u/1", 3600, signed_at=clock.now)
+
+    # 剩余 3600 - 300 余量 = 3300 >= 1800
+    assert cache.get(KEY, 1800) == "https://u/1"
+
+    # 签名 3600s 的 URL 只剩约 301s，不能交给要求 1800s 的调用方
+    clock.now += 3299
+    assert cache.get(KEY, 1800) is None
+    assert cache.get_stats()["size"] == 0
+
+
+def test_boundary_is_inclusive(monkeypatch):
+    clock = _Clock()
+    cache = _cache(monkeypatch, clock)
+    cache.put(KEY, "https://u/1", 3600, signed_at=clock.now)
+
+    clock.now += 3600 - 300 - 1800
+    assert cache.get(KEY, 1800) == "https://u/1"
+    clock.now += 0.001
+    assert cache.get(KEY, 1800) is None
+
+
+def test_signing_lifetime_covers_reuse_window(monkeypatch):
+    clock = _Clock()
+    cache = _cache(monkeypatch, clock)
+    lifetime = cache.signing_lifetime(1800)
+    assert lifetime == 1800 + 300 + 600
+    cache.put(KEY, "https://u/1", lifetime, signed_at=clock.now)
+
+    clock.now += 600
+    assert cache.get(KEY, 1800) == "https://u/1"
+    clock.now += 1
+    assert cache.get(KEY, 1800) is None
+
+
+def test_disabled_cache_signs_requested_lifetime(monkeypatch):
+    cache = _cache(monkeypatch, _Clock(), max_size=0)
+    assert cache.signing_lifetime(1800) == 1800
+    cache.put(KEY, "https://u/1", 1800, signed_at=0)
+    assert cache.get(KEY, 60) is None
+
+
+def test_lru_eviction(monkeypatch):
+    clock = _Clock()
+    cache = _cache(monkeypatch, clock, max_size=2)
+    for i in range(3):
+        cache.put(("s", "b", str(i)), f"https://u/{i}", 3600, signed_at=clock.now)
+    assert cache.get(("s", "b", "0"), 60) is None
+    assert cache.get(("s", "b", "2"), 60) == "https://u/2"
+    assert cache.get_stats()["evictions"] == 1
@@ -0,0 +1,149 @@
+import asyncio
+import io
+import socket
+import threading
+
+import pytest
+
+pytest.importorskip("moto")
+boto3 = pytest.importorskip("boto3")
+from moto.server import ThreadedMotoServer
+
+from storage.s3.s3_storage import S3AsyncStorage, S3SyncStorage
+from storage.s3.token_cache import AccessTokenCache
+
+BUCKET = "test-bucket"
+KEY = "docs/sample.bin"
+# 非整倍数的大小，覆盖最后一个不满的分段
+CONTENT = bytes(range(256)) * 4099
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def endpoint():
+    port = _free_port()
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def storage(endpoint, monkeypatch):
+    monkeypatch.delenv("COZE_BUCKET_ENDPOINT_URL", raising=False)
+    storage = S3SyncStorage(
+        endpoint_url=endpoint, access_key="test", secret_key="test", bucket_name=BUCKET, region="us-east-1",
+        token_cache=AccessTokenCache(provider=lambda: ("test-token", 3600)),
+    )
+    client = storage._get_client()
+    try:
+        client.create_bucket(Bucket=BUCKET)
+    except client.exceptions.BucketAlreadyOwnedByYou:
+        pass
+    client.put_object(Bucket=BUCKET, Key=KEY, Body=CONTENT)
+    return storage
+
+
+def test_iter_file_parallel_reassembles_in_order(storage):
+    chunks = list(storage.iter_file_parallel(file_key=KEY, part_size=100_000, max_concurrency=4))
+    assert len(chunks) == -(-len(CONTENT) // 100_000)
+    assert b"".join(chunks) == CONTENT
+
+
+def test_iter_file_parallel_early_stop(storage):
+    it = storage.iter_file_parallel(file_key=KEY, part_size=100_000, max_concurrency=3)
+    assert next(it) == CONTENT[:100_000]
+    it.close()
+
+
+def test_iter_file_streams_whole_object(storage):
+    assert b"".join(storage.iter_file(file_key=KEY, chunk_size=65536)) == CONTENT
+
+
+def test_open_file_random_access(storage):
+    with storage.open_file(file_key=KEY, buffer_size=4096) as f:
+        assert f.read(10) == CONTENT[:10]
+        f.seek(500_000)
+        assert f.read(1000) == CONTENT[500_000:501_000]
+        f.seek(-7, io.SEEK_END)
+        assert f.read() == CONTENT[-7:]
+        assert f.read(5) == b""
+        f.seek(0)
+        assert f.read() == CONTENT
+
+
+def test_download_file(storage, tmp_path):
+    dest = tmp_path / "out.bin"
+    storage.download_file(file_key=KEY, dest_path=str(dest))
+    assert dest.read_bytes() == CONTENT
+
+
+def test_open_file_fails_when_object_is_replaced(storage):
+    with storage.open_file(file_key=KEY, buffer_size=4096) as f:
+        assert f.read(10) == CONTENT[:10]
+        storage._get_client().put_object(Bucket=BUCKET, Key=KEY, Body=b"replaced")
+        f.seek(500_000)
+        with pytest.raises(Exception):
+            f.read(10)
+
+
+def _count_calls(storage, operation: str) -> list:
+    calls = []
+    storage._get_client().meta.events.register(
+        f"before-call.s3.{operation}", lambda params, **kwargs: calls.append(params)
+    )
+    return calls
+
+
+def test_delete_files_batches_by_1000(storage):
+    client = storage._get_client()
+    keys = [f"bulk/{i}.txt" for i in range(1001)]
+    for key in keys:
+        client.put_object(Bucket=BUCKET, Key=key, Body=b"x")
+    calls = _count_calls(storage, "DeleteObjects")
+
+    # 重复的 key 只删除一次
+    result = storage.delete_files(file_keys=keys + keys[:5])
+
+    assert [c["body"].count(b"<Key>") for c in calls] == [1000, 1]
+    assert sorted(result["deleted"]) == sorted(keys)
+    assert result["errors"] == []
+    assert client.list_objects_v2(Bucket=BUCKET, Prefix="bulk/")["KeyCount"] == 0
+
+
+def test_trunk_upload_aborts_on_error(storage):
+    client = storage._get_client()
+    aborts = _count_calls(storage, "AbortMultipartUpload")
+
+    def chunks():
+        yield b"a" * (5 * 1024 * 1024)
+        raise IOError("source stream broken")
+
+    with pytest.raises(IOError):
+        storage.trunk_upload_file(chunk_iter=chunks(), file_name="broken.bin")
+
+    assert len(aborts) == 1
+    assert client.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+
+
+def test_async_facade_runs_off_the_loop(storage):
+    async_storage = S3AsyncStorage(storage)
+    threads = []
+    calls = _count_calls(storage, "GetObject")
+    storage._get_client().meta.events.register(
+        "before-call.s3.GetObject", lambda **kwargs: threads.append(threading.current_thread())
+    )
+
+    async def run():
+        data = await async_storage.read_file(file_key=KEY)
+        exists = await async_storage.file_exists(file_key=KEY)
+        return data, exists, threading.current_thread()
+
+    data, exists, loop_thread = asyncio.run(run())
+    assert data == CONTENT and exists is True
+    assert calls and threads and all(t is not loop_thread for t in threads)
@@ -0,0 +1,121 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.file import text_cache as text_cache_module
+from utils.file.file import File, FileOps
+from utils.file.text_cache import ExtractedTextCache
+
+
+class _Origin:
+    """可修改内容的源站，记录每次请求的条件请求头"""
+
+    def __init__(self):
+        self.body = b"hello v1"
+        self.etag = '"v1"'
+        self.requests = []
+
+
+@pytest.fixture
+def origin():
+    state = _Origin()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if_none_match = self.headers.get("If-None-Match")
+            state.requests.append(if_none_match)
+            if if_none_match == state.etag:
+                self.send_response(304)
+                self.send_header("ETag", state.etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", state.etag)
+            self.send_header("Content-Length", str(len(state.body)))
+            self.end_headers()
+            self.wfile.write(state.body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state.url = f"http://127.0.0.1:{server.server_port}/notes.txt"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ExtractedTextCache(str(tmp_path / "cache"), max_chars=1000, enabled=True)
+    monkeypatch.setattr(text_cache_module, "_text_cache", cache)
+    return cache
+
+
+def test_repeat_url_revalidates_with_etag(origin, cache):
+    file_obj = File(url=origin.url, file_type="document")
+
+    assert FileOps.extract_text(file_obj) == "hello v1"
+    assert origin.requests == [None]
+    assert cache.stats["misses"] == 1
+
+    # 源站返回 304，直接复用缓存文本
+    assert FileOps.extract_text(file_obj) == "hello v1"
+    assert origin.requests == [None, '"v1"']
+    assert cache.stats["revalidated"] == 1
+    assert cache.stats["misses"] == 1
+
+
+def test_changed_content_is_refetched(origin, cache):
+    file_obj = File(url=origin.url, file_type="document")
+    assert FileOps.extract_text(file_obj) == "hello v1"
+
+    origin.body, origin.etag = b"hello v2", '"v2"'
+    assert FileOps.extract_text(file_obj) == "hello v2"
+    assert origin.requests == [None, '"v1"']
+    assert cache.get_url_entry(origin.url)["etag"] == '"v2"'
+
+    assert FileOps.extract_text(file_obj) == "hello v2"
+    assert cache.stats["revalidated"] == 1
+
+
+def test_not_modified_with_evicted_text_downloads_again(origin, cache):
+    file_obj = File(url=origin.url, file_type="document")
+    assert FileOps.extract_text(file_obj) == "hello v1"
+
+    digest = cache.get_url_entry(origin.url)["digest"]
+    os.remove(os.path.join(cache.root, cache._text_rel(digest)))
+
+    # 304 后发现文本已被淘汰，不带条件头重新下载
+    assert FileOps.extract_text(file_obj) == "hello v1"
+    assert origin.requests == [None, '"v1"', None]
+    assert cache.stats["revalidated"] == 0
+
+
+def test_response_without_validators_is_not_indexed(tmp_path):
+    cache = ExtractedTextCache(str(tmp_path / "cache"), max_chars=1000, enabled=True)
+    cache.put_url("http://example.invalid/a.txt", "d" * 64)
+    assert cache.get_url_entry("http://example.invalid/a.txt") is None
+    assert cache.conditional_headers(None) == {}
+    assert cache.conditional_headers({"etag": '"x"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT"}) == {
+        "If-None-Match": '"x"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+
+
+def test_eviction_keeps_total_under_limit(tmp_path):
+    cache = ExtractedTextCache(str(tmp_path / "cache"), max_chars=1000, max_bytes=25, enabled=True)
+    cache.put_text("a" * 64, "x" * 10)
+    cache.put_text("b" * 64, "y" * 10)
+    # 命中使 a 成为最近使用，写入 c 时淘汰 b
+    assert cache.get_text("a" * 64) == "x" * 10
+    cache.put_text("c" * 64, "z" * 10)
+
+    assert cache.get_text("b" * 64) is None
+    assert cache.get_text("a" * 64) == "x" * 10
+    assert cache.get_stats()["evictions"] == 1
+    assert cache.get_stats()["bytes"] <= 25
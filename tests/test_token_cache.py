@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+
+import storage.s3.token_cache as token_cache
+from storage.s3.token_cache import AccessTokenCache
+
+
+class _Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _Provider:
+    def __init__(self, ttl: float = 100.0, delay: float = 0.0):
+        self.ttl = ttl
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("token endpoint down")
+        return f"t{self.calls}", self.ttl
+
+
+def _wait_background(cache: AccessTokenCache):
+    deadline = time.time() + 5
+    while cache._background_refreshing and time.time() < deadline:
+        time.sleep(0.01)
+    assert not cache._background_refreshing
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(token_cache.time, "monotonic", clock)
+    return clock
+
+
+def test_single_flight_on_cold_start():
+    provider = _Provider(delay=0.2)
+    cache = AccessTokenCache(provider, refresh_ahead=10)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert provider.calls == 1
+    assert results == ["t1"] * 8
+    assert cache.get_stats()["waited"] == 7
+
+
+def test_refresh_ahead_serves_old_token_and_refreshes_in_background(clock):
+    provider = _Provider(ttl=100)
+    cache = AccessTokenCache(provider, refresh_ahead=10)
+    assert cache.get() == "t1"
+
+    clock.now += 50
+    assert cache.get() == "t1"
+    assert provider.calls == 1
+
+    # 进入提前刷新窗口：本次仍返回旧 token，后台换新
+    clock.now += 45
+    assert cache.get() == "t1"
+    _wait_background(cache)
+    assert provider.calls == 2
+    assert cache.get() == "t2"
+    assert cache.get_stats()["background_refreshes"] == 1
+
+
+def test_background_failure_backs_off(clock):
+    provider = _Provider(ttl=100)
+    cache = AccessTokenCache(provider, refresh_ahead=50, retry_backoff=5, retry_backoff_max=8)
+    cache.get()
+    provider.fail = True
+
+    clock.now += 60
+    assert cache.get() == "t1"
+    _wait_background(cache)
+    assert provider.calls == 2
+    assert cache.get_stats()["failures"] == 1
+
+    # 退避期内的请求不再拉起刷新
+    clock.now += 4
+    assert cache.get() == "t1"
+    _wait_background(cache)
+    assert provider.calls == 2
+
+    # 退避到期后重试，连续失败时退避翻倍但不超过上限
+    clock.now += 1
+    cache.get()
+    _wait_background(cache)
+    assert provider.calls == 3
+    assert cache._refresh_at == pytest.approx(clock.now + 8)
+
+    provider.fail = False
+    clock.now += 8
+    cache.get()
+    _wait_background(cache)
+    assert cache.get() == "t4"
+    assert cache.get_stats()["consecutive_failures"] == 0
+
+
+def test_sync_failure_raises_without_token():
+    provider = _Provider()
+    provider.fail = True
+    cache = AccessTokenCache(provider)
+    with pytest.raises(RuntimeError):
+        cache.get()
+    provider.fail = False
+    assert cache.get() == "t2"
+
+
+def test_sdk_helper_checks_version(monkeypatch):
+    from coze_workload_identity.client import get_global_token_cache
+    token_cache._sdk_token_cache.cache_clear()
+    sdk_cache = get_global_token_cache()
+    sdk_cache.set("access_token", "sdk-token", 3600)
+    try:
+        assert token_cache._sdk_access_token_expires_at() == pytest.approx(time.time() + 3540, abs=5)
+        token_cache._sdk_evict_access_token()
+        assert sdk_cache.get("access_token") is None
+
+        # 未核对过的版本不碰 SDK 私有字段
+        token_cache._sdk_token_cache.cache_clear()
+        monkeypatch.setattr(token_cache, "_SDK_TOKEN_CACHE_VERSIONS", ())
+        sdk_cache.set("access_token", "sdk-token", 3600)
+        assert token_cache._sdk_access_token_expires_at() is None
+        token_cache._sdk_evict_access_token()
+        assert sdk_cache.get("access_token") == "sdk-token"
+    finally:
+        token_cache._sdk_token_cache.cache_clear()
+        sdk_cache._cache.pop("access_token", None)
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+from typing import Any, List, Optional
+
+from langchain.agents import create_agent
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import StructuredTool
+
+from agents.tool_execution import ToolConcurrencyMiddleware, get_tool_concurrency_stats
+
+TOOL_CALLS = 6
+
+
+class _FanOutModel(BaseChatModel):
+    """第一轮一次性发出多个工具调用，拿到工具结果后结束"""
+
+    @property
+    def _llm_type(self) -> str:
+        return "fan-out"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any):
+        if any(isinstance(m, ToolMessage) for m in messages):
+            message = AIMessage(content="done")
+        else:
+            message = AIMessage(content="", tool_calls=[
+                {"name": "slow", "args": {"i": i}, "id": f"call-{i}"} for i in range(TOOL_CALLS)
+            ])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class _Gauge:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.current -= 1
+
+
+def _agent(gauge: _Gauge, limit: int):
+    def slow(i: int) -> str:
+        with gauge:
+            time.sleep(0.05)
+        return str(i)
+
+    async def aslow(i: int) -> str:
+        with gauge:
+            await asyncio.sleep(0.05)
+        return str(i)
+
+    slow_tool = StructuredTool.from_function(func=slow, coroutine=aslow, name="slow", description="sleep a bit")
+    return create_agent(model=_FanOutModel(), tools=[slow_tool], middleware=[ToolConcurrencyMiddleware(limit)])
+
+
+def _tool_messages(result) -> int:
+    return sum(isinstance(m, ToolMessage) for m in result["messages"])
+
+
+def test_sync_path_respects_limit():
+    gauge = _Gauge()
+    before = get_tool_concurrency_stats()
+    result = _agent(gauge, 2).invoke({"messages": [{"role": "user", "content": "go"}]})
+
+    assert _tool_messages(result) == TOOL_CALLS
+    assert gauge.peak == 2
+    stats = get_tool_concurrency_stats()
+    assert stats["calls"] - before["calls"] == TOOL_CALLS
+    assert stats["queued"] > before["queued"]
+
+
+def test_async_path_respects_limit():
+    gauge = _Gauge()
+    result = asyncio.run(_agent(gauge, 2).ainvoke({"messages": [{"role": "user", "content": "go"}]}))
+
+    assert _tool_messages(result) == TOOL_CALLS
+    assert gauge.peak == 2
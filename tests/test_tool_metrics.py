@@ -0,0 +1,95 @@
+import contextvars
+import threading
+
+import pytest
+from langchain_core.tools import StructuredTool
+from sqlalchemy import create_engine, text
+
+from utils.log.tool_metrics import ToolMetrics, ToolMetricsHandler
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}", connect_args={"check_same_thread": False})
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+    return engine
+
+
+def _query_tool(engine, name: str, statements: int, barrier: threading.Barrier = None) -> StructuredTool:
+    def run(n: int = 0) -> str:
+        if barrier is not None:
+            barrier.wait(5)
+        with engine.connect() as conn:
+            for _ in range(statements):
+                conn.execute(text("SELECT count(*) FROM t")).scalar()
+        return "ok"
+
+    return StructuredTool.from_function(func=run, name=name, description=name)
+
+
+def _by_name(metrics: ToolMetrics) -> dict:
+    return {item["name"]: item for item in metrics.snapshot()}
+
+
+def test_sql_attributed_to_the_calling_tool_across_threads(engine):
+    metrics = ToolMetrics()
+    handler = ToolMetricsHandler(metrics)
+    barrier = threading.Barrier(2)
+    tools = [_query_tool(engine, "two_queries", 2, barrier), _query_tool(engine, "five_queries", 5, barrier)]
+
+    # ToolNode 在线程池中为每个工具调用复制一份上下文执行
+    threads = [
+        threading.Thread(target=contextvars.copy_context().run, args=(t.invoke, {"n": 0}, {"callbacks": [handler]}))
+        for t in tools
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = _by_name(metrics)
+    assert stats["two_queries"]["sql_statements"] == 2
+    assert stats["five_queries"]["sql_statements"] == 5
+    assert stats["two_queries"]["output_chars"] == 2
+
+
+def test_sql_outside_tools_is_not_counted(engine):
+    metrics = ToolMetrics()
+    handler = ToolMetricsHandler(metrics)
+    _query_tool(engine, "one_query", 1).invoke({"n": 0}, {"callbacks": [handler]})
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert _by_name(metrics)["one_query"]["sql_statements"] == 1
+
+
+def test_failed_statement_does_not_skew_later_timing(engine):
+    metrics = ToolMetrics()
+    handler = ToolMetricsHandler(metrics)
+
+    def run(n: int = 0) -> str:
+        with engine.connect() as conn:
+            with pytest.raises(Exception):
+                conn.execute(text("SELECT * FROM missing_table"))
+            conn.execute(text("SELECT 1"))
+        return "ok"
+
+    StructuredTool.from_function(func=run, name="flaky", description="flaky").invoke({"n": 0}, {"callbacks": [handler]})
+
+    stats = _by_name(metrics)["flaky"]
+    assert stats["sql_statements"] == 1
+    assert stats["db_ms"]["sum"] < stats["wall_ms"]["sum"]
+
+
+def test_tool_errors_counted_by_type():
+    metrics = ToolMetrics()
+
+    def boom(n: int = 0) -> str:
+        raise ValueError("bad")
+
+    tool = StructuredTool.from_function(func=boom, name="boom", description="boom")
+    with pytest.raises(ValueError):
+        tool.invoke({"n": 0}, {"callbacks": [ToolMetricsHandler(metrics)]})
+
+    assert _by_name(metrics)["boom"]["errors"] == {"ValueError": 1}
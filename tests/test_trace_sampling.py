@@ -0,0 +1,72 @@
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from utils.log.trace_sampling import RootErrorTracer, RunSampler
+
+
+class _Span:
+    def __init__(self, name, start_time):
+        self.name = name
+        self.start_time = start_time
+        self.tags = {}
+        self.error = None
+        self.finished = False
+
+    def set_tags(self, tags):
+        self.tags.update(tags)
+
+    def set_error(self, err):
+        self.error = err
+
+    def finish(self):
+        self.finished = True
+
+
+class _Client:
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, span_type, *, start_time=None, start_new_trace=False):
+        span = _Span(name, start_time)
+        self.spans.append(span)
+        return span
+
+
+def _chain(fail: bool):
+    def step(x):
+        if fail:
+            raise ValueError("bad input")
+        return x
+
+    inner = RunnableLambda(step, name="inner")
+    return (RunnableLambda(lambda x: x, name="prepare") | inner).with_config(run_name="LangGraph")
+
+
+def test_sample_rate_bounds():
+    assert all(RunSampler(1.0).should_sample() for _ in range(100))
+    sampler = RunSampler(0.0)
+    assert not any(sampler.should_sample() for _ in range(100))
+    assert sampler.get_stats()["unsampled"] == 100
+
+
+def test_unsampled_run_reports_only_root_span_on_error():
+    client, sampler = _Client(), RunSampler(0.0)
+    tracer = RootErrorTracer(client, sampler, {"log_id": "l1"})
+
+    with pytest.raises(ValueError):
+        _chain(fail=True).invoke({"q": 1}, config={"callbacks": [tracer]})
+
+    assert [s.name for s in client.spans] == ["LangGraph"]
+    span = client.spans[0]
+    assert span.finished and isinstance(span.error, ValueError)
+    assert span.tags["log_id"] == "l1"
+    assert sampler.get_stats()["errors_reported"] == 1
+    assert tracer._roots == {}
+
+
+def test_unsampled_successful_run_reports_nothing():
+    client = _Client()
+    tracer = RootErrorTracer(client, RunSampler(0.0))
+    _chain(fail=False).invoke({"q": 1}, config={"callbacks": [tracer]})
+    assert client.spans == []
+    assert tracer._roots == {}
@@ -0,0 +1,73 @@
+import logging
+import queue
+import threading
+import time
+
+from utils.log.write_log import BoundedQueueHandler, BoundedQueueListener
+
+
+def _record(i: int) -> logging.LogRecord:
+    return logging.LogRecord("test", logging.INFO, __file__, 1, "msg %s", (i,), None)
+
+
+def test_drop_policy_counts_overflow():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=2), overflow_policy="drop")
+    for i in range(5):
+        handler.handle(_record(i))
+
+    assert handler.get_stats()["dropped"] == 3
+    # prepare 在调用线程上合并了参数
+    assert handler.queue.get_nowait().msg == "msg 0"
+
+
+def test_block_policy_waits_then_drops():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=1), overflow_policy="block", block_timeout=0.05)
+    handler.handle(_record(0))
+    start = time.monotonic()
+    handler.handle(_record(1))
+
+    assert time.monotonic() - start >= 0.05
+    assert handler.dropped == 1
+
+
+class _StuckHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+        self.records = []
+
+    def emit(self, record):
+        self.unblock.wait(5)
+        self.records.append(record)
+
+
+def test_listener_stop_reports_undeliverable_sentinel(capsys):
+    log_queue = queue.Queue(maxsize=2)
+    target = _StuckHandler()
+    listener = BoundedQueueListener(log_queue, target, stop_timeout=0.1)
+    listener.start()
+    log_queue.put(_record(0))
+    while not log_queue.empty():
+        time.sleep(0.01)
+    log_queue.put(_record(1))
+    log_queue.put(_record(2))
+
+    listener.stop()
+
+    assert listener.sentinel_dropped == 1
+    assert "2 queued records were not written" in capsys.readouterr().err
+    target.unblock.set()
+
+
+def test_listener_stop_drains_queue():
+    log_queue = queue.Queue(maxsize=10)
+    target = _StuckHandler()
+    target.unblock.set()
+    listener = BoundedQueueListener(log_queue, target)
+    listener.start()
+    for i in range(5):
+        log_queue.put(_record(i))
+
+    listener.stop()
+
+    assert len(target.records) == 5 and listener.sentinel_dropped == 0